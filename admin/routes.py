@@ -1,12 +1,19 @@
 # admin/routes.py
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app, send_from_directory
-from utils.database import get_db_connection
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app, send_file, abort, Response
+from utils.database import get_db_connection, get_recent_comments, add_product_images, get_product_image_filenames
+from utils.pagination import keyset_paginate, clamp_page_size
+from utils.cache import catalogue_cache, loan_filter_cache
+from utils.derivatives import schedule_derivatives, delete_derivatives
+from utils.blobs import resolve_attachment, collect_garbage
+from utils.metrics import render_prometheus
+from utils.search import candidate_floor, match_query
 from auth.utils import verify_password
 from auth.decorators import login_required, role_required
 import os
+import hmac
 from werkzeug.utils import secure_filename
 import time 
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # ------------------------------
 # Blueprint
@@ -31,6 +38,13 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'tiff', 'jfif', 'bmp'
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+INQUIRY_FACETS = ("inquiry_target", "service", "reason", "status")
+LOAN_STATUSES = ("pending", "approved", "rejected", "missing_info")
+LOAN_TYPES = ("personal", "business")
+
+def page_size():
+    return clamp_page_size(request.args.get('per_page'), current_app.config.get('ADMIN_PAGE_SIZE', 25))
+
 # ------------------------------
 # Admin Login (No Changes)
 # ------------------------------
@@ -62,13 +76,23 @@ def login():
 @role_required('admin', 'super_admin')
 def dashboard():
     db = get_db_connection()
-    blogs = db.execute("SELECT id, title, created_at, status FROM blogs ORDER BY created_at DESC").fetchall()
-    comments = db.execute("""
-        SELECT comments.id, comments.blog_id, comments.content, comments.created_at, users.email AS user_email
-        FROM comments
-        JOIN users ON users.id = comments.user_id
-        ORDER BY comments.created_at DESC
-    """).fetchall()
+    blogs = keyset_paginate(
+        db,
+        "SELECT id, title, created_at, status FROM blogs WHERE {keyset}",
+        order_by=[("created_at", "created_at"), ("id", "id")],
+        cursor=request.args.get('blogs_cursor'),
+        limit=page_size(),
+    )
+    # Comments only for the blogs on this page, not every comment in the system
+    comments = get_recent_comments(
+        db, [blog['id'] for blog in blogs], current_app.config.get('ADMIN_INLINE_COMMENTS', 20)
+    )
+    blogs_with_comments = []
+    for blog in blogs:
+        b = dict(blog)
+        b['comments'] = comments[blog['id']]['comments']
+        b['comment_count'] = comments[blog['id']]['total']
+        blogs_with_comments.append(b)
     loans = db.execute("""
         SELECT la.id, la.application_number, la.loan_type, la.status, la.applied_date, u.email
         FROM loan_applications la
@@ -77,7 +101,7 @@ def dashboard():
         LIMIT 5
     """).fetchall()
     db.close()
-    return render_template('dashboard.html', blogs=blogs, comments=comments, loans=loans)
+    return render_template('dashboard.html', blogs=blogs_with_comments, blogs_page=blogs, loans=loans)
 
 # ------------------------------
 # Blog Routes (FIXED INDENTATION ERROR)
@@ -105,6 +129,7 @@ def create_blog():
                    (title, content, image_filename, session['user_id'], status))
         db.commit()
         db.close()
+        schedule_derivatives("blogs", [image_filename])
         flash("Blog created successfully!", "success")
         return redirect(url_for('admin.dashboard'))
     return render_template('admin_create.html', blog={})
@@ -134,10 +159,13 @@ def edit_blog(blog_id):
                 if blog['image']:
                     old_path = os.path.join(BLOG_UPLOAD_FOLDER, blog['image'])
                     if os.path.exists(old_path): os.remove(old_path)
+                    delete_derivatives(db, "blogs", [blog['image']])
         db.execute("UPDATE blogs SET title = ?, content = ?, image = ?, status = ? WHERE id = ?",
                    (title, content, image_filename, status, blog_id))
         db.commit()
         db.close()
+        if image_filename != blog['image']:
+            schedule_derivatives("blogs", [image_filename])
         return redirect(url_for('admin.dashboard'))
     db.close()
     return render_template('admin_edit_blog.html', blog=blog)
@@ -153,6 +181,7 @@ def delete_blog(blog_id):
             os.remove(os.path.join(BLOG_UPLOAD_FOLDER, blog['image']))
         except:
             pass
+        delete_derivatives(db, "blogs", [blog['image']])
     db.execute("DELETE FROM comments WHERE blog_id = ?", (blog_id,))
     db.execute("DELETE FROM blogs WHERE id = ?", (blog_id,))
     db.commit()
@@ -197,15 +226,16 @@ def create_product():
                 file.save(os.path.join(PRODUCT_UPLOAD_FOLDER, filename))
                 filenames.append(filename)
 
-        image_data = ",".join(filenames) if filenames else None
-
         db = get_db_connection()
-        db.execute(
-            "INSERT INTO products (name, description, price, image) VALUES (?, ?, ?, ?)",
-            (name, description, price, image_data)
+        cursor = db.execute(
+            "INSERT INTO products (name, description, price) VALUES (?, ?, ?)",
+            (name, description, price)
         )
+        add_product_images(db, cursor.lastrowid, filenames)
+        catalogue_cache.invalidate(db)
         db.commit()
         db.close()
+        schedule_derivatives("products", filenames)
 
         flash("Product added successfully.", "success")
         return redirect(url_for('market_place.home'))
@@ -217,18 +247,17 @@ def create_product():
 @role_required('admin', 'super_admin')
 def delete_product(product_id):
     db = get_db_connection()
-    product = db.execute("SELECT image FROM products WHERE id = ?", (product_id,)).fetchone()
-    
-    # FIX: Delete every image in the comma-separated string
-    if product and product['image']:
-        for img in product['image'].split(','):
-            try:
-                path = os.path.join(PRODUCT_UPLOAD_FOLDER, img.strip())
-                if os.path.exists(path): os.remove(path)
-            except:
-                pass
+    filenames = get_product_image_filenames(db, product_id)
+    for img in filenames:
+        try:
+            path = os.path.join(PRODUCT_UPLOAD_FOLDER, img)
+            if os.path.exists(path): os.remove(path)
+        except:
+            pass
+    delete_derivatives(db, "products", filenames)
 
     db.execute("DELETE FROM products WHERE id = ?", (product_id,))
+    catalogue_cache.invalidate(db)
     db.commit()
     db.close()
 
@@ -243,14 +272,20 @@ def delete_product(product_id):
 @role_required('admin', 'super_admin')
 def product_inquiries_view():
     db = get_db_connection()
-    inquiries = db.execute("""
+    inquiries = keyset_paginate(
+        db,
+        """
         SELECT pi.id, pi.message, pi.created_at, p.name AS product_name
         FROM product_inquiries pi
         JOIN products p ON p.id = pi.product_id
-        ORDER BY pi.created_at DESC
-    """).fetchall()
+        WHERE {keyset}
+        """,
+        order_by=[("pi.created_at", "created_at"), ("pi.id", "id")],
+        cursor=request.args.get('cursor'),
+        limit=page_size(),
+    )
     db.close()
-    return render_template('admin_product_inquiries.html', inquiries=inquiries)
+    return render_template('admin_product_inquiries.html', inquiries=inquiries, page=inquiries)
 
 @admin_bp.route('/product-inquiries/delete/<int:inquiry_id>', methods=['POST'])
 @login_required
@@ -271,18 +306,23 @@ def delete_product_inquiry(inquiry_id):
 @role_required('admin', 'super_admin')
 def list_loans():
     db = get_db_connection()
-    query = """
+    loans = keyset_paginate(
+        db,
+        """
         SELECT la.id, la.application_number, la.loan_type, la.status, la.applied_date, u.email,
         COALESCE(p.full_name, b.business_name, 'Unknown') AS display_name
         FROM loan_applications la
         JOIN users u ON u.id = la.user_id
         LEFT JOIN personal_loan_details p ON la.id = p.application_id
         LEFT JOIN business_loan_details b ON la.id = b.application_id
-        ORDER BY la.applied_date DESC
-    """
-    loans = db.execute(query).fetchall()
+        WHERE {keyset}
+        """,
+        order_by=[("la.applied_date", "applied_date"), ("la.id", "id")],
+        cursor=request.args.get('cursor'),
+        limit=page_size(),
+    )
     db.close()
-    return render_template('admin_loans_list.html', loans=loans)
+    return render_template('admin_loans_list.html', loans=loans, page=loans, statuses=LOAN_STATUSES, loan_types=LOAN_TYPES)
 
 @admin_bp.route('/loans/<int:loan_id>', methods=['GET', 'POST'])
 @login_required
@@ -292,10 +332,13 @@ def view_loan(loan_id):
     if request.method == 'POST':
         status = request.form.get('status')
         admin_notes = request.form.get('admin_notes')
+        # A status change is a decision: stamp it so decision-date filters find it
         db.execute("""
-            UPDATE loan_applications SET status = ?, admin_notes = ?, updated_date = CURRENT_TIMESTAMP
+            UPDATE loan_applications SET status = ?, admin_notes = ?, updated_date = CURRENT_TIMESTAMP,
+                decision_date = CASE WHEN status IS NOT ? THEN CURRENT_TIMESTAMP ELSE decision_date END,
+                decision_by = CASE WHEN status IS NOT ? THEN ? ELSE decision_by END
             WHERE id = ?
-        """, (status, admin_notes, loan_id))
+        """, (status, admin_notes, status, status, session.get('user_id'), loan_id))
         db.commit()
         return redirect(url_for('admin.view_loan', loan_id=loan_id))
     loan = db.execute("SELECT la.*, u.email AS applicant_email FROM loan_applications la JOIN users u ON u.id = la.user_id WHERE la.id = ?", (loan_id,)).fetchone()
@@ -309,31 +352,130 @@ def view_loan(loan_id):
     db.close()
     return render_template('admin_loan_management.html', loan=loan, attachments=attachments, collateral_items=collateral_items, personal_details=personal_details, business_details=business_details, monthly_revenue=m_revenue, business_address=b_address)
 
+# ------------------------------
+# Loan Filters
+# ------------------------------
+# Every filter is a loan_applications column (migration 11 copies the
+# applicant name, amount and attachment count onto it), so no filter needs
+# a join. Status and type are served with the page order by
+# idx_loan_applications_{status,type,status_type}_applied, which also bound
+# the applied-date range; decision dates, amounts and the name prefix each
+# have a range index; "has attachments" is a partial index in page order.
+def parse_day(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+def parse_amount(value):
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return None
+    return amount if amount >= 0 else None
+
+def loan_filters(args):
+    """Normalised filter_loans filters from the query string; invalid values are dropped."""
+    return {
+        "status": args.get('status') if args.get('status') in LOAN_STATUSES else "",
+        "loan_type": args.get('loan_type') if args.get('loan_type') in LOAN_TYPES else "",
+        "applied_from": parse_day(args.get('applied_from')),
+        "applied_to": parse_day(args.get('applied_to')),
+        "decided_from": parse_day(args.get('decided_from')),
+        "decided_to": parse_day(args.get('decided_to')),
+        "min_amount": parse_amount(args.get('min_amount')),
+        "max_amount": parse_amount(args.get('max_amount')),
+        "name": (args.get('name') or '').strip()[:100],
+        "attachments": args.get('attachments') == '1',
+    }
+
+def loan_filter_conditions(filters):
+    """SQL conditions on loan_applications la, with their positional params."""
+    where, params = [], []
+    for column, key in (("la.status", "status"), ("la.loan_type", "loan_type")):
+        if filters[key]:
+            where.append(f"{column} = ?")
+            params.append(filters[key])
+    # Day bounds are inclusive; timestamps compare as text
+    for column, prefix in (("la.applied_date", "applied"), ("la.decision_date", "decided")):
+        if filters[f"{prefix}_from"]:
+            where.append(f"{column} >= ?")
+            params.append(filters[f"{prefix}_from"].isoformat())
+        if filters[f"{prefix}_to"]:
+            where.append(f"{column} < ?")
+            params.append((filters[f"{prefix}_to"] + timedelta(days=1)).isoformat())
+    if filters["min_amount"] is not None:
+        where.append("la.loan_amount >= ?")
+        params.append(filters["min_amount"])
+    if filters["max_amount"] is not None:
+        where.append("la.loan_amount <= ?")
+        params.append(filters["max_amount"])
+    if filters["name"]:
+        # A prefix range on idx_loan_applications_name (case-insensitive
+        # for ASCII, like the index); no LIKE wildcards to escape
+        where.append("la.applicant_name COLLATE NOCASE >= ? AND la.applicant_name COLLATE NOCASE < ?")
+        params.extend([filters["name"], filters["name"] + "\U0010ffff"])
+    if filters["attachments"]:
+        where.append("la.attachment_count > 0")
+    return where, params
+
 @admin_bp.route('/loans/filter')
 @login_required
 @role_required('admin', 'super_admin')
 def filter_loans():
-    status, loan_type = request.args.get('status'), request.args.get('loan_type')
+    filters = loan_filters(request.args)
+    where, params = loan_filter_conditions(filters)
+    db = get_db_connection()
+    loans = keyset_paginate(
+        db,
+        """
+        SELECT la.id, la.application_number, la.loan_type, la.status, la.applied_date, u.email,
+               COALESCE(la.applicant_name, 'Unknown') AS display_name, la.loan_amount, la.attachment_count
+        FROM loan_applications la
+        JOIN users u ON u.id = la.user_id
+        WHERE """ + " AND ".join(where + ["{keyset}"]),
+        params,
+        order_by=[("la.applied_date", "applied_date"), ("la.id", "id")],
+        cursor=request.args.get('cursor'),
+        limit=page_size(),
+    )
+    # One COUNT per filter signature (the conditions and their values) until a loan changes
+    total = loan_filter_cache.get_or_load(db, (tuple(where), tuple(params)), lambda: db.execute(
+        "SELECT COUNT(*) FROM loan_applications la" + (" WHERE " + " AND ".join(where) if where else ""), params
+    ).fetchone()[0])
+    db.close()
+    return render_template('admin_loans_list.html', loans=loans, page=loans, filters=filters, total=total,
+                           statuses=LOAN_STATUSES, loan_types=LOAN_TYPES)
+
+def send_attachment(attachment_id, as_attachment):
     db = get_db_connection()
-    query = "SELECT la.id, la.application_number, la.loan_type, la.status, la.applied_date, u.email FROM loan_applications la JOIN users u ON u.id = la.user_id WHERE 1=1"
-    params = []
-    if status: query += " AND la.status = ?"; params.append(status)
-    if loan_type: query += " AND la.loan_type = ?"; params.append(loan_type)
-    loans = db.execute(query + " ORDER BY la.applied_date DESC", params).fetchall()
+    attachment = db.execute(
+        "SELECT application_id, file_name, file_path, digest FROM application_attachments WHERE id = ?",
+        (attachment_id,)
+    ).fetchone()
     db.close()
-    return render_template('admin_loans_list.html', loans=loans, filter_status=status, loan_type=loan_type)
 
-@admin_bp.route('/loans/attachments/<path:filename>')
+    path = resolve_attachment(attachment) if attachment else None
+    if not path or not os.path.isfile(path):
+        flash("File not found.", "error")
+        return redirect(url_for('admin.view_loan', loan_id=attachment['application_id']) if attachment else url_for('admin.list_loans'))
+
+    download_name = attachment['file_name'] or os.path.basename(attachment['file_path'])
+    # Blobs never change, so their digest is a strong ETag
+    return send_file(path, as_attachment=as_attachment, download_name=download_name,
+                     etag=attachment['digest'] or True, conditional=True)
+
+@admin_bp.route('/loans/attachments/<int:attachment_id>')
 @login_required
 @role_required('admin', 'super_admin')
-def download_attachment(filename):
-    try:
-        if os.path.exists(os.path.join(LOAN_UPLOAD_FOLDER, filename)):
-            return send_from_directory(LOAN_UPLOAD_FOLDER, filename, as_attachment=True)
-        return send_from_directory(LOAN_UPLOAD_FOLDER, filename.split('uploads/loans/')[-1], as_attachment=True)
-    except:
-        flash("File not found.", "error")
-        return redirect(url_for('admin.list_loans'))
+def view_attachment(attachment_id):
+    return send_attachment(attachment_id, as_attachment=False)
+
+@admin_bp.route('/loans/attachments/<int:attachment_id>/download')
+@login_required
+@role_required('admin', 'super_admin')
+def download_attachment(attachment_id):
+    return send_attachment(attachment_id, as_attachment=True)
 
 @admin_bp.route('/loans/delete/<int:loan_id>', methods=['POST'])
 @login_required
@@ -342,6 +484,8 @@ def delete_loan(loan_id):
     db = get_db_connection()
     db.execute("DELETE FROM loan_applications WHERE id = ?", (loan_id,))
     db.commit()
+    # Attachments cascade and release their blobs; drop any now unreferenced
+    collect_garbage()
     db.close()
     return redirect(url_for('admin.list_loans'))
 
@@ -352,16 +496,109 @@ def delete_loan(loan_id):
 @login_required
 @role_required('admin', 'super_admin')
 def tukakula_queries():
+    """Inbox: ?q= full-text search plus facet filters, pushed into SQL and paged by cursor."""
+    q = request.args.get('q', '').strip()
+    match = match_query(q)
     conn = get_db_connection()
-    queries = conn.execute("""
-        SELECT id, full_name, company_name, email, phone, whatsapp, 
-               inquiry_target, service, subject, reason, message, 
-               created_at, status 
-        FROM tukakula_queries 
-        ORDER BY created_at DESC
-    """).fetchall()
+
+    # Header counters and facets come from the trigger-kept rollup; with a
+    # search, facets are grouped over the newest ADMIN_INQUIRY_FACET_MATCHES
+    # matches instead (approximate beyond that)
+    combinations = conn.execute(
+        "SELECT inquiry_target, service, reason, status, n FROM tukakula_query_facets WHERE n > 0"
+    ).fetchall()
+
+    # The rollup files NULL and empty values under '' (shown as "None"). An
+    # empty parameter selects that bucket only when it exists; otherwise it
+    # is a blank form field, not a filter
+    filters = {}
+    for name in INQUIRY_FACETS:
+        value = request.args.get(name)
+        if value or (value == '' and any(row[name] == '' for row in combinations)):
+            filters[name] = value
+
+    # A search walks the index newest-first (its rowids follow the inbox's
+    # insertion order) and stops after one page, however common the words;
+    # ordering by created_at would sort every match first
+    where, params = [], []
+    if match is not None:
+        source = "tukakula_queries_fts f JOIN tukakula_queries t ON t.id = f.query_id"
+        where.append("tukakula_queries_fts MATCH ?")
+        params.append(match)
+        order_by = [("f.rowid", "row_key")]
+    else:
+        source = "tukakula_queries t"
+        order_by = [("t.created_at", "created_at"), ("t.rowid", "row_key")]
+    for name, value in filters.items():
+        if value == '':
+            # Both halves are answered by the facet's index
+            where.append(f"(t.{name} IS NULL OR t.{name} = '')")
+        else:
+            where.append(f"t.{name} = ?")
+            params.append(value)
+    where.append("{keyset}")
+
+    queries = keyset_paginate(
+        conn,
+        f"""
+        SELECT {order_by[-1][0]} AS row_key, t.id, t.full_name, t.company_name, t.email, t.phone, t.whatsapp,
+               t.inquiry_target, t.service, t.subject, t.reason, t.message,
+               t.created_at, t.status
+        FROM {source}
+        WHERE {' AND '.join(where)}
+        """,
+        params=params,
+        order_by=order_by,
+        cursor=request.args.get('cursor'),
+        limit=page_size(),
+    )
+
+    stats = {'total': 0, 'new': 0, 'resolved': 0}
+    for row in combinations:
+        stats['total'] += row['n']
+        if row['status'] in ('new', 'resolved'):
+            stats[row['status']] += row['n']
+    floor = 0
+    if match is not None:
+        floor = candidate_floor(
+            conn, "tukakula_queries_fts", match, current_app.config.get('ADMIN_INQUIRY_FACET_MATCHES', 1000)
+        )
+        combinations = conn.execute("""
+            SELECT COALESCE(t.inquiry_target, '') AS inquiry_target, COALESCE(t.service, '') AS service,
+                   COALESCE(t.reason, '') AS reason, COALESCE(t.status, '') AS status, COUNT(*) AS n
+            FROM tukakula_queries_fts f
+            JOIN tukakula_queries t ON t.id = f.query_id
+            WHERE tukakula_queries_fts MATCH ? AND f.rowid >= ?
+            GROUP BY 1, 2, 3, 4
+        """, (match, floor)).fetchall()
+    facets, matching = facet_counts(combinations, filters)
+
     conn.close()
-    return render_template("admin_tukakula_queries.html", queries=queries)
+    return render_template(
+        "admin_tukakula_queries.html", queries=queries, page=queries, stats=stats,
+        facets=facets, filters=filters, matching=matching, approximate=floor > 0, q=q,
+    )
+
+
+def facet_counts(combinations, filters):
+    """
+    {facet: [(value, count)]} for the inbox sidebar, each facet counted
+    under every active filter but its own (so its other values stay
+    clickable), plus the number of inquiries matching all filters.
+    """
+    facets = {name: {} for name in INQUIRY_FACETS}
+    matching = 0
+    for row in combinations:
+        misses = [name for name, value in filters.items() if row[name] != value]
+        if not misses:
+            matching += row['n']
+        for name in INQUIRY_FACETS:
+            if not misses or misses == [name]:
+                facets[name][row[name]] = facets[name].get(row[name], 0) + row['n']
+    return {
+        name: sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        for name, counts in facets.items()
+    }, matching
 
 # ------------------------------
 # Toggle Status (FIXED ROUTE TYPE)
@@ -394,4 +631,21 @@ def delete_inquiry(query_id):
     conn.commit()
     conn.close()
     flash("Inquiry deleted successfully!", "success")
-    return redirect(url_for('admin.tukakula_queries'))
\ No newline at end of file
+    return redirect(url_for('admin.tukakula_queries'))
+
+# ------------------------------
+# Metrics (Prometheus text format)
+# ------------------------------
+@admin_bp.route('/metrics')
+def metrics():
+    # Admin session, or the scraper's bearer token
+    token = current_app.config.get('METRICS_TOKEN')
+    auth = request.headers.get('Authorization', '')
+    scraper = bool(token) and hmac.compare_digest(auth.encode(), f"Bearer {token}".encode())
+    if not scraper and session.get('role') not in ('admin', 'super_admin'):
+        abort(403)
+
+    collector = current_app.extensions.get('metrics')
+    if collector is None:
+        abort(404)
+    return Response(render_prometheus(collector.collect()), mimetype='text/plain; version=0.0.4')
@@ -1,12 +1,19 @@
 # app.py
 from flask import Flask
 from config.settings import Config
-from utils.database import initialize_db
+from utils.database import initialize_db, init_app as init_db
+from utils.assets import init_app as init_assets
+from utils.metrics import init_app as init_metrics
+from utils.profiler import init_app as init_profiler
 from request_logger import log_requests
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    init_db(app)
+    init_metrics(app)
+    init_profiler(app)
+    init_assets(app)
 
     with app.app_context():
         initialize_db()
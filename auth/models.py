@@ -1,21 +1,15 @@
 # auth/models.py
 
 from utils.database import get_db_connection
+from utils.migrations import migrate
 
 def create_users_table():
     """
-    Create a universal users table for all roles (super_admin, blog_admin, finance_admin, client)
+    Ensure the universal users table exists for all roles (super_admin, blog_admin, finance_admin, client).
+    The schema itself lives in utils/migrations.py.
     """
     conn = get_db_connection()
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            role TEXT DEFAULT 'client',
-            is_active INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    conn.commit()
-    conn.close()
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,98 @@
+"""
+Loan submission benchmark: per-helper commits vs. one unit of work.
+
+"legacy" replays the old finance.loans flow, where every helper opens its
+own connection and commits, with one commit per attachment. "unit_of_work"
+runs the same inserts through utils.database.transaction() with batched
+attachments and a single commit. Files are not written; this measures the
+database side only.
+
+    python -m benchmarks.bench_loan_submission --submissions 50 --attachments 12
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+FORM = {
+    "ind-amt": "2,500",
+    "ind-period": "30",
+    "ind-name": "Bench Applicant",
+    "ind-purpose": "Stock",
+    "ind-dob": "1990-01-01",
+    "ind-nrc": "123456/10/1",
+    "ind-email": "bench@example.com",
+    "ind-phone": "+260970000000",
+    "ind-address": "Lusaka",
+}
+
+COLLATERAL = [
+    {"name": "car", "type": "personal", "value": 0, "condition": "good"},
+    {"name": "tv", "type": "personal", "value": 0, "condition": "good"},
+]
+
+
+def attachment_rows(count, application_number):
+    return [
+        ("General Attachment", f"doc{i}.pdf", f"uploads/loans/{application_number}/doc{i}.pdf")
+        for i in range(count)
+    ]
+
+
+def legacy_submission(db, user_id, attachments):
+    application_id, number = db.create_loan_application(user_id, "personal")
+    db.save_personal_loan_details(application_id, FORM)
+    db.save_collateral_items(application_id, "personal", COLLATERAL)
+    conn = db.get_db_connection()
+    conn.execute(
+        "UPDATE loan_applications SET total_repayment=?, updated_date=CURRENT_TIMESTAMP WHERE id=?",
+        (db.calculate_total_repayment(2500), application_id),
+    )
+    conn.commit()
+    conn.close()
+    for category, filename, path in attachment_rows(attachments, number):
+        db.save_application_attachments(application_id, category, filename, path)
+
+
+def unit_of_work_submission(db, user_id, attachments):
+    number = db.generate_application_number("personal")
+    with db.transaction() as conn:
+        application_id, _ = db.create_loan_application(
+            user_id, "personal", conn=conn, application_number=number
+        )
+        db.save_personal_loan_details(application_id, FORM, conn=conn)
+        db.save_collateral_items(application_id, "personal", COLLATERAL, conn=conn)
+        conn.execute(
+            "UPDATE loan_applications SET total_repayment=?, updated_date=CURRENT_TIMESTAMP WHERE id=?",
+            (db.calculate_total_repayment(2500), application_id),
+        )
+        db.save_application_attachments_many(application_id, attachment_rows(attachments, number), conn=conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--submissions", type=int, default=50)
+    parser.add_argument("--attachments", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        from utils import database as db
+        db.DB_PATH = os.path.join(tmp, "bench.db")
+        db.initialize_db()
+        user_id = db.create_user("bench@example.com", "bench-password")
+
+        print(f"{'path':<14}{'mean ms':>10}{'p95 ms':>10}{'total s':>10}")
+        for name, submit in (("legacy", legacy_submission), ("unit_of_work", unit_of_work_submission)):
+            timings = []
+            for _ in range(args.submissions):
+                started = time.perf_counter()
+                submit(db, user_id, args.attachments)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{name:<14}{statistics.mean(timings) * 1000:>10.2f}{p95 * 1000:>10.2f}{sum(timings):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Read/write concurrency benchmark for the SQLite PRAGMA profiles.
+
+Runs reader processes (market place + blog listing queries) next to writer
+processes (contact-form inserts) against a throwaway copy of the schema,
+once per profile, and prints throughput, read latency and lock errors.
+
+    python -m benchmarks.bench_pragmas --readers 4 --writers 2 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+READ_QUERIES = [
+    "SELECT * FROM products WHERE is_active = 1 ORDER BY created_at DESC",
+    "SELECT id, title, content, image, created_at FROM blogs ORDER BY created_at DESC",
+]
+
+INSERT_QUERY = """
+    INSERT INTO tukakula_queries (
+        id, full_name, email, inquiry_target, reason, message, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def build_database(path):
+    os.environ["DATABASE_PATH"] = path
+    from utils import database
+    database.DB_PATH = path
+    database.initialize_db()
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO products (name, description, price, is_active) VALUES (?, ?, ?, 1)",
+        [(f"Product {i}", "x" * 400, i * 10.0) for i in range(500)],
+    )
+    conn.executemany(
+        "INSERT INTO blogs (title, content) VALUES (?, ?)",
+        [(f"Post {i}", "y" * 2000) for i in range(200)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def connect(path, profile):
+    from utils.database import PRAGMA_PROFILES, apply_pragmas
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    apply_pragmas(conn, PRAGMA_PROFILES[profile])
+    return conn
+
+
+def reader(path, profile, seconds, results):
+    conn = connect(path, profile)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for query in READ_QUERIES:
+            started = time.perf_counter()
+            try:
+                conn.execute(query).fetchall()
+                latencies.append(time.perf_counter() - started)
+            except sqlite3.OperationalError:
+                errors += 1
+    conn.close()
+    results.put(("read", latencies, errors))
+
+
+def writer(path, profile, seconds, results):
+    conn = connect(path, profile)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.execute(INSERT_QUERY, (
+                str(uuid.uuid4()), "Bench", "bench@example.com", "finance",
+                "benchmark", "m" * 1000, datetime.now(timezone.utc).isoformat(),
+            ))
+            conn.commit()
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            conn.rollback()
+            errors += 1
+    conn.close()
+    results.put(("write", latencies, errors))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_profile(profile, readers, writers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_database(path)
+
+        ctx = multiprocessing.get_context("fork")
+        results = ctx.Queue()
+        procs = [ctx.Process(target=reader, args=(path, profile, seconds, results)) for _ in range(readers)]
+        procs += [ctx.Process(target=writer, args=(path, profile, seconds, results)) for _ in range(writers)]
+        for p in procs:
+            p.start()
+        collected = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+    summary = {}
+    for kind in ("read", "write"):
+        latencies = [l for k, ls, _ in collected if k == kind for l in ls]
+        errors = sum(e for k, _, e in collected if k == kind)
+        summary[kind] = {
+            "ops_per_sec": len(latencies) / seconds,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "max_ms": max(latencies, default=0) * 1000,
+            "lock_errors": errors,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--profiles", nargs="+", default=["default", "production"])
+    args = parser.parse_args()
+
+    print(f"{'profile':<12}{'kind':<7}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'locked':>8}")
+    for profile in args.profiles:
+        summary = run_profile(profile, args.readers, args.writers, args.seconds)
+        for kind, row in summary.items():
+            print(f"{profile:<12}{kind:<7}{row['ops_per_sec']:>10.0f}{row['p50_ms']:>10.2f}"
+                  f"{row['p95_ms']:>10.2f}{row['max_ms']:>10.2f}{row['lock_errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
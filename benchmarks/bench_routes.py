@@ -0,0 +1,230 @@
+"""
+Route benchmark: the hot routes of every blueprint through the test client.
+
+Builds the app with create_app() against a throwaway database filled by
+benchmarks.generate_data (and throwaway upload, log and metrics
+directories), then requests each route in
+ROUTES as the right kind of user. Per route it reports mean and p95 latency,
+SQL queries per request (from the SQL profiler's X-SQL-Queries header) and
+peak Python allocations per request (tracemalloc, measured in a separate
+pass so it does not skew the timings).
+
+Results can be saved as JSON and compared with a stored baseline. A route
+regresses when its p95 or allocations grow by more than --threshold, when it
+runs more queries or when its status code changes; any regression makes the
+exit status 1.
+
+    python -m benchmarks.bench_routes --scale 1 --requests 50
+    python -m benchmarks.bench_routes --save benchmarks/baseline.json
+    python -m benchmarks.bench_routes --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+P95_NOISE_MS = 0.5  # p95 changes smaller than this are never regressions
+
+# name -> (method, url, session, form data); "{...}" fields come from pick_ids()
+ROUTES = {
+    "market_place.home": ("GET", "/market_place/", None, None),
+    "market_place.products": ("GET", "/market_place/products?q=business&status=available&sort=price_asc", None, None),
+    "market_place.product_detail": ("GET", "/market_place/product/{product_id}", None, None),
+    "blog.blog_home": ("GET", "/blog/", None, None),
+    "blog.blog_detail": ("GET", "/blog/{blog_id}", "client", None),
+    "blog.blog_search": ("GET", "/blog/search?q=business+loan", None, None),
+    "finance.my_loans": ("GET", "/finance/my-loans", "client", None),
+    "finance.client_dashboard": ("GET", "/finance/dashboard", "client", None),
+    "admin.list_loans": ("GET", "/admin/loans", "admin", None),
+    "admin.filter_loans": ("GET", "/admin/loans/filter?status=pending&loan_type=personal", "admin", None),
+    "admin.view_loan": ("GET", "/admin/loans/{loan_id}", "admin", None),
+    "admin.tukakula_queries": ("GET", "/admin/tukakula/queries", "admin", None),
+    "core.contact (POST)": ("POST", "/contact", None, {
+        "full_name": "Bench Visitor", "email": "visitor@example.com", "inquiry_target": "finance",
+        "reason": "quote", "message": "Benchmark inquiry " * 20,
+    }),
+    "developers.contact (POST)": ("POST", "/developers/contact", None, {
+        "full_name": "Bench Visitor", "email": "visitor@example.com", "project_type": "website",
+        "message": "Benchmark project " * 20,
+    }),
+    "market_place.product_inquiry (POST)": ("POST", "/market_place/product/{product_id}", "client", {
+        "phone": "+260970000000", "message": "Is this still available?",
+    }),
+}
+
+def pick_ids(path):
+    """URL ids and sessions: the busiest product, post and loan, the heaviest borrower."""
+    conn = sqlite3.connect(path)
+    one = lambda sql: conn.execute(sql).fetchone()[0]
+    ids = {
+        "product_id": one("SELECT product_id FROM product_inquiries GROUP BY product_id ORDER BY COUNT(*) DESC LIMIT 1"),
+        "blog_id": one("SELECT blog_id FROM comments GROUP BY blog_id ORDER BY COUNT(*) DESC LIMIT 1"),
+        "loan_id": one("SELECT application_id FROM application_attachments GROUP BY application_id ORDER BY COUNT(*) DESC LIMIT 1"),
+    }
+    admin = conn.execute("SELECT id, email FROM users WHERE role = 'super_admin' ORDER BY id LIMIT 1").fetchone()
+    client = conn.execute("""
+        SELECT u.id, u.email FROM loan_applications la JOIN users u ON u.id = la.user_id
+        WHERE u.role = 'user' GROUP BY u.id ORDER BY COUNT(*) DESC LIMIT 1
+    """).fetchone()
+    conn.close()
+    sessions = {
+        "admin": {"user_id": admin[0], "role": "super_admin", "user_email": admin[1]},
+        "client": {"user_id": client[0], "role": "user", "user_email": client[1]},
+    }
+    return ids, sessions
+
+
+# ==================================================
+# MEASUREMENT
+# ==================================================
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def make_request(client, method, url, session, data):
+    with client.session_transaction() as sess:
+        sess.clear()
+        sess.update(session)
+    return client.open(url, method=method, data=data)
+
+
+def bench_route(client, route, ids, sessions, requests, warmup):
+    method, url, session, data = route
+    url = url.format(**ids)
+    session = sessions.get(session, {})
+
+    for _ in range(warmup):
+        response = make_request(client, method, url, session, data)
+
+    timings, queries = [], []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = make_request(client, method, url, session, data)
+        timings.append(time.perf_counter() - started)
+        queries.append(int(response.headers.get("X-SQL-Queries", 0)))
+
+    # Allocations in their own pass: tracemalloc slows everything down
+    allocations = []
+    tracemalloc.start()
+    for _ in range(max(3, requests // 10)):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        make_request(client, method, url, session, data)
+        allocations.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return {
+        "status": response.status_code,
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "p95_ms": round(percentile(timings, 95) * 1000, 3),
+        "queries": max(queries),
+        "alloc_kb": round(statistics.median(allocations) / 1024, 1),
+    }
+
+
+def run(scale, requests, warmup, only=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before anything reads the config: every path the app writes to
+        os.environ.update({
+            "DATABASE_PATH": os.path.join(tmp, "bench.db"),
+            "BLOB_STORAGE_PATH": os.path.join(tmp, "blobs"),
+            "UPLOAD_SPOOL_PATH": os.path.join(tmp, "spool"),
+            "METRICS_DIR": os.path.join(tmp, "metrics"),
+            "REQUEST_LOG_PATH": os.path.join(tmp, "requests.jsonl"),
+            "SQL_PROFILER_LOG_PATH": os.path.join(tmp, "sql_profile.jsonl"),
+            "SQL_PROFILER": "1",
+        })
+        from app import create_app
+        from benchmarks.generate_data import generate
+
+        app = create_app()
+        generate(os.environ["DATABASE_PATH"], scale, files=False)
+        ids, sessions = pick_ids(os.environ["DATABASE_PATH"])
+        client = app.test_client()
+
+        print(f"\n{'route':<38}{'code':>5}{'mean ms':>10}{'p95 ms':>10}{'queries':>9}{'alloc KB':>11}")
+        results = {}
+        for name, route in ROUTES.items():
+            if only and name not in only:
+                continue
+            results[name] = bench_route(client, route, ids, sessions, requests, warmup)
+            row = results[name]
+            print(f"{name:<38}{row['status']:>5}{row['mean_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                  f"{row['queries']:>9}{row['alloc_kb']:>11.1f}")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print deltas against a baseline; returns the names of regressed routes."""
+    regressions = []
+    print(f"\n{'route':<38}{'p95 ms':>10}{'base':>10}{'delta':>9}{'queries':>9}{'alloc KB':>11}")
+    for name, row in results.items():
+        base = baseline["routes"].get(name)
+        if base is None:
+            print(f"{name:<38}{row['p95_ms']:>10.2f}{'new':>10}")
+            continue
+        delta = (row["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        flags = []
+        if row["status"] != base["status"]:
+            flags.append(f"status {base['status']}->{row['status']}")
+        if delta > threshold and row["p95_ms"] - base["p95_ms"] > P95_NOISE_MS:
+            flags.append("p95")
+        if row["queries"] > base["queries"]:
+            flags.append("queries")
+        if base["alloc_kb"] and (row["alloc_kb"] - base["alloc_kb"]) / base["alloc_kb"] > threshold:
+            flags.append("alloc")
+        if flags:
+            regressions.append(name)
+        print(f"{name:<38}{row['p95_ms']:>10.2f}{base['p95_ms']:>10.2f}{delta:>+9.0%}"
+              f"{row['queries']:>5}/{base['queries']:<3}{row['alloc_kb']:>11.1f}"
+              f"{'  REGRESSED: ' + ', '.join(flags) if flags else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=float, default=1, help="generate_data scale factor")
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--route", action="append", help="only this route (repeatable)")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative p95/alloc growth")
+    args = parser.parse_args()
+
+    results = run(args.scale, args.requests, args.warmup, only=args.route)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {
+                    "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "scale": args.scale,
+                    "requests": args.requests,
+                    "python": platform.python_version(),
+                    "sqlite": sqlite3.sqlite_version,
+                },
+                "routes": results,
+            }, f, indent=2, sort_keys=True)
+        print(f"--- saved {args.save} ---")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"--- {len(regressions)} routes regressed ---")
+            sys.exit(1)
+        print("--- no regressions ---")
+
+
+if __name__ == "__main__":
+    main()
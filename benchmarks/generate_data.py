@@ -0,0 +1,444 @@
+"""
+Synthetic data generator: fills the schema at a chosen scale factor.
+
+Every table a page reads gets correlated rows: users; loan applications
+with their personal or business details, collateral and attachments;
+products with images and inquiries; blogs with comments; and
+tukakula_queries. Loans cluster on a few heavy borrowers. Decisions come
+after applications, comments after their post, and so on. ROWS_PER_SCALE
+is one unit of --scale. Scale 1000 is roughly 4 million rows.
+
+Rows are generated lazily and inserted with executemany in --batch sized
+chunks, one transaction per table, with synchronous=OFF for the load.
+Attachments point at a few small placeholder documents in the blob store.
+Product and blog images point at a few placeholder PNGs under
+static/uploads. Files are shared, so disk use does not grow with scale.
+
+The target must be empty (after migrations) unless --append is given:
+
+    python -m benchmarks.generate_data --scale 10 --database /tmp/bench.db
+    python -m benchmarks.generate_data --scale 1000 --database /tmp/big.db --batch 100000
+"""
+import argparse
+import hashlib
+import itertools
+import os
+import random
+import sqlite3
+import struct
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+
+ROWS_PER_SCALE = {
+    "users": 100,
+    "loan_applications": 300,  # + one detail row, 0-3 collateral items, 1-6 attachments each
+    "products": 50,            # + 1-4 images each
+    "product_inquiries": 200,
+    "blogs": 20,
+    "comments": 1000,
+    "tukakula_queries": 500,
+}
+
+HISTORY_DAYS = 3 * 365
+PLACEHOLDER_DOCUMENTS = 16
+PLACEHOLDER_IMAGES = 12
+PASSWORD = "synthetic-password"  # every generated user's password
+
+FIRST_NAMES = ["Chanda", "Mwila", "Bwalya", "Mutale", "Natasha", "Joseph", "Grace", "Kelvin",
+               "Ruth", "Mapalo", "Chilufya", "Thandiwe", "Emmanuel", "Precious", "Musonda", "Lweendo"]
+LAST_NAMES = ["Banda", "Phiri", "Mwale", "Tembo", "Zulu", "Mulenga", "Lungu", "Sakala",
+              "Chileshe", "Daka", "Ngoma", "Kabwe", "Mumba", "Simwanza", "Hamoonga", "Kunda"]
+WORDS = ("loan business growth market capital savings stock farm harvest season customer "
+         "supplier cash flow repayment interest budget expansion shop transport equipment "
+         "school fees community digital brand design website project support plan").split()
+
+LOAN_STATUSES = ["pending"] * 4 + ["missing_info"] + ["approved"] * 3 + ["rejected"] * 2
+PERSONAL_ATTACHMENTS = ["ID Copy", "Proof of Residence", "Proof of Income", "General Attachment"]
+BUSINESS_ATTACHMENTS = ["Business Registration", "Tax Certificate", "Financial Statements",
+                        "Bank Statements", "Director ID", "Business Address Proof",
+                        "Collateral Documents", "General Attachment"]
+COLLATERAL_ITEMS = ["Car", "Television", "Fridge", "Laptop", "Land title", "Motorbike",
+                    "Livestock", "Sewing machine", "Generator", "Solar panels"]
+QUERY_TOPICS = {
+    "service": [("developers", "support"), ("developers", "consultation"), ("finance", "consultation"),
+                ("advisory", "partnership"), ("brand", "pricing")],
+    "developers": [("developers", "mobile"), ("developers", "web_app")],
+}
+
+
+# ==================================================
+# PLACEHOLDER FILES
+# ==================================================
+def _png(width, height, rgb):
+    """A solid-colour RGB PNG, built without Pillow."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    row = b"\x00" + bytes(rgb) * width
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(row * height, 9))
+            + chunk(b"IEND", b""))
+
+
+def write_placeholder_images(rng, folder):
+    """[(filename, width, height)] of PLACEHOLDER_IMAGES PNGs under static/uploads/<folder>."""
+    from utils.database import UPLOAD_BASE
+
+    images = []
+    os.makedirs(os.path.join(UPLOAD_BASE, folder), exist_ok=True)
+    for n in range(PLACEHOLDER_IMAGES):
+        width, height = rng.choice([(800, 600), (600, 800), (800, 800)])
+        filename = f"synthetic_{n:02d}.png"
+        with open(os.path.join(UPLOAD_BASE, folder, filename), "wb") as f:
+            f.write(_png(width, height, [rng.randint(40, 220) for _ in range(3)]))
+        images.append((filename, width, height))
+    return images
+
+
+def write_placeholder_documents(conn):
+    """[(digest, relpath)] of PLACEHOLDER_DOCUMENTS small PDFs placed in the blob store."""
+    from utils.blobs import blob_path, blob_relpath
+
+    documents = []
+    for n in range(PLACEHOLDER_DOCUMENTS):
+        content = (b"%PDF-1.4\n% synthetic placeholder " + str(n).encode()
+                   + b"\n" + b"0" * (1024 * (n + 1)) + b"\n%%EOF\n")
+        digest = hashlib.sha256(content).hexdigest()
+        path = blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+        conn.execute("INSERT OR IGNORE INTO blobs (digest, size) VALUES (?, ?)", (digest, len(content)))
+        documents.append((digest, blob_relpath(digest)))
+    return documents
+
+
+# ==================================================
+# ROW GENERATORS
+# ==================================================
+def stamp(moment):
+    """Same text as SQLite's CURRENT_TIMESTAMP."""
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class Generator:
+    """Row generators for one run; ids continue after whatever is already there."""
+
+    def __init__(self, conn, scale, seed, now):
+        self.rng = random.Random(seed)
+        self.now = now
+        self.counts = {table: int(per_unit * scale) for table, per_unit in ROWS_PER_SCALE.items()}
+        self.first_id = {
+            table: (conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0) + 1
+            for table in ("users", "loan_applications", "products", "blogs")
+        }
+        self.user_ids = range(self.first_id["users"], self.first_id["users"] + self.counts["users"])
+        self.admin_id = self.user_ids[0]
+        # Borrowing is skewed: a few heavy borrowers, a long tail with one loan
+        self.borrower_weights = [1 / (rank + 1) for rank in range(len(self.user_ids))]
+        self.product_created = {}
+        self.blog_created = {}
+
+    def when(self, after=None):
+        start = after or self.now - timedelta(days=HISTORY_DAYS)
+        return start + timedelta(seconds=int(self.rng.uniform(0, (self.now - start).total_seconds())))
+
+    def words(self, low, high):
+        return " ".join(self.rng.choices(WORDS, k=self.rng.randint(low, high)))
+
+    def person(self, user_id):
+        first = FIRST_NAMES[user_id % len(FIRST_NAMES)]
+        last = LAST_NAMES[(user_id // len(FIRST_NAMES)) % len(LAST_NAMES)]
+        return f"{first} {last}", f"{first}.{last}{user_id}@example.com".lower()
+
+    def users(self):
+        from werkzeug.security import generate_password_hash
+
+        hashed = generate_password_hash(PASSWORD)  # once: hashing is deliberately slow
+        for user_id in self.user_ids:
+            role = "super_admin" if user_id == self.admin_id else "user"
+            yield user_id, self.person(user_id)[1], hashed, role, stamp(self.when())
+
+    def loans(self):
+        """(application, detail, collateral rows, attachment rows) per loan."""
+        rng = self.rng
+        first = self.first_id["loan_applications"]
+        borrowers = rng.choices(self.user_ids, weights=self.borrower_weights, k=self.counts["loan_applications"])
+        for application_id, user_id in enumerate(borrowers, first):
+            loan_type = "business" if rng.random() < 0.3 else "personal"
+            status = rng.choice(LOAN_STATUSES)
+            applied = self.when()
+            decided = self.when(applied) if status in ("approved", "rejected") else None
+            applied_at, decided_at = stamp(applied), decided and stamp(decided)
+            amount = round(rng.lognormvariate(8.5, 1.0), -1) + 100
+            days = rng.choice([30, 60, 90, 180, 365])
+            prefix = "PERS" if loan_type == "personal" else "BUS"
+            application = (
+                application_id, f"{prefix}-{applied:%Y%m%d%H%M%S}-{application_id:06X}", loan_type, status,
+                user_id, round(amount * 1.3, 2), "Reviewed." if decided else None,
+                applied_at, applied_at, decided_at, self.admin_id if decided else None,
+            )
+
+            name, email = self.person(user_id)
+            if loan_type == "personal":
+                detail = (
+                    application_id, amount, self.words(2, 6), days, name,
+                    f"{rng.randint(1960, 2004)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                    f"{rng.randint(100000, 999999)}/{rng.randint(10, 99)}/1", email,
+                    f"+26097{rng.randint(1000000, 9999999)}", f"Plot {rng.randint(1, 9999)}, Lusaka", 1, applied_at,
+                )
+            else:
+                detail = (
+                    application_id, f"{LAST_NAMES[user_id % len(LAST_NAMES)]} Trading {application_id}",
+                    f"PACRA-{application_id:08d}", amount, self.words(2, 6), days, name, email,
+                    f"+26096{rng.randint(1000000, 9999999)}", "Director", f"Stand {rng.randint(1, 9999)}, Ndola",
+                    rng.randint(0, 25), round(amount * rng.uniform(0.2, 3), 2), 1, applied_at,
+                )
+
+            collateral = [
+                (application_id, loan_type, rng.choice(COLLATERAL_ITEMS), loan_type,
+                 round(amount * rng.uniform(0.2, 1.5), 2), rng.choice(["new", "good", "fair", "worn"]), applied_at)
+                for _ in range(rng.randint(0, 3))
+            ]
+            labels = PERSONAL_ATTACHMENTS if loan_type == "personal" else BUSINESS_ATTACHMENTS
+            attachments = [
+                (application_id, label, f"{label.lower().replace(' ', '_')}_{n}.pdf", applied_at)
+                for n, label in enumerate(rng.choices(labels, k=rng.randint(1, 6)))
+            ]
+            yield loan_type, application, detail, collateral, attachments
+
+    def products(self):
+        rng = self.rng
+        first = self.first_id["products"]
+        for product_id in range(first, first + self.counts["products"]):
+            created = self.when()
+            self.product_created[product_id] = created
+            yield (
+                product_id, f"{self.words(1, 3).title()} {product_id}", self.words(20, 120),
+                round(rng.lognormvariate(7, 1.2), 2), "sold" if rng.random() < 0.2 else "available",
+                int(rng.random() < 0.9), self.admin_id, stamp(created),
+            )
+
+    def product_inquiries(self):
+        rng = self.rng
+        product_ids = list(self.product_created)
+        for _ in range(self.counts["product_inquiries"]):
+            product_id = rng.choice(product_ids)
+            user_id = rng.choice(self.user_ids) if rng.random() < 0.7 else None
+            name, email = self.person(user_id or rng.randint(1, 10 ** 6))
+            yield (
+                product_id, user_id, name, email, f"+26097{rng.randint(1000000, 9999999)}",
+                round(rng.uniform(10, 5000), 2) if rng.random() < 0.3 else None,
+                self.words(5, 40), stamp(self.when(self.product_created[product_id])),
+            )
+
+    def blogs(self, images):
+        rng = self.rng
+        first = self.first_id["blogs"]
+        for blog_id in range(first, first + self.counts["blogs"]):
+            created = self.when()
+            self.blog_created[blog_id] = created
+            yield (
+                blog_id, self.words(3, 9).capitalize(), self.words(200, 2000),
+                rng.choice(images)[0] if images else None,
+                "draft" if rng.random() < 0.1 else "published", self.admin_id, stamp(created),
+            )
+
+    def comments(self):
+        rng = self.rng
+        blog_ids = list(self.blog_created)
+        for _ in range(self.counts["comments"]):
+            blog_id = rng.choice(blog_ids)
+            yield blog_id, rng.choice(self.user_ids), self.words(3, 60), stamp(self.when(self.blog_created[blog_id]))
+
+    def tukakula_queries(self):
+        rng = self.rng
+        for _ in range(self.counts["tukakula_queries"]):
+            name, email = self.person(rng.randint(1, 10 ** 6))
+            target = "service" if rng.random() < 0.7 else "developers"
+            service, reason = rng.choice(QUERY_TOPICS[target])
+            created = self.when()
+            yield (
+                str(uuid.UUID(int=rng.getrandbits(128), version=4)), name,
+                f"{name.split()[1]} Holdings" if rng.random() < 0.4 else "", email,
+                f"+26097{rng.randint(1000000, 9999999)}", "", target, service,
+                self.words(2, 6).capitalize(), reason, self.words(10, 150),
+                "resolved" if rng.random() < 0.6 else "new", created.isoformat() + "+00:00",
+            )
+
+
+# ==================================================
+# BULK LOAD
+# ==================================================
+def insert_many(conn, sql, rows, batch):
+    """executemany in chunks of batch rows; returns the number of rows inserted."""
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, batch))
+        if not chunk:
+            return total
+        conn.executemany(sql, chunk)
+        total += len(chunk)
+
+
+def load_loans(conn, gen, documents, batch):
+    counts = dict.fromkeys(
+        ("loan_applications", "personal_loan_details", "business_loan_details",
+         "collateral_items", "application_attachments"), 0
+    )
+    sql = {
+        "loan_applications": """
+            INSERT INTO loan_applications (id, application_number, loan_type, status, user_id, total_repayment,
+                admin_notes, applied_date, updated_date, decision_date, decision_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        "personal_loan_details": """
+            INSERT INTO personal_loan_details (application_id, loan_amount, purpose, repayment_period_days,
+                full_name, date_of_birth, nrc_number, email, phone_number, residential_address,
+                terms_accepted, agreement_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        "business_loan_details": """
+            INSERT INTO business_loan_details (application_id, business_name, business_registration_number,
+                loan_amount, purpose, repayment_period_days, contact_person_name, contact_email, contact_phone,
+                contact_person_position, business_address, business_years, monthly_revenue,
+                terms_accepted, agreement_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        "collateral_items": """
+            INSERT INTO collateral_items (application_id, loan_type, item_name, item_type, estimated_value,
+                condition_description, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        "application_attachments": """
+            INSERT INTO application_attachments (application_id, document_category, file_name, file_path,
+                digest, uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?)""",
+    }
+
+    # Each loan yields rows for five tables; buffer them and flush together
+    buffers = {table: [] for table in counts}
+    rng = gen.rng
+    for loan_type, application, detail, collateral, attachments in gen.loans():
+        buffers["loan_applications"].append(application)
+        buffers[f"{loan_type}_loan_details"].append(detail)
+        buffers["collateral_items"].extend(collateral)
+        for application_id, label, filename, uploaded in attachments:
+            digest, relpath = rng.choice(documents)
+            buffers["application_attachments"].append((application_id, label, filename, relpath, digest, uploaded))
+        if len(buffers["loan_applications"]) >= batch:
+            _flush(conn, sql, buffers, counts)
+    _flush(conn, sql, buffers, counts)
+    return counts
+
+
+def _flush(conn, sql, buffers, counts):
+    for table, rows in buffers.items():  # parents first: dict order matches sql
+        if rows:
+            conn.executemany(sql[table], rows)
+            counts[table] += len(rows)
+            rows.clear()
+
+
+def generate(database_path, scale, seed=42, batch=50000, append=False, files=True):
+    """Fill database_path (migrated first); returns {table: rows inserted}."""
+    from utils import database as db
+
+    db.DB_PATH = database_path
+    db.initialize_db()
+
+    conn = sqlite3.connect(database_path, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON")
+    # A bulk load into a file we can regenerate: trade durability for speed
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+    if not append and conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+        conn.close()
+        raise SystemExit(f"{database_path} already has users; pass --append to add to it")
+
+    gen = Generator(conn, scale, seed, datetime.now().replace(microsecond=0))
+    counts = {}
+    steps = [
+        ("users", lambda: insert_many(conn, """
+            INSERT INTO users (id, email, password, role, created_at) VALUES (?, ?, ?, ?, ?)
+        """, gen.users(), batch)),
+        ("products", lambda: insert_many(conn, """
+            INSERT INTO products (id, name, description, price, status, is_active, created_by, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, gen.products(), batch)),
+        ("product_images", lambda: insert_many(conn, """
+            INSERT INTO product_images (product_id, filename, position, width, height, is_primary)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            (product_id, filename, position, width, height, int(position == 0))
+            for product_id in gen.product_created
+            for position, (filename, width, height) in enumerate(
+                gen.rng.sample(product_images, min(len(product_images), gen.rng.randint(1, 4)))
+            )
+        ), batch)),
+        ("product_inquiries", lambda: insert_many(conn, """
+            INSERT INTO product_inquiries (product_id, user_id, name, email, phone, bid_price, message, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, gen.product_inquiries(), batch)),
+        ("blogs", lambda: insert_many(conn, """
+            INSERT INTO blogs (id, title, content, image, status, created_by, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, gen.blogs(blog_images), batch)),
+        ("comments", lambda: insert_many(conn, """
+            INSERT INTO comments (blog_id, user_id, content, created_at) VALUES (?, ?, ?, ?)
+        """, gen.comments(), batch)),
+        ("loans", lambda: load_loans(conn, gen, documents, batch)),
+        ("tukakula_queries", lambda: insert_many(conn, """
+            INSERT INTO tukakula_queries (id, full_name, company_name, email, phone, whatsapp, inquiry_target,
+                service, subject, reason, message, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, gen.tukakula_queries(), batch)),
+    ]
+
+    try:
+        with conn:
+            documents = write_placeholder_documents(conn) if files else [(None, "blobs/missing")]
+        product_images = write_placeholder_images(gen.rng, "products") if files else [("missing.png", 800, 600)]
+        blog_images = write_placeholder_images(gen.rng, "blogs") if files else []
+
+        for name, step in steps:
+            started = time.perf_counter()
+            with conn:  # one transaction per table
+                inserted = step()
+            for table, rows in (inserted.items() if isinstance(inserted, dict) else [(name, inserted)]):
+                counts[table] = rows
+                print(f"{table:<26}{rows:>12,}{time.perf_counter() - started:>9.1f}s")
+                started = time.perf_counter()
+
+        # Cached pages and catalogues were built from the old contents
+        with conn:
+            conn.execute("UPDATE cache_generations SET generation = generation + 1")
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=float, default=1, help="multiplier for ROWS_PER_SCALE")
+    parser.add_argument("--database", help="target database (default: DATABASE_PATH or portfolio.db)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch", type=int, default=50000, help="rows per executemany")
+    parser.add_argument("--append", action="store_true", help="add to a database that already has data")
+    parser.add_argument("--no-files", action="store_true", help="skip placeholder attachment and image files")
+    args = parser.parse_args()
+
+    if args.database is None:
+        from utils.database import DB_PATH
+        args.database = DB_PATH
+
+    started = time.perf_counter()
+    counts = generate(args.database, args.scale, args.seed, args.batch, args.append, not args.no_files)
+    print(f"--- {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s -> {args.database} ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -33,7 +33,7 @@ def blog_create():
     if request.method == 'POST':
         title = request.form.get('title')
         content = request.form.get('content')
-        author_id = session.get('user_id')
+        created_by = session.get('user_id')
 
         if not title or not content:
             flash('Title and content are required.', 'error')
@@ -41,8 +41,8 @@ def blog_create():
 
         conn = get_db_connection()
         conn.execute(
-            "INSERT INTO blogs (title, content, author_id) VALUES (?, ?, ?)",
-            (title, content, author_id)
+            "INSERT INTO blogs (title, content, created_by) VALUES (?, ?, ?)",
+            (title, content, created_by)
         )
         conn.commit()
         conn.close()
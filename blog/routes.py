@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from auth.decorators import login_required
-from utils.database import get_db_connection
+from utils.database import get_db_connection, get_recent_comments
+from utils.pagination import keyset_paginate
+from utils.derivatives import derivative_urls
+from utils.search import MARK_END, MARK_START, candidate_floor, marked, match_query
 
 blog_bp = Blueprint(
     'blog',
@@ -10,33 +13,101 @@ blog_bp = Blueprint(
 )
 
 # ------------------------------
-# Blog Home: list all blogs with comments
+# Blog Home: one page of blogs with their latest comments
 # ------------------------------
 @blog_bp.route('/', methods=['GET'])
 def blog_home():
     conn = get_db_connection()
-    blogs = conn.execute("""
-        SELECT id, title, content, image, created_at
+    page = keyset_paginate(
+        conn,
+        """
+        SELECT id, title, substr(content, 1, 2000) AS content, image, created_at
         FROM blogs
-        ORDER BY created_at DESC
-    """).fetchall()
+        WHERE {keyset}
+        """,
+        order_by=[("created_at", "created_at"), ("id", "id")],
+        cursor=request.args.get('cursor'),
+        limit=current_app.config.get('BLOG_PAGE_SIZE', 12),
+    )
 
-    blogs_with_comments = []
-    for blog in blogs:
-        comments = conn.execute("""
-            SELECT c.id, c.content, c.created_at, u.email AS user_email
-            FROM comments c
-            JOIN users u ON c.user_id = u.id
-            WHERE c.blog_id = ?
-            ORDER BY c.created_at ASC
-        """, (blog['id'],)).fetchall()
+    comments = get_recent_comments(
+        conn, [blog['id'] for blog in page], current_app.config.get('BLOG_INLINE_COMMENTS', 3)
+    )
 
+    blogs_with_comments = []
+    for blog in page:
         b = dict(blog)
-        b['comments'] = [dict(c) for c in comments]
+        b['comments'] = comments[blog['id']]['comments']
+        b['comment_count'] = comments[blog['id']]['total']
         blogs_with_comments.append(b)
 
+    images = derivative_urls(conn, "blogs", [blog['image'] for blog in page])
+
     conn.close()
-    return render_template("blog_home.html", blogs=blogs_with_comments)
+    return render_template("blog_home.html", blogs=blogs_with_comments, page=page, images=images)
+
+
+# ------------------------------
+# Blog Search: BM25-ranked matches from blogs_fts
+# ------------------------------
+@blog_bp.route('/search', methods=['GET'])
+def blog_search():
+    q = request.args.get('q', '').strip()
+    match = match_query(q)
+    if match is None:
+        return render_template("blog_search.html", q=q, results=[], page=None, images={})
+
+    conn = get_db_connection()
+    # Rank the newest matches only: bm25() runs once per candidate, so a
+    # word found in every post would otherwise rank the whole blog.
+    # rank is bm25() (lower is better), so pages run in ascending order.
+    floor = candidate_floor(
+        conn, "blogs_fts", match, current_app.config.get('BLOG_SEARCH_MAX_CANDIDATES', 1000)
+    )
+    page = keyset_paginate(
+        conn,
+        """
+        SELECT rowid AS id, rank
+        FROM blogs_fts
+        WHERE blogs_fts MATCH ? AND rowid >= ? AND {keyset}
+        """,
+        params=(match, floor),
+        order_by=[("rank", "rank"), ("rowid", "id")],
+        cursor=request.args.get('cursor'),
+        limit=current_app.config.get('BLOG_SEARCH_PAGE_SIZE', 10),
+        descending=False,
+    )
+
+    # Highlights and snippets for the page only
+    ids = [row['id'] for row in page]
+    found = {}
+    if ids:
+        rows = conn.execute(f"""
+            SELECT b.id, b.image, b.created_at,
+                   highlight(blogs_fts, 0, ?, ?) AS title,
+                   snippet(blogs_fts, 1, ?, ?, '…', ?) AS excerpt
+            FROM blogs_fts f
+            JOIN blogs b ON b.id = f.rowid
+            WHERE blogs_fts MATCH ? AND f.rowid IN ({', '.join('?' * len(ids))})
+        """, (
+            MARK_START, MARK_END, MARK_START, MARK_END,
+            current_app.config.get('BLOG_SEARCH_SNIPPET_TOKENS', 32),
+            match, *ids,
+        )).fetchall()
+        found = {row['id']: row for row in rows}
+
+    results = [
+        dict(
+            found[blog_id],
+            title=marked(found[blog_id]['title']),
+            excerpt=marked(found[blog_id]['excerpt'], html_source=True),
+        )
+        for blog_id in ids if blog_id in found
+    ]
+    images = derivative_urls(conn, "blogs", [blog['image'] for blog in results])
+
+    conn.close()
+    return render_template("blog_search.html", q=q, results=results, page=page, images=images)
 
 
 # ------------------------------
@@ -77,8 +148,10 @@ def blog_detail(blog_id):
         ORDER BY c.created_at ASC
     """, (blog_id,)).fetchall()
 
+    image = derivative_urls(conn, "blogs", [blog['image']]).get(blog['image'])
+
     conn.close()
-    return render_template('blog_detail.html', blog=blog, comments=comments)
+    return render_template('blog_detail.html', blog=blog, comments=comments, image=image)
 
 
 # ------------------------------
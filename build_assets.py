@@ -0,0 +1,128 @@
+"""
+Build fingerprinted, cache-forever copies of the bundled images.
+
+For every file under static/images this writes, into static/dist/images:
+  - a copy of the original named <stem>.<hash>.<ext>
+  - WebP renditions at each width in WIDTHS narrower than the source,
+    plus one at the source width
+
+Every output file is named after the hash of its own bytes, so a changed
+image (or changed encoder settings) always gets a new URL. The mapping is
+written to static/dist/manifest.json, which utils.assets reads to resolve
+asset_url() / asset_srcset() in templates. Unchanged sources are skipped.
+Run it on every deploy, before starting the app:
+
+    python build_assets.py
+    python build_assets.py --clean   # drop outputs of earlier builds
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+from utils.assets import DIST_DIR, MANIFEST_PATH, STATIC_DIR
+from utils.images import encode_image, open_image, resize_to_width
+
+SOURCE_DIRS = ["images"]
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+WIDTHS = (120, 480, 960, 1600)
+VARIANT_FORMAT = "WEBP"
+# Part of each source's build key: bump to force a rebuild with new settings
+BUILD_VERSION = 1
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def write_output(data, rel_dir, stem, ext):
+    """Write data under its content hash and return the dist-relative path."""
+    rel_path = f"{rel_dir}/{stem}.{digest(data)}.{ext}"
+    path = os.path.join(DIST_DIR, rel_path)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    return rel_path
+
+
+def build_entry(rel_source, source_bytes):
+    rel_dir, name = os.path.split(rel_source)
+    stem, ext = os.path.splitext(name)
+    image = open_image(os.path.join(STATIC_DIR, rel_source))
+
+    entry = {
+        "file": write_output(source_bytes, rel_dir, stem, ext.lstrip(".").lower()),
+        "width": image.width,
+        "height": image.height,
+        "variants": [],
+    }
+
+    widths = sorted({w for w in WIDTHS if w < image.width} | {image.width})
+    for width in widths:
+        data = encode_image(resize_to_width(image, width), VARIANT_FORMAT)
+        entry["variants"].append({
+            "file": write_output(data, rel_dir, f"{stem}.{width}w", "webp"),
+            "width": width,
+            "format": "webp",
+        })
+    return entry
+
+
+def iter_sources():
+    for source_dir in SOURCE_DIRS:
+        for root, _, files in os.walk(os.path.join(STATIC_DIR, source_dir)):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+
+
+def build(clean=False):
+    if clean and os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+
+    previous = {}
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH) as f:
+            previous = json.load(f)
+
+    manifest = {}
+    for rel_source in iter_sources():
+        with open(os.path.join(STATIC_DIR, rel_source), "rb") as f:
+            source_bytes = f.read()
+        build_key = f"{digest(source_bytes)}:{BUILD_VERSION}:{WIDTHS}"
+
+        old = previous.get(rel_source)
+        if old and old.get("build_key") == build_key and all(
+            os.path.exists(os.path.join(DIST_DIR, item["file"]))
+            for item in [old] + old["variants"]
+        ):
+            manifest[rel_source] = old
+            continue
+
+        entry = build_entry(rel_source, source_bytes)
+        entry["build_key"] = build_key
+        manifest[rel_source] = entry
+
+        sizes = ", ".join(
+            f"{v['width']}w {os.path.getsize(os.path.join(DIST_DIR, v['file'])) // 1024}KB"
+            for v in entry["variants"]
+        )
+        print(f"✅ {rel_source} ({len(source_bytes) // 1024}KB) -> {sizes}")
+
+    os.makedirs(DIST_DIR, exist_ok=True)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+    print(f"--- {len(manifest)} assets in {os.path.relpath(MANIFEST_PATH)} ---")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clean", action="store_true", help="remove static/dist before building")
+    args = parser.parse_args()
+    build(clean=args.clean)
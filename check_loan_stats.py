@@ -0,0 +1,82 @@
+"""
+Consistency check for user_loan_stats (finance.client_dashboard counters).
+
+Recounts loan_applications per user and compares the result with the
+trigger-maintained counters. Exits 1 when any user's counters drifted,
+unless --rebuild recomputes the whole table (in one transaction, so the
+dashboard never sees it half-built).
+
+    python check_loan_stats.py             # report drift
+    python check_loan_stats.py --rebuild   # report, then rebuild
+    python check_loan_stats.py --database /path/to/portfolio.db
+"""
+import argparse
+import os
+import sys
+
+COUNTERS = ("total", "pending", "approved", "rejected", "missing_info")
+
+# What the triggers should have produced, one row per user with loans
+EXPECTED_SQL = """
+    SELECT user_id, COUNT(*) AS total,
+           SUM(status IS 'pending') AS pending, SUM(status IS 'approved') AS approved,
+           SUM(status IS 'rejected') AS rejected, SUM(status IS 'missing_info') AS missing_info
+    FROM loan_applications WHERE user_id IS NOT NULL GROUP BY user_id
+"""
+
+
+def find_drift(conn):
+    """[(user_id, stored counters or None, expected counters or None)] for every mismatch."""
+    expected = {row[0]: tuple(row[1:]) for row in conn.execute(EXPECTED_SQL)}
+    stored = {
+        row[0]: tuple(row[1:])
+        for row in conn.execute(f"SELECT user_id, {', '.join(COUNTERS)} FROM user_loan_stats")
+    }
+    return [
+        (user_id, stored.get(user_id), expected.get(user_id))
+        for user_id in sorted(expected.keys() | stored.keys())
+        if stored.get(user_id) != expected.get(user_id)
+    ]
+
+
+def rebuild():
+    """Recompute every row under BEGIN IMMEDIATE; returns the number of users."""
+    from utils.database import transaction
+    with transaction() as db:
+        db.execute("DELETE FROM user_loan_stats")
+        return db.execute(
+            f"INSERT INTO user_loan_stats (user_id, {', '.join(COUNTERS)}) {EXPECTED_SQL}"
+        ).rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rebuild", action="store_true", help="recompute every user's counters")
+    parser.add_argument("--database", help="database path (default: DATABASE_PATH or portfolio.db)")
+    parser.add_argument("--limit", type=int, default=20, help="drifted users to print")
+    args = parser.parse_args()
+
+    if args.database:
+        os.environ["DATABASE_PATH"] = args.database
+    from utils.database import get_db_connection, initialize_db
+
+    initialize_db()
+    conn = get_db_connection()
+    drift = find_drift(conn)
+    conn.close()
+
+    if drift:
+        print(f"{'user':>8}  {'stored':<28}{'expected':<28}  ({', '.join(COUNTERS)})")
+        for user_id, stored, expected in drift[:args.limit]:
+            print(f"{user_id:>8}  {str(stored or '-'):<28}{str(expected or '-'):<28}")
+        print(f"--- {len(drift)} users drifted ---")
+    else:
+        print("--- user_loan_stats matches loan_applications ---")
+
+    if args.rebuild:
+        print(f"✅ Rebuilt counters for {rebuild()} users")
+    sys.exit(1 if drift and not args.rebuild else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Query-plan check: every statement the hot paths run must use an index.
+
+Builds the app against a throwaway database filled by
+benchmarks.generate_data, drives each route in HOT_ROUTES through the test
+client (and each worker call in HOT_CALLS) with the SQL profiler
+(utils.profiler) recording every statement with its bound values, then runs
+EXPLAIN QUERY PLAN on what was captured. The statements checked are the
+ones the code runs today, so changing a view's query changes the check.
+Listings are followed to their second page, so keyset boundaries are
+checked too.
+
+A plain "SCAN <table>" step means a full table scan and fails the check,
+except for SMALL_TABLES, which are read whole on purpose.
+
+    python check_query_plans.py
+    python check_query_plans.py --scale 1 --verbose
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+# name -> (method, url, session, form data); "{...}" fields come from
+# benchmarks.bench_routes.pick_ids(), data may be a callable (fresh uploads)
+HOT_ROUTES = {
+    "finance.client_dashboard": ("GET", "/finance/dashboard", "client", None),
+    "finance.my_loans": ("GET", "/finance/my-loans", "client", None),
+    "finance.loans (POST)": ("POST", "/finance/loans", "client", lambda: {
+        "loan_type": "business", "bus-amt": "5000", "bus-name": "Plan Check", "bus-reg": "R-1",
+        "bus-purpose": "stock", "attachments": [(io.BytesIO(b"%PDF-1.4 plan check"), "doc.pdf")],
+    }),
+    "blog.blog_home": ("GET", "/blog/", None, None),
+    "blog.blog_detail": ("GET", "/blog/{blog_id}", "client", None),
+    "blog.blog_search": ("GET", "/blog/search?q=business+loan", None, None),
+    "market_place.home": ("GET", "/market_place/", None, None),
+    "market_place.products": ("GET", "/market_place/products", None, None),
+    "market_place.products (status, price range)": (
+        "GET", "/market_place/products?status=available&min_price=1000&max_price=50000&sort=price_asc", None, None,
+    ),
+    "market_place.products (search)": ("GET", "/market_place/products?q=business", None, None),
+    "market_place.product_detail": ("GET", "/market_place/product/{product_id}", None, None),
+    "admin.dashboard": ("GET", "/admin/dashboard", "admin", None),
+    "admin.list_loans": ("GET", "/admin/loans", "admin", None),
+    "admin.filter_loans (status, type, applied range)": (
+        "GET", "/admin/loans/filter?status=pending&loan_type=personal&applied_from=2020-01-01", "admin", None,
+    ),
+    "admin.filter_loans (decision range)": (
+        "GET", "/admin/loans/filter?decided_from=2020-01-01&decided_to=2030-01-01", "admin", None,
+    ),
+    "admin.filter_loans (amount bounds)": ("GET", "/admin/loans/filter?min_amount=1000&max_amount=20000", "admin", None),
+    "admin.filter_loans (name prefix)": ("GET", "/admin/loans/filter?name=mwila", "admin", None),
+    "admin.filter_loans (has attachments)": ("GET", "/admin/loans/filter?attachments=1", "admin", None),
+    "admin.view_loan": ("GET", "/admin/loans/{loan_id}", "admin", None),
+    "core.contact (POST)": ("POST", "/contact", None, {
+        "full_name": "Plan Check", "email": "visitor@example.com", "inquiry_target": "finance",
+        "reason": "quote", "message": "Query plan check inquiry",
+    }),
+    "admin.tukakula_queries": ("GET", "/admin/tukakula/queries", "admin", None),
+    "admin.tukakula_queries (filtered)": ("GET", "/admin/tukakula/queries?status=new", "admin", None),
+    "admin.tukakula_queries (no service)": ("GET", "/admin/tukakula/queries?service=", "admin", None),
+    "admin.tukakula_queries (search)": ("GET", "/admin/tukakula/queries?q=banda&service=finance", "admin", None),
+    "admin.product_inquiries_view": ("GET", "/admin/product-inquiries", "admin", None),
+}
+
+
+
+def _drain_jobs():
+    # Picks up the "loan.attachments" job finance.loans (POST) enqueued
+    from utils.jobs import work
+    work(once=True)
+
+
+# Work done outside requests: name -> callable run in an app context
+HOT_CALLS = {
+    "utils.jobs.work": _drain_jobs,
+}
+
+# Read whole on purpose: trigger-kept rollups and a handful of settings rows
+SMALL_TABLES = {"cache_generations", "tukakula_query_facets"}
+
+_STATEMENT = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.I)
+_CURSOR_LINK = re.compile(r"""[?&;]cursor=([\w-]+)""")
+_VIRTUAL_LOOKUP = re.compile(r"VIRTUAL TABLE INDEX \d+:\S")
+
+
+def full_scans(conn, sql, params=()):
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    details = [row[3] for row in plan]
+    # Scans of subquery/CTE results walk rows already fetched through an
+    # index; only a SCAN of a real table is a full table scan. A virtual
+    # table scan with a constraint in its index string (FTS5 "0:M2" is a
+    # MATCH) is a lookup in the full-text index.
+    scans = [
+        d for d in details
+        if d.startswith("SCAN ") and " USING " not in d and not d.startswith("SCAN (")
+        and not _VIRTUAL_LOOKUP.search(d)
+        and d.split()[1] not in SMALL_TABLES
+    ]
+    return details, scans
+
+
+# ==================================================
+# CAPTURE
+# ==================================================
+def _statements(profile):
+    """Distinct data statements a QueryProfile recorded, with their bound values."""
+    seen = {}
+    for shape, _, expanded in profile.slow:
+        if _STATEMENT.match(shape) and shape not in seen:
+            seen[shape] = expanded or shape
+    return list(seen.values())
+
+
+def capture(tmp, scale):
+    """{name: [sql]} for every HOT_ROUTES/HOT_CALLS entry, run against a database in tmp."""
+    # Before anything reads the config: every path the app writes to
+    os.environ.update({
+        "DATABASE_PATH": os.path.join(tmp, "plans.db"),
+        "BLOB_STORAGE_PATH": os.path.join(tmp, "blobs"),
+        "UPLOAD_SPOOL_PATH": os.path.join(tmp, "spool"),
+        "METRICS_DIR": os.path.join(tmp, "metrics"),
+        "REQUEST_LOG_PATH": os.path.join(tmp, "requests.jsonl"),
+        "SQL_PROFILER_LOG_PATH": os.path.join(tmp, "sql_profile.jsonl"),
+        "SQL_PROFILER": "1",
+    })
+    from flask import g
+    from app import create_app
+    from benchmarks.bench_routes import make_request, pick_ids
+    from benchmarks.generate_data import generate
+    from utils.profiler import QueryProfile
+    import utils.loan_processing  # noqa: F401  (registers the job handlers)
+
+    with contextlib.redirect_stdout(io.StringIO()):  # migration and row-count chatter
+        app = create_app()
+        generate(os.environ["DATABASE_PATH"], scale, files=False)
+    # Every statement counts as slow, so the profile keeps each one expanded
+    app.config.update(SQL_SLOW_QUERY_MS=0, SQL_PROFILER_EXPAND_SQL=True, JOBS_RUN_INLINE=False)
+    ids, sessions = pick_ids(os.environ["DATABASE_PATH"])
+
+    captured = []
+
+    @app.after_request
+    def keep_statements(response):
+        captured.extend(_statements(g.sql_profile))
+        return response
+
+    client = app.test_client()
+    statements = {}
+    for name, (method, url, session, data) in HOT_ROUTES.items():
+        url = url.format(**ids)
+        captured.clear()
+        response = make_request(client, method, url, sessions.get(session, {}), data() if callable(data) else data)
+        if response.status_code >= 400:
+            raise SystemExit(f"{name}: {method} {url} returned {response.status_code}")
+        cursor = _CURSOR_LINK.search(response.get_data(as_text=True)) if method == "GET" else None
+        if cursor:
+            separator = "&" if "?" in url else "?"
+            make_request(client, method, f"{url}{separator}cursor={cursor.group(1)}", sessions.get(session, {}), None)
+        statements[name] = list(dict.fromkeys(captured))
+
+    for name, call in HOT_CALLS.items():
+        with app.app_context():
+            g.sql_profile = QueryProfile(slow_seconds=0, expand_sql=True)
+            with contextlib.redirect_stdout(io.StringIO()):
+                call()
+            statements[name] = _statements(g.sql_profile)
+    return statements
+
+
+# ==================================================
+# CHECK
+# ==================================================
+def check_query_plans(scale=0.2, verbose=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        statements = capture(tmp, scale)
+        conn = sqlite3.connect(os.path.join(tmp, "plans.db"))
+        try:
+            return _report(conn, statements, verbose)
+        finally:
+            conn.close()
+
+
+def _report(conn, statements, verbose):
+
+    checked = failures = 0
+    for name, sqls in statements.items():
+        results = [(sql, *full_scans(conn, sql)) for sql in sqls]
+        failed = [result for result in results if result[2]]
+        print(f"[{'FAIL' if failed else 'ok':>4}] {name} ({len(sqls)} statements)")
+        for sql, details, scans in (results if verbose else failed):
+            print(f"         {' '.join(sql.split())[:160]}")
+            for detail in details:
+                print(f"             {detail}")
+        checked += len(sqls)
+        failures += len(failed)
+
+    print(f"--- {checked - failures}/{checked} statements use an index ---")
+    return failures == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, default=0.2, help="generate_data scale factor")
+    parser.add_argument("--verbose", action="store_true", help="print every statement and its plan")
+    args = parser.parse_args()
+    sys.exit(0 if check_query_plans(args.scale, args.verbose) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,5 +16,81 @@ class Config:
     # Uploads
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
 
+    # Database connection pool (per worker)
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+    DB_POOL_TIMEOUT = 10  # seconds to wait for a free connection
+    DB_STATEMENT_CACHE_SIZE = 128
+
+    # SQLite PRAGMA profile ("default" or "production", see utils.database)
+    # and optional per-PRAGMA overrides, e.g. {"mmap_size": 0}
+    DB_PRAGMA_PROFILE = os.environ.get("DB_PRAGMA_PROFILE", "production")
+    DB_PRAGMAS = {}
+
+    # Blog listing
+    BLOG_PAGE_SIZE = 12
+    BLOG_INLINE_COMMENTS = 3  # newest comments shown under each post
+    BLOG_SEARCH_PAGE_SIZE = 10
+    BLOG_SEARCH_SNIPPET_TOKENS = 32  # words of context around the matches
+    BLOG_SEARCH_MAX_CANDIDATES = 1000  # newest matches ranked per query
+
+    # Admin listings (keyset pages; ?per_page= is capped at 100)
+    ADMIN_PAGE_SIZE = 25
+    ADMIN_INLINE_COMMENTS = 20
+    ADMIN_INQUIRY_FACET_MATCHES = 1000  # newest search matches counted into the inbox facets
+    LOAN_FILTER_CACHE_TTL = 300  # seconds; loan changes invalidate the counts first
+
+    # Marketplace catalogue cache; writes invalidate it, the TTL is a safety net
+    CATALOGUE_CACHE_TTL = 300  # seconds
+    MARKETPLACE_HOME_PRODUCTS = 12  # newest listings on the marketplace home
+    MARKETPLACE_PAGE_SIZE = 24  # /market_place/products
+    MARKETPLACE_SEARCH_MAX_CANDIDATES = 1000  # newest matches ranked per query
+    MARKETPLACE_PRICE_BANDS = (1000, 5000, 25000)  # browse-by-price band edges (K)
+
+    # Threads per worker that resize uploaded images (0 = resize inline)
+    IMAGE_DERIVATIVE_WORKERS = 2
+
+    # Structured request log (request_logger.py): JSON lines written by a
+    # background thread; GETs are sampled, writes and errors always kept
+    REQUEST_LOG_ENABLED = True
+    REQUEST_LOG_PATH = os.environ.get("REQUEST_LOG_PATH") or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "requests.jsonl"
+    )
+    REQUEST_LOG_MAX_BYTES = 10 * 1024 * 1024  # rotate at 10MB
+    REQUEST_LOG_BACKUPS = 5
+    REQUEST_LOG_SAMPLE_RATE = float(os.environ.get("REQUEST_LOG_SAMPLE_RATE", 1.0))
+    REQUEST_LOG_SLOW_MS = 500  # always logged, whatever the sample rate
+    REQUEST_LOG_REDACT = r"pass|secret|token|csrf|signature|nrc|card|otp"  # field-name regex
+
+    # Per-route request metrics (utils.metrics), summed across workers
+    # through METRICS_DIR and served at /admin/metrics. Prometheus can
+    # scrape it with "Authorization: Bearer <METRICS_TOKEN>".
+    METRICS_ENABLED = True
+    METRICS_DIR = os.environ.get("METRICS_DIR") or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "metrics"
+    )
+    METRICS_FLUSH_INTERVAL = 5  # seconds between snapshots per worker
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+    # SQL profiler (utils.profiler), for staging: per-request query counts,
+    # budgets, N+1 detection, Server-Timing header and a slow-query log
+    SQL_PROFILER_ENABLED = os.environ.get("SQL_PROFILER") == "1"
+    SQL_PROFILER_HEADER = True
+    SQL_PROFILER_LOG_PATH = os.environ.get("SQL_PROFILER_LOG_PATH") or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "sql_profile.jsonl"
+    )
+    SQL_PROFILER_EXPAND_SQL = False  # log slow statements with their bound values
+    SQL_QUERY_BUDGET = 25  # queries per request
+    SQL_TIME_BUDGET_MS = 100  # SQL time per request
+    SQL_REPEAT_THRESHOLD = 5  # same statement shape this often = likely N+1
+    SQL_SLOW_QUERY_MS = 50
+
+    # Background jobs (utils.jobs) are run by `python worker.py`; set
+    # JOBS_RUN_INLINE=1 to run them at the end of the request instead
+    JOBS_RUN_INLINE = os.environ.get("JOBS_RUN_INLINE") == "1"
+
+    # Rendered marketing pages (0 disables); browsers revalidate via ETag
+    PAGE_CACHE_TTL = 600  # seconds kept server-side
+    PAGE_CACHE_MAX_AGE = 60  # Cache-Control max-age sent to browsers
+
     # Future extensions (placeholders)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 import uuid
 from flask import Blueprint, flash, redirect, render_template, request, url_for
 from utils.database import get_db_connection
+from utils.cache import page_cache
 
 # Blueprint for core pages
 core_bp = Blueprint('core', __name__, template_folder='templates')
@@ -12,12 +13,14 @@ core_bp = Blueprint('core', __name__, template_folder='templates')
 # -----------------------------
 
 @core_bp.route('/')
+@page_cache.cached
 def home():
     """Render the home page."""
     return render_template('home.html')
 
     
 @core_bp.route('/about')
+@page_cache.cached
 def about():
     """Render the about page."""
     return render_template('about.html')
@@ -102,21 +105,25 @@ def server_error(error):
 # -----------------------------
 
 @core_bp.route('/brand-studio')
+@page_cache.cached
 def brand_studio_home():
     """Render Brand Studio home page."""
     return render_template('br_home.html')
 
 @core_bp.route('/developers')
+@page_cache.cached
 def developer_tools_home():
     """Render Developer Tools home page."""
     return render_template('dev_home.html')
 
 @core_bp.route('/advisory')
+@page_cache.cached
 def advisory_services_home():
     """Render Advisory Services home page."""
     return render_template('adv_home.html')
 
 @core_bp.route('/finance')
+@page_cache.cached
 def finance_services_home():
     """Render Finance Services home page."""
     return render_template('fin_home.html')
\ No newline at end of file
@@ -1,5 +1,6 @@
 import sqlite3
 import os
+from utils.migrations import migrate, schema_version
 
 # 1. Try local directory first, then the parent directory
 possible_paths = [
@@ -22,36 +23,21 @@ def migrate_database():
         return
 
     print(f"✅ Found database at: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    conn = sqlite3.connect(DB_PATH, timeout=10)
 
-    # Columns we need to ensure exist
-    new_columns = [
-        ("contact_person_position", "TEXT"),
-        ("business_years", "INTEGER"),
-        ("monthly_revenue", "REAL DEFAULT 0.0")
-    ]
-
-    print(f"--- Starting Migration ---")
-
-    for col_name, col_type in new_columns:
-        try:
-            # Check existing columns
-            cursor.execute("PRAGMA table_info(business_loan_details)")
-            columns = [info[1] for info in cursor.fetchall()]
-
-            if col_name not in columns:
-                print(f"Adding column '{col_name}'...")
-                cursor.execute(f"ALTER TABLE business_loan_details ADD COLUMN {col_name} {col_type}")
-                print(f"✅ Column '{col_name}' added.")
-            else:
-                print(f"ℹ️ Column '{col_name}' already exists.")
-
-        except sqlite3.Error as e:
-            print(f"❌ Error: {e}")
+    print(f"--- Starting Migration (schema version {schema_version(conn)}) ---")
+    try:
+        applied = migrate(conn)
+    except sqlite3.Error as e:
+        print(f"❌ Error: {e}")
+        return
+    finally:
+        conn.close()
 
-    conn.commit()
-    conn.close()
+    for number, name in applied:
+        print(f"✅ Applied migration {number}: {name}")
+    if not applied:
+        print("ℹ️ Schema already up to date.")
     print("--- Migration Complete ---")
 
 if __name__ == "__main__":
@@ -1,18 +1,161 @@
-from flask import request
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from flask import g, request, session
+
+# ==================================================
+# STRUCTURED REQUEST LOG
+# ==================================================
+# One compact JSON line per request: method, path, endpoint, status, timing
+# and the *names and sizes* of submitted fields and files. Form values are
+# never written; query-string values are, unless their name matches
+# REQUEST_LOG_REDACT. The request thread only builds a small dict and drops
+# it on a bounded queue; a background thread serializes and appends it to
+# REQUEST_LOG_PATH, rotating at REQUEST_LOG_MAX_BYTES. When the writer
+# falls behind, records are dropped (and counted) instead of blocking.
+#
+# Successful GETs are sampled at REQUEST_LOG_SAMPLE_RATE; writes, errors and
+# requests slower than REQUEST_LOG_SLOW_MS are always kept.
+
+DEFAULT_REDACT = r"pass|secret|token|csrf|signature|nrc|card|otp"
+QUERY_VALUE_LIMIT = 100  # characters kept of each logged query value
+
+
+class RequestLogWriter:
+    """Bounded queue drained by a per-process writer thread."""
+
+    def __init__(self, path, max_bytes, backups, queue_size=10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+
+    def _start(self):
+        # Threads do not survive a gunicorn fork: one writer per process
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = os.getpid()
+            thread = threading.Thread(
+                target=self._run, args=(self._queue,), name="request-log", daemon=True
+            )
+            thread.start()
+
+    def put(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self, records):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        handler = RotatingFileHandler(
+            self.path, maxBytes=self.max_bytes, backupCount=self.backups,
+            encoding="utf-8", delay=True,
+        )
+        while True:
+            record = records.get()
+            if self.dropped:
+                record["dropped"], self.dropped = self.dropped, 0
+            line = json.dumps(record, separators=(",", ":"), default=str)
+            handler.handle(logging.makeLogRecord({"msg": line}))
+
+
+def _field_sizes(req):
+    """{name: size} of parsed form fields and files; {} if the view never parsed them."""
+    if "form" not in req.__dict__:
+        return {}, {}
+
+    fields = {name: sum(len(v) for v in values) for name, values in req.form.lists()}
+    files = {}
+    for name, storage in req.files.items(multi=True):
+        size = storage.content_length
+        if not size:
+            try:
+                position = storage.stream.tell()
+                size = storage.stream.seek(0, os.SEEK_END)
+                storage.stream.seek(position)
+            except (OSError, ValueError):
+                size = None
+        files.setdefault(name, []).append(size)
+    return fields, files
+
 
 def log_requests(app):
+    if not app.config.get("REQUEST_LOG_ENABLED", True):
+        return
+
+    writer = RequestLogWriter(
+        app.config.get("REQUEST_LOG_PATH", "logs/requests.jsonl"),
+        app.config.get("REQUEST_LOG_MAX_BYTES", 10 * 1024 * 1024),
+        app.config.get("REQUEST_LOG_BACKUPS", 5),
+    )
+    redact = re.compile(app.config.get("REQUEST_LOG_REDACT", DEFAULT_REDACT), re.IGNORECASE)
+    sample_rate = app.config.get("REQUEST_LOG_SAMPLE_RATE", 1.0)
+    slow_ms = app.config.get("REQUEST_LOG_SLOW_MS", 500)
+    app.extensions["request_log"] = writer
+
     @app.before_request
-    def log_request_data():
-        if request.method == "POST":
-            print("\n===== INCOMING POST REQUEST =====")
-            print("URL:", request.path)
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        started = g.get("request_started")
+        duration_ms = (time.perf_counter() - started) * 1000 if started else None
 
-            print("\nFORM DATA:")
-            for k, v in request.form.items():
-                print(f"{k}: {v}")
+        keep = (
+            request.method not in ("GET", "HEAD")
+            or response.status_code >= 400
+            or (duration_ms is not None and duration_ms >= slow_ms)
+            or sample_rate >= 1
+            or random.random() < sample_rate
+        )
+        if not keep:
+            return response
 
-            print("\nFILES:")
-            for f in request.files:
-                print(f"{f} -> {request.files[f].filename}")
+        req = request._get_current_object()
+        fields, files = _field_sizes(req)
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "ms": round(duration_ms, 2) if duration_ms is not None else None,
+            "bytes_in": request.content_length,
+            "bytes_out": response.calculate_content_length(),
+            # Only if the view loaded the session: reading it adds Vary: Cookie
+            "user_id": session.get("user_id") if session.accessed else None,
+        }
+        if request.args:
+            record["args"] = {
+                name: "[redacted]" if redact.search(name) else value[:QUERY_VALUE_LIMIT]
+                for name, value in request.args.items()
+            }
+        if fields:
+            record["fields"] = {
+                name: "[redacted]" if redact.search(name) else size
+                for name, size in fields.items()
+            }
+        if files:
+            record["files"] = files
+        if sample_rate < 1:
+            record["sample_rate"] = sample_rate
 
-            print("===== END REQUEST =====\n")
+        writer.put(record)
+        return response
@@ -1,5 +1,6 @@
 # services/advisory/routes.py
 from flask import Blueprint, render_template
+from utils.cache import page_cache
 
 advisory_bp = Blueprint(
     "advisory",
@@ -9,6 +10,7 @@ advisory_bp = Blueprint(
 )
 
 @advisory_bp.route("/")
+@page_cache.cached
 def home():
     return render_template("adv_home.html")
 
@@ -1,4 +1,5 @@
 from flask import Blueprint, render_template
+from utils.cache import page_cache
 
 brand_bp = Blueprint(
     "brand_studio",
@@ -8,21 +9,26 @@ brand_bp = Blueprint(
 )
 
 @brand_bp.route("/")
+@page_cache.cached
 def home():
     return render_template("br_home.html")
 
 @brand_bp.route("/services")
+@page_cache.cached
 def services():
     return render_template("br_services.html")
 
 @brand_bp.route("/portfolio")
+@page_cache.cached
 def portfolio():
     return render_template("br_portfolio.html")
 
 @brand_bp.route("/process")
+@page_cache.cached
 def process():
     return render_template("br_process.html")
 
 @brand_bp.route("/contact")
+@page_cache.cached
 def contact():
     return render_template("br_contact.html")
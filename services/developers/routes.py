@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 import uuid
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
 from utils.database import get_db_connection
+from utils.cache import page_cache
 
 developers_bp = Blueprint(
     "developers",
@@ -11,6 +12,7 @@ developers_bp = Blueprint(
 )
 
 @developers_bp.route("/")
+@page_cache.cached
 def home():
     return render_template("dev_home.html")
 
@@ -1,11 +1,15 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from auth.decorators import login_required
 import os
 import uuid
 from werkzeug.utils import secure_filename
 from datetime import datetime
-import base64
 from utils.database import get_db_connection, calculate_total_repayment
+from utils.blobs import blob_relpath, commit_blobs, known_blob
+from utils.jobs import enqueue, run_now
+from utils.loan_processing import spool_upload, spool_signature, discard_spool
+from utils.signatures import InvalidSignatureError, save_signature
+from utils.cache import page_cache
 
 finance_bp = Blueprint(
     "finance",
@@ -14,10 +18,15 @@ finance_bp = Blueprint(
     template_folder="templates"
 )
 
+class LoanSubmissionError(Exception):
+    """Validation failure that should roll back the whole loan submission."""
+
+
 # --------------------------------------------------
 # FINANCE HOME
 # --------------------------------------------------
 @finance_bp.route("/", methods=["GET"])
+@page_cache.cached
 def home():
     return render_template("fin_home.html")
 
@@ -28,13 +37,14 @@ def home():
 @login_required
 def loans():
     from utils.database import (
+        transaction,
+        generate_application_number,
         create_loan_application,
         save_personal_loan_details,
         save_business_loan_details,
         save_collateral_items,
-        save_application_attachments,
+        save_application_attachments_many,
         calculate_total_repayment,
-        get_db_connection
     )
 
     if request.method == "POST":
@@ -45,76 +55,14 @@ def loans():
             flash("Invalid loan type selected.", "danger")
             return redirect(url_for("finance.loans"))
 
-        # 1. Create the Application Entry first
-        application_id, application_number = create_loan_application(user_id, loan_type)
-
-        if not application_id:
-            flash("Failed to create loan application entry.", "danger")
-            return redirect(url_for("finance.loans"))
+        application_number = generate_application_number(loan_type)
 
         try:
-            total_repayment = 0
-            
-            # --------------------------------------------------
-            # CASE A: PERSONAL LOAN
-            # --------------------------------------------------
-            if loan_type == "personal":
-                success = save_personal_loan_details(application_id, request.form)
-                if not success:
-                    flash("Missing required personal loan fields.", "danger")
-                    return redirect(url_for("finance.loans"))
-
-                amt_raw = request.form.get("ind-amt", "0").replace(',', '').replace('$', '')
-                amt = float(amt_raw) if amt_raw else 0.0
-                total_repayment = calculate_total_repayment(amt)
-
-                collateral_items = []
-                for item in request.form.getlist("collateral"):
-                    if item and item != "other":
-                        collateral_items.append({
-                            "name": item,
-                            "type": "personal",
-                            "value": 0,
-                            "condition": request.form.get("ind-description", "")
-                        })
-                if collateral_items:
-                    save_collateral_items(application_id, "personal", collateral_items)
-
             # --------------------------------------------------
-            # CASE B: BUSINESS LOAN
-            # --------------------------------------------------
-            else:
-                success = save_business_loan_details(application_id, request.form)
-                if not success:
-                    flash("Failed to save business details.", "danger")
-                    return redirect(url_for("finance.loans"))
-
-                amt_raw = request.form.get("bus-amt", "0").replace(',', '').replace('$', '')
-                amt = float(amt_raw) if amt_raw else 0.0
-                total_repayment = calculate_total_repayment(amt)
-
-                bus_collateral_name = request.form.get("bus-collateral-type")
-                if bus_collateral_name:
-                    save_collateral_items(application_id, "business", [{
-                        "name": bus_collateral_name,
-                        "type": "business",
-                        "value": float(request.form.get("bus-collateral-value", 0) or 0),
-                        "condition": request.form.get("bus-collateral-desc")
-                    }])
-
-            # --------------------------------------------------
-            # 2. FINAL DB UPDATE
-            # --------------------------------------------------
-            conn = get_db_connection()
-            conn.execute(
-                "UPDATE loan_applications SET total_repayment=?, updated_date=CURRENT_TIMESTAMP WHERE id=?",
-                (total_repayment, application_id)
-            )
-            conn.commit()
-            conn.close()
-
-            # --------------------------------------------------
-            # 3. FILE ATTACHMENTS HANDLING (FIXED FOR ADMIN)
+            # 1. FILE ATTACHMENTS (only spooled here; the "loan.attachments"
+            #    job hashes them into the blob store after the redirect).
+            #    Content the store already has is not spooled at all: it is
+            #    referenced in the submission transaction below.
             # --------------------------------------------------
             # Define specific keys used in the HTML form for both types
             # Format: (Form Key, Admin Label)
@@ -137,35 +85,119 @@ def loans():
                 ('attachments', 'General Attachment')
             ]
 
-            upload_dir = os.path.join("static", "uploads", "loans", application_number)
-            os.makedirs(upload_dir, exist_ok=True)
-
+            attachments, known = [], []
             for file_key, label in file_mapping:
                 files = request.files.getlist(file_key)
                 for file in files:
                     if file and file.filename != '':
+                        # The label is the category the admin sees
                         filename = secure_filename(file.filename)
-                        unique_fn = f"{uuid.uuid4().hex[:8]}_{filename}"
-                        save_path = os.path.join(upload_dir, unique_fn)
-                        
-                        # Save actual file to disk
-                        file.save(save_path)
-
-                        # Save to database application_attachments table
-                        # Store path as 'uploads/loans/APP_NUM/file.ext' for consistency
-                        db_relative_path = f"uploads/loans/{application_number}/{unique_fn}"
-                        
-                        save_application_attachments(
-                            application_id,
-                            label, # This is the category the admin sees
-                            filename,
-                            db_relative_path
-                        )
+                        blob = known_blob(file.stream)
+                        if blob is not None:
+                            known.append((label, filename, blob))
+                        else:
+                            attachments.append({
+                                "category": label,
+                                "filename": filename,
+                                "spool": spool_upload(file, application_number),
+                            })
+
+            # Drawn signature: decoded to the spool in chunks, compacted by the job
+            signature = None
+            signature_data = request.form.get("ind-signature-data")
+            if loan_type == "personal" and signature_data:
+                try:
+                    signature = spool_signature(signature_data, application_number)
+                except InvalidSignatureError:
+                    raise LoanSubmissionError("We could not read your signature. Please sign again.")
+
+            # --------------------------------------------------
+            # 2. ONE TRANSACTION FOR THE WHOLE SUBMISSION
+            # --------------------------------------------------
+            with transaction() as conn:
+                application_id, _ = create_loan_application(
+                    user_id, loan_type, conn=conn, application_number=application_number
+                )
+                if not application_id:
+                    raise LoanSubmissionError("Failed to create loan application entry.")
+
+                # CASE A: PERSONAL LOAN
+                if loan_type == "personal":
+                    if not save_personal_loan_details(application_id, request.form, conn=conn):
+                        raise LoanSubmissionError("Missing required personal loan fields.")
+
+                    amt_raw = request.form.get("ind-amt", "0").replace(',', '').replace('$', '')
+                    amt = float(amt_raw) if amt_raw else 0.0
+
+                    collateral_items = []
+                    for item in request.form.getlist("collateral"):
+                        if item and item != "other":
+                            collateral_items.append({
+                                "name": item,
+                                "type": "personal",
+                                "value": 0,
+                                "condition": request.form.get("ind-description", "")
+                            })
+                    if collateral_items:
+                        save_collateral_items(application_id, "personal", collateral_items, conn=conn)
+
+                # CASE B: BUSINESS LOAN
+                else:
+                    if not save_business_loan_details(application_id, request.form, conn=conn):
+                        raise LoanSubmissionError("Failed to save business details.")
+
+                    amt_raw = request.form.get("bus-amt", "0").replace(',', '').replace('$', '')
+                    amt = float(amt_raw) if amt_raw else 0.0
+
+                    bus_collateral_name = request.form.get("bus-collateral-type")
+                    if bus_collateral_name:
+                        save_collateral_items(application_id, "business", [{
+                            "name": bus_collateral_name,
+                            "type": "business",
+                            "value": float(request.form.get("bus-collateral-value", 0) or 0),
+                            "condition": request.form.get("bus-collateral-desc")
+                        }], conn=conn)
+
+                conn.execute(
+                    "UPDATE loan_applications SET total_repayment=?, updated_date=CURRENT_TIMESTAMP WHERE id=?",
+                    (calculate_total_repayment(amt), application_id)
+                )
+
+                # Known blobs are referenced now, so gc cannot remove them
+                # before an admin sees the application
+                if known:
+                    commit_blobs(conn, [blob for _, _, blob in known])
+                    save_application_attachments_many(application_id, [
+                        (label, filename, blob_relpath(blob.digest), blob.digest)
+                        for label, filename, blob in known
+                    ], conn=conn)
+
+                # Slow follow-up work, committed together with the application
+                jobs = []
+                if attachments:
+                    jobs.append(enqueue(conn, "loan.attachments", {
+                        "application_number": application_number,
+                        "files": attachments,
+                    }, application_id=application_id))
+                if signature:
+                    jobs.append(enqueue(conn, "loan.signature", {
+                        "application_number": application_number,
+                        "spool": signature,
+                    }, application_id=application_id))
+
+            if current_app.config.get("JOBS_RUN_INLINE"):
+                run_now(jobs)
 
             flash(f"Application {application_number} submitted successfully!", "success")
             return redirect(url_for("finance.my_loans"))
 
+        except LoanSubmissionError as e:
+            discard_spool(application_number)
+            flash(str(e), "danger")
+            return redirect(url_for("finance.loans"))
+
         except Exception as e:
+            discard_spool(application_number)
             print(f"CRITICAL LOAN ROUTE ERROR: {e}")
             flash(f"An error occurred: {str(e)}", "danger")
             return redirect(url_for("finance.loans"))
@@ -182,23 +214,19 @@ def client_dashboard():
     user_id = session.get("user_id")
     db = get_db_connection()
     
-    loan_stats = db.execute("""
-        SELECT 
-            COUNT(*) as total,
-            SUM(CASE WHEN status = 'approved' THEN 1 ELSE 0 END) as approved,
-            SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending
-        FROM loan_applications WHERE user_id = ?
-    """, (user_id,)).fetchone()
-    
+    # Counters kept by triggers (user_loan_stats); no row until the first application
+    loan_stats = db.execute(
+        "SELECT total, approved, pending FROM user_loan_stats WHERE user_id = ?", (user_id,)
+    ).fetchone()
+
+    # applicant_name is copied onto loan_applications, so no detail-table joins
     recent_loans = db.execute("""
-        SELECT la.*, COALESCE(p.full_name, b.business_name, 'Applicant') as display_name
+        SELECT la.*, COALESCE(la.applicant_name, 'Applicant') as display_name
         FROM loan_applications la
-        LEFT JOIN personal_loan_details p ON la.id = p.application_id
-        LEFT JOIN business_loan_details b ON la.id = b.application_id
-        WHERE la.user_id = ? 
+        WHERE la.user_id = ?
         ORDER BY la.applied_date DESC LIMIT 3
     """, (user_id,)).fetchall()
-    
+
     db.close()
     return render_template("fin_client_dashboard.html", stats=loan_stats, recent_loans=recent_loans)
 
@@ -209,8 +237,13 @@ def my_loans():
     user_id = session.get("user_id")
     db = get_db_connection()
     
+    # pending_jobs/failed_jobs: follow-up work still in the queue (utils.jobs)
     loans = db.execute("""
-        SELECT la.*, COALESCE(p.full_name, b.business_name, 'Applicant') as display_name
+        SELECT la.*, COALESCE(p.full_name, b.business_name, 'Applicant') as display_name,
+               (SELECT COUNT(*) FROM jobs j
+                WHERE j.application_id = la.id AND j.status IN ('queued', 'running')) as pending_jobs,
+               (SELECT COUNT(*) FROM jobs j
+                WHERE j.application_id = la.id AND j.status = 'failed') as failed_jobs
         FROM loan_applications la
         LEFT JOIN personal_loan_details p ON la.id = p.application_id
         LEFT JOIN business_loan_details b ON la.id = b.application_id
@@ -263,14 +296,9 @@ def edit_loan(loan_id):
             # 3. Process Signature (if a new one was drawn)
             sig_data = request.form.get('ind-signature-data') or request.form.get('bus-signature-data')
             new_sig_path = None
-            if sig_data and 'base64' in sig_data:
-                header, encoded = sig_data.split(",", 1)
-                data = base64.b64decode(encoded)
-                sig_filename = f"sig_upd_{loan_id}_{int(time.time())}.png"
-                sig_path = os.path.join(LOAN_UPLOAD_FOLDER, sig_filename)
-                with open(sig_path, "wb") as f:
-                    f.write(data)
-                new_sig_path = sig_filename
+            if sig_data:
+                new_sig_path = f"sig_upd_{loan_id}_{uuid.uuid4().hex[:8]}.png"
+                save_signature(sig_data, new_sig_path)
 
             # 4. Update Detailed Tables
             if loan_type == 'personal':
@@ -2,8 +2,16 @@ import os
 import time
 import uuid
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, abort, current_app
+from markupsafe import Markup
 from werkzeug.utils import secure_filename
-from utils.database import get_db_connection
+from utils.database import (
+    get_db_connection, get_product_images, get_product_image_filenames, add_product_images,
+    remove_product_image, attach_primary_images, PRODUCT_LISTING_SQL,
+)
+from utils.pagination import keyset_paginate, clamp_page_size
+from utils.cache import catalogue_cache
+from utils.derivatives import schedule_derivatives, delete_derivatives
+from utils.search import candidate_floor, match_query
 from auth.decorators import login_required
 
 # Blueprint Configuration
@@ -20,52 +28,208 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp', 'gif', 'jfif'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def get_product_images(image_string):
-    if not image_string:
-        return []
-    return [img.strip() for img in image_string.split(',') if img.strip()]
-
 # ==================================================
 # PUBLIC PAGES
 # ==================================================
 
+def active_products(conn, limit):
+    # Only show products that are marked as active
+    return catalogue_cache.get_or_load(conn, ("active_products", limit), lambda: attach_primary_images(conn, [
+        dict(row) for row in conn.execute(
+            PRODUCT_LISTING_SQL + " WHERE p.is_active = 1 ORDER BY p.created_at DESC, p.id DESC LIMIT ?", (limit,)
+        )
+    ]))
+
 @market_bp.route("/")
 def home():
+    is_admin = session.get('role') in ['admin', 'super_admin']
+    limit = current_app.config.get('MARKETPLACE_HOME_PRODUCTS', 12)
     conn = get_db_connection()
     try:
-        # Only show products that are marked as active
-        products = conn.execute(
-            "SELECT * FROM products WHERE is_active = 1 ORDER BY created_at DESC"
-        ).fetchall()
+        # The grid differs only by the admin controls, so cache one copy per variant
+        grid = catalogue_cache.get_or_load(
+            conn,
+            ("grid", "admin" if is_admin else "public"),
+            lambda: render_template("_mp_product_grid.html", products=active_products(conn, limit), is_admin=is_admin),
+        )
     finally:
         conn.close()
-    return render_template("mp_home.html", products=products, get_images=get_product_images)
+    return render_template("mp_home.html", grid=Markup(grid))
 
 
-# --- Placeholder endpoints to avoid BuildError from templates linking to these pages ---
-@market_bp.route('/cart')
-def cart():
-    # Simple placeholder - redirect to home for now
-    return redirect(url_for('market_place.home'))
+# ==================================================
+# CATALOGUE SEARCH
+# ==================================================
+# One query engine behind /market_place/products: words matched through
+# products_fts, status and price filters and a sort order, paged by keyset.
+# Public listings only (is_active = 1), so every filter runs inside
+# idx_products_active_status_price. A page is found first as ids, then
+# only those rows get the listing columns and images.
 
+PRODUCT_STATUSES = ("available", "sold")
 
-@market_bp.route('/products')
-def products():
-    return redirect(url_for('market_place.home'))
+# sort -> (order_by, descending); the sort keys are selected by search_products
+PRODUCT_SORTS = {
+    "relevance": ([("f.rank", "rank"), ("p.id", "id")], False),
+    "newest": ([("p.created_at", "created_at"), ("p.id", "id")], True),
+    "price_asc": ([("p.price", "price"), ("p.id", "id")], False),
+    "price_desc": ([("p.price", "price"), ("p.id", "id")], True),
+}
 
 
+def parse_price(value):
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    if price < 0 or price != price:
+        return None
+    return int(price) if price.is_integer() else price
+
+
+def product_filters(args):
+    """Normalised catalogue filters from the query string; unknown values are dropped."""
+    q = (args.get('q') or '').strip()
+    status = args.get('status')
+    sort = args.get('sort')
+    if sort not in PRODUCT_SORTS or (sort == "relevance" and match_query(q) is None):
+        sort = "relevance" if match_query(q) else "newest"
+    return {
+        "q": q,
+        "status": status if status in PRODUCT_STATUSES else "",
+        "min_price": parse_price(args.get('min_price')),
+        "max_price": parse_price(args.get('max_price')),
+        "sort": sort,
+    }
+
+
+def search_products(conn, filters, cursor=None, limit=24):
+    """One keyset Page of listing dicts (with primary images) matching `filters`."""
+    order_by, descending = PRODUCT_SORTS[filters["sort"]]
+    source = "products p"
+    where, params = ["p.is_active = 1"], []
+
+    match = match_query(filters["q"])
+    if match is not None:
+        # Matches drive the join (CROSS JOIN fixes the order): walking
+        # products in sort order would probe the index once per listing
+        source = "products_fts f CROSS JOIN products p ON p.id = f.rowid"
+        where.append("products_fts MATCH ?")
+        params.append(match)
+        if filters["sort"] == "relevance":
+            # bm25() runs per candidate: rank the newest matches only
+            where.append("f.rowid >= ?")
+            params.append(candidate_floor(
+                conn, "products_fts", match, current_app.config.get('MARKETPLACE_SEARCH_MAX_CANDIDATES', 1000)
+            ))
+    if filters["status"]:
+        where.append("p.status = ?")
+        params.append(filters["status"])
+    if filters["min_price"] is not None:
+        where.append("p.price >= ?")
+        params.append(filters["min_price"])
+    if filters["max_price"] is not None:
+        where.append("p.price <= ?")
+        params.append(filters["max_price"])
+    if filters["sort"] in ("price_asc", "price_desc"):
+        # Unpriced listings have no place in a price order (and would break the keyset)
+        where.append("p.price IS NOT NULL")
+
+    page = keyset_paginate(
+        conn,
+        f"SELECT {', '.join(f'{expr} AS {column}' for expr, column in order_by)} "
+        f"FROM {source} WHERE {' AND '.join(where)} AND {{keyset}}",
+        params=params,
+        order_by=order_by,
+        cursor=cursor,
+        limit=limit,
+        descending=descending,
+    )
+
+    ids = [row['id'] for row in page]
+    found = {}
+    if ids:
+        found = {row['id']: dict(row) for row in conn.execute(
+            PRODUCT_LISTING_SQL + f" WHERE p.id IN ({', '.join('?' * len(ids))})", ids
+        )}
+    page.items = attach_primary_images(conn, [found[product_id] for product_id in ids if product_id in found])
+    return page
+
+
+def catalogue_facets(conn):
+    """Public listing counts by status and by MARKETPLACE_PRICE_BANDS band."""
+    edges = list(current_app.config.get('MARKETPLACE_PRICE_BANDS', ()))
+
+    def load():
+        # Band number for each priced row, counted from the covering index;
+        # edges belong to the lower band, as max_price is inclusive
+        band = "CASE WHEN price IS NULL THEN NULL " + "".join(
+            f"WHEN price <= ? THEN {number} " for number in range(len(edges))
+        ) + f"ELSE {len(edges)} END"
+        rows = conn.execute(f"""
+            SELECT status, {band} AS band, COUNT(*) AS n FROM products
+            WHERE is_active = 1 GROUP BY status, band
+        """, edges).fetchall()
+
+        statuses = dict.fromkeys(PRODUCT_STATUSES, 0)
+        bands = [
+            {"min_price": low, "max_price": high, "n": 0}
+            for low, high in zip([None] + edges, edges + [None])
+        ]
+        for row in rows:
+            if row['status'] in statuses:
+                statuses[row['status']] += row['n']
+            if row['band'] is not None:
+                bands[row['band']]["n"] += row['n']
+        return {"statuses": statuses, "bands": bands}
+
+    return catalogue_cache.get_or_load(conn, ("facets", tuple(edges)), load)
+
+
+@market_bp.route('/products')
+def products():
+    filters = product_filters(request.args)
+    conn = get_db_connection()
+    page = search_products(
+        conn,
+        filters,
+        cursor=request.args.get('cursor'),
+        limit=clamp_page_size(request.args.get('per_page'), current_app.config.get('MARKETPLACE_PAGE_SIZE', 24)),
+    )
+    facets = catalogue_facets(conn)
+    conn.close()
+    return render_template(
+        "mp_products.html",
+        products=page.items,
+        page=page,
+        filters=filters,
+        facets=facets,
+        is_admin=session.get('role') in ['admin', 'super_admin'],
+    )
+
+
+# The catalogue has no category or product-type column yet, so these
+# footer links land on the searchable catalogue (price bands and status
+# stand in for categories there).
 @market_bp.route('/categories')
 def categories():
-    return redirect(url_for('market_place.home'))
+    return redirect(url_for('market_place.products'))
 
 
 @market_bp.route('/services')
 def services():
-    return redirect(url_for('market_place.home'))
+    return redirect(url_for('market_place.products'))
 
 
 @market_bp.route('/digital_goods')
 def digital_goods():
+    return redirect(url_for('market_place.products'))
+
+
+# --- Placeholder endpoints to avoid BuildError from templates linking to these pages ---
+@market_bp.route('/cart')
+def cart():
+    # Simple placeholder - redirect to home for now
     return redirect(url_for('market_place.home'))
 
 
@@ -88,6 +252,7 @@ def product_detail(product_id):
         if session.get('role') in ['admin', 'super_admin'] and 'update_status' in request.form:
             new_status = request.form.get('status')
             conn.execute("UPDATE products SET status = ? WHERE id = ?", (new_status, product_id))
+            catalogue_cache.invalidate(conn)
             conn.commit()
             flash(f"Status updated to {new_status}.", "success")
             conn.close()
@@ -120,8 +285,9 @@ def product_detail(product_id):
 
         return redirect(url_for('market_place.product_detail', product_id=product_id))
 
+    images = get_product_images(conn, product_id)
     conn.close()
-    return render_template('mp_product_detail.html', product=product, get_images=get_product_images)
+    return render_template('mp_product_detail.html', product=product, images=images)
 
 # ==================================================
 # ADMIN MANAGEMENT (ADD / EDIT / DELETE)
@@ -150,15 +316,16 @@ def add_product():
                 file.save(os.path.join(UPLOAD_FOLDER, filename))
                 filenames.append(filename)
 
-        image_data = ",".join(filenames) if filenames else None
-
         conn = get_db_connection()
-        conn.execute("""
-            INSERT INTO products (name, description, price, image, created_by, is_active, status)
-            VALUES (?, ?, ?, ?, ?, 1, 'available')
-        """, (name, description, price, image_data, session.get('user_id')))
+        cursor = conn.execute("""
+            INSERT INTO products (name, description, price, created_by, is_active, status)
+            VALUES (?, ?, ?, ?, 1, 'available')
+        """, (name, description, price, session.get('user_id')))
+        add_product_images(conn, cursor.lastrowid, filenames)
+        catalogue_cache.invalidate(conn)
         conn.commit()
         conn.close()
+        schedule_derivatives("products", filenames)
         flash("Product listed successfully.", "success")
         return redirect(url_for("market_place.admin_products"))
 
@@ -170,9 +337,16 @@ def admin_products():
     if session.get("role") not in ["admin", "super_admin"]:
         abort(403)
     conn = get_db_connection()
-    products = conn.execute("SELECT * FROM products ORDER BY created_at DESC").fetchall()
+    products = keyset_paginate(
+        conn,
+        PRODUCT_LISTING_SQL + " WHERE {keyset}",
+        order_by=[("p.created_at", "created_at"), ("p.id", "id")],
+        cursor=request.args.get('cursor'),
+        limit=clamp_page_size(request.args.get('per_page'), current_app.config.get('ADMIN_PAGE_SIZE', 25)),
+    )
+    products.items = attach_primary_images(conn, [dict(row) for row in products])
     conn.close()
-    return render_template("admin_products.html", products=products, get_images=get_product_images)
+    return render_template("admin_products.html", products=products, page=products)
 
 @market_bp.route("/admin/product/<int:product_id>/toggle")
 @login_required
@@ -181,6 +355,7 @@ def toggle_product(product_id):
         abort(403)
     conn = get_db_connection()
     conn.execute("UPDATE products SET is_active = 1 - is_active WHERE id = ?", (product_id,))
+    catalogue_cache.invalidate(conn)
     conn.commit()
     conn.close()
     flash("Visibility toggled.", "info")
@@ -192,18 +367,18 @@ def delete_product(product_id):
     if session.get("role") not in ["admin", "super_admin"]:
         abort(403)
     conn = get_db_connection()
-    product = conn.execute("SELECT image FROM products WHERE id = ?", (product_id,)).fetchone()
-    
-    if product and product['image']:
-        for img in product['image'].split(','):
-            path = os.path.join(UPLOAD_FOLDER, img.strip())
-            if os.path.exists(path):
-                try:
-                    os.remove(path)
-                except:
-                    pass
-                
+    filenames = get_product_image_filenames(conn, product_id)
+    for img in filenames:
+        path = os.path.join(UPLOAD_FOLDER, img)
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except:
+                pass
+    delete_derivatives(conn, "products", filenames)
+
     conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+    catalogue_cache.invalidate(conn)
     conn.commit()
     conn.close()
     flash("Deleted successfully.", "success")
@@ -233,26 +408,23 @@ def edit_product(product_id):
                 file.save(os.path.join(UPLOAD_FOLDER, filename))
                 new_filenames.append(filename)
 
-        # Merge new images with existing ones
-        existing_images = product['image'] if product['image'] else ""
-        if new_filenames:
-            updated_images = (existing_images + "," if existing_images else "") + ",".join(new_filenames)
-        else:
-            updated_images = existing_images
-
         conn.execute("""
             UPDATE products 
-            SET name = ?, price = ?, description = ?, status = ?, image = ?
+            SET name = ?, price = ?, description = ?, status = ?
             WHERE id = ?
-        """, (name, price, description, status, updated_images, product_id))
-        
+        """, (name, price, description, status, product_id))
+        # New images are appended row by row, so concurrent edits cannot drop each other's
+        add_product_images(conn, product_id, new_filenames)
+        catalogue_cache.invalidate(conn)
         conn.commit()
         conn.close()
+        schedule_derivatives("products", new_filenames)
         flash("Product updated successfully!", "success")
         return redirect(url_for('market_place.product_detail', product_id=product_id))
 
+    images = get_product_images(conn, product_id)
     conn.close()
-    return render_template('mp_edit_product.html', product=product, get_images=get_product_images)
+    return render_template('mp_edit_product.html', product=product, images=images)
 
 @market_bp.route('/product/<int:product_id>/delete-image/<filename>')
 @login_required
@@ -261,21 +433,15 @@ def delete_product_image(product_id, filename):
         abort(403)
 
     conn = get_db_connection()
-    product = conn.execute("SELECT image FROM products WHERE id = ?", (product_id,)).fetchone()
-    
-    if product and product['image']:
-        images = [img.strip() for img in product['image'].split(',') if img.strip()]
-        if filename in images:
-            images.remove(filename)
-            path = os.path.join(UPLOAD_FOLDER, filename)
-            if os.path.exists(path):
-                try: os.remove(path)
-                except: pass
-            
-            new_image_str = ",".join(images) if images else None
-            conn.execute("UPDATE products SET image = ? WHERE id = ?", (new_image_str, product_id))
-            conn.commit()
-            flash("Image removed.", "info")
+    if remove_product_image(conn, product_id, filename):
+        path = os.path.join(UPLOAD_FOLDER, filename)
+        if os.path.exists(path):
+            try: os.remove(path)
+            except: pass
+        delete_derivatives(conn, "products", [filename])
+        catalogue_cache.invalidate(conn)
+        conn.commit()
+        flash("Image removed.", "info")
     
     conn.close()
     # Redirect back to edit page
@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+from flask import request, url_for
+
+# ==================================================
+# FINGERPRINTED STATIC ASSETS
+# ==================================================
+# build_assets.py copies static/images into static/dist under content-hashed
+# names (plus WebP renditions) and records them in manifest.json. Templates
+# call asset_url()/asset_srcset() with the usual static filename; without a
+# build, or for files the build does not cover, they fall back to the plain
+# url_for('static') URL. Anything under static/dist is served as immutable.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class AssetManifest:
+    """manifest.json, reloaded whenever a rebuild replaces the file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._entries = {}
+
+    def get(self, filename):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    entries = {}
+                    if mtime is not None:
+                        with open(self.path) as f:
+                            entries = json.load(f)
+                    self._entries, self._mtime = entries, mtime
+        return self._entries.get(filename)
+
+
+manifest = AssetManifest(MANIFEST_PATH)
+
+
+def _dist_url(rel_path):
+    return url_for("static", filename=f"dist/{rel_path}")
+
+
+def asset_url(filename, width=None, format=None):
+    """
+    url_for('static', filename=...) replacement for fingerprinted assets.
+
+    With width and/or format (e.g. "webp") it returns the smallest rendition
+    at least that wide, or the widest one available (the default with
+    no width).
+    """
+    entry = manifest.get(filename)
+    if entry is None:
+        return url_for("static", filename=filename)
+    if width is None and format is None:
+        return _dist_url(entry["file"])
+
+    variants = [v for v in entry["variants"] if format is None or v["format"] == format]
+    if not variants:
+        return _dist_url(entry["file"])
+    wide_enough = [v for v in variants if width is not None and v["width"] >= width]
+    chosen = min(wide_enough, key=lambda v: v["width"]) if wide_enough else max(
+        variants, key=lambda v: v["width"]
+    )
+    return _dist_url(chosen["file"])
+
+
+def asset_srcset(filename, format="webp"):
+    """srcset value ("url 480w, url 960w, ...") for an <img>; empty without a build."""
+    entry = manifest.get(filename)
+    if entry is None:
+        return ""
+    return ", ".join(
+        f"{_dist_url(v['file'])} {v['width']}w"
+        for v in entry["variants"]
+        if v["format"] == format
+    )
+
+
+def init_app(app):
+    app.add_template_global(asset_url)
+    app.add_template_global(asset_srcset)
+
+    dist_prefix = f"{app.static_url_path}/dist/"
+
+    @app.after_request
+    def immutable_dist_assets(response):
+        if (
+            request.path.startswith(dist_prefix)
+            and not request.path.endswith("/manifest.json")
+            and response.status_code in (200, 304)
+        ):
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
@@ -0,0 +1,223 @@
+"""
+Content-addressed storage for loan attachments.
+
+Every upload is stored once, named after its SHA-256, under a sharded path
+(uploads/blobs/ab/cd/abcd...). The blobs table keeps one row per stored file
+with a reference count that triggers on application_attachments maintain, so
+two applications uploading the same certificate share one file on disk.
+
+Uploads are staged outside the database transaction (hashing is the slow
+part) and placed in the store inside it, so placement and garbage collection
+are serialized by SQLite's write lock and never race each other:
+
+    staged = [stage_upload(file.stream) for file in files]
+    with transaction() as conn:
+        ... other writes ...
+        commit_blobs(conn, staged)
+        ... INSERT INTO application_attachments (..., digest) ...
+
+Blobs are not under static/: they are only served through the admin views.
+Maintenance:
+
+    python -m utils.blobs import-legacy   # move static/uploads/loans files in
+    python -m utils.blobs gc              # delete unreferenced blobs
+"""
+import hashlib
+import os
+import sys
+import tempfile
+from dataclasses import dataclass
+from utils.database import BASE_DIR, get_db_connection, transaction
+
+BLOB_ROOT = os.environ.get("BLOB_STORAGE_PATH") or os.path.join(BASE_DIR, '..', 'uploads', 'blobs')
+STATIC_ROOT = os.path.join(BASE_DIR, '..', 'static')
+CHUNK_SIZE = 64 * 1024
+
+
+class BlobMissingError(Exception):
+    """A referenced blob is not on disk."""
+
+
+@dataclass
+class StagedBlob:
+    digest: str
+    size: int
+    tmp_path: str = None  # None when the store already had the content
+    stream: object = None  # kept to rewrite the blob if gc removed it meanwhile
+
+
+def blob_path(digest):
+    return os.path.join(BLOB_ROOT, digest[:2], digest[2:4], digest)
+
+
+def blob_relpath(digest):
+    """Value stored in application_attachments.file_path for a blob."""
+    return f"blobs/{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def _hash_stream(stream, out=None):
+    sha = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        sha.update(chunk)
+        size += len(chunk)
+        if out is not None:
+            out.write(chunk)
+    return sha.hexdigest(), size
+
+
+def _write_tmp(stream):
+    os.makedirs(os.path.join(BLOB_ROOT, "tmp"), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.join(BLOB_ROOT, "tmp"))
+    try:
+        with os.fdopen(fd, "wb") as out:
+            digest, size = _hash_stream(stream, out)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return digest, size, tmp_path
+
+
+def known_blob(stream):
+    """
+    Hash a seekable stream and return a StagedBlob (nothing written) when the
+    store already has its content, else None. The stream is rewound either way.
+    """
+    if not stream.seekable():
+        return None
+    start = stream.tell()
+    digest, size = _hash_stream(stream)
+    stream.seek(start)
+    if os.path.exists(blob_path(digest)):
+        return StagedBlob(digest, size, stream=stream)
+    return None
+
+
+def stage_upload(stream):
+    """
+    Hash an upload stream (e.g. FileStorage.stream) in chunks. Content the
+    store already has is not written again; otherwise the bytes are streamed
+    to a temp file in the store, hashed as they are written.
+    """
+    blob = known_blob(stream)
+    if blob is not None:
+        return blob
+
+    digest, size, tmp_path = _write_tmp(stream)
+    return StagedBlob(digest, size, tmp_path=tmp_path)
+
+
+def commit_blobs(conn, staged):
+    """
+    Register staged blobs and move them into the store. Call it inside the
+    write transaction, as the last step before inserting the rows that
+    reference them (the refcount triggers need the blobs rows).
+    """
+    conn.executemany(
+        "INSERT INTO blobs (digest, size) VALUES (?, ?) ON CONFLICT(digest) DO NOTHING",
+        [(blob.digest, blob.size) for blob in staged],
+    )
+    for blob in staged:
+        path = blob_path(blob.digest)
+        if os.path.exists(path):
+            if blob.tmp_path:
+                os.unlink(blob.tmp_path)
+                blob.tmp_path = None
+            continue
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if blob.tmp_path:
+            os.replace(blob.tmp_path, path)
+            blob.tmp_path = None
+        elif blob.stream is not None:
+            # gc removed it between staging and now; we still have the upload
+            digest, _, tmp_path = _write_tmp(blob.stream)
+            if digest != blob.digest:
+                os.unlink(tmp_path)
+                raise BlobMissingError(blob.digest)
+            os.replace(tmp_path, path)
+        else:
+            raise BlobMissingError(blob.digest)
+
+
+def discard_staged(staged):
+    """Remove temp files of a submission that was rolled back."""
+    for blob in staged:
+        if blob.tmp_path and os.path.exists(blob.tmp_path):
+            os.unlink(blob.tmp_path)
+        blob.tmp_path = None
+
+
+def collect_garbage(conn=None):
+    """Delete unreferenced blobs; returns (count, bytes)."""
+    with transaction(conn) as db:
+        rows = db.execute("SELECT digest, size FROM blobs WHERE refcount <= 0").fetchall()
+        db.executemany("DELETE FROM blobs WHERE digest = ?", [(row[0],) for row in rows])
+        # Unlink while the write lock is held so commit_blobs cannot reuse them
+        for digest, _ in rows:
+            try:
+                os.unlink(blob_path(digest))
+            except FileNotFoundError:
+                pass
+    return len(rows), sum(size for _, size in rows)
+
+
+def resolve_attachment(attachment):
+    """Filesystem path of an application_attachments row (blob or legacy static file)."""
+    if attachment['digest']:
+        return blob_path(attachment['digest'])
+
+    relative = attachment['file_path'] or ""
+    if relative.startswith("static/"):
+        relative = relative[len("static/"):]
+    uploads = os.path.realpath(os.path.join(STATIC_ROOT, "uploads"))
+    path = os.path.realpath(os.path.join(STATIC_ROOT, relative))
+    if not path.startswith(uploads + os.sep):
+        return None
+    return path
+
+
+# ==================================================
+# MAINTENANCE
+# ==================================================
+def import_legacy(conn):
+    """Move loan uploads still stored under static/uploads/loans into the blob store."""
+    rows = conn.execute(
+        "SELECT id, file_path FROM application_attachments "
+        "WHERE digest IS NULL AND file_path LIKE 'uploads/loans/%'"
+    ).fetchall()
+    moved = saved = 0
+    for row in rows:
+        path = resolve_attachment({"digest": None, "file_path": row[1]})
+        if not path or not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            staged = [stage_upload(f)]
+            try:
+                with transaction() as db:
+                    commit_blobs(db, staged)
+                    db.execute(
+                        "UPDATE application_attachments SET digest = ?, file_path = ? WHERE id = ?",
+                        (staged[0].digest, blob_relpath(staged[0].digest), row[0]),
+                    )
+            finally:
+                discard_staged(staged)
+        if staged[0].stream is not None:
+            saved += staged[0].size
+        os.unlink(path)
+        moved += 1
+    return moved, saved
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "gc"
+    if command == "import-legacy":
+        conn = get_db_connection()
+        moved, saved = import_legacy(conn)
+        conn.close()
+        print(f"✅ Moved {moved} attachments into the blob store ({saved // 1024}KB were duplicates)")
+    elif command == "gc":
+        count, size = collect_garbage()
+        print(f"✅ Removed {count} unreferenced blobs ({size // 1024}KB)")
+    else:
+        sys.exit("usage: python -m utils.blobs [import-legacy|gc]")
@@ -0,0 +1,187 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+from flask import Response, current_app, has_app_context, request, session
+
+# ==================================================
+# GENERATION-CHECKED IN-PROCESS CACHE
+# ==================================================
+# Each cache is tied to a named counter in the cache_generations table.
+# Write paths call invalidate(conn) inside their own transaction, which bumps
+# the counter when they commit. Every lookup re-reads the counter with one
+# primary-key SELECT, so every gunicorn worker drops its stale copy on its
+# next hit without any cross-process messaging. The TTL is only a safety net
+# for writes that bypass invalidate(). A generation can also be bumped by a
+# trigger (see loan_filter_cache), which no write path can forget.
+
+
+class GenerationCache:
+    def __init__(self, name, ttl_config_key=None, default_ttl=300, max_entries=None):
+        self.name = name
+        self.ttl_config_key = ttl_config_key
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "invalidations": 0}
+
+    @property
+    def ttl(self):
+        if self.ttl_config_key and has_app_context():
+            return current_app.config.get(self.ttl_config_key, self.default_ttl)
+        return self.default_ttl
+
+    def generation(self, conn):
+        row = conn.execute(
+            "SELECT generation FROM cache_generations WHERE name = ?", (self.name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_or_load(self, conn, key, loader):
+        """Return the cached value for key, calling loader() on a miss."""
+        generation = self.generation(conn)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == generation:
+                if entry[1] > now:
+                    self._stats["hits"] += 1
+                    return entry[2]
+                self._stats["expired"] += 1
+            self._stats["misses"] += 1
+
+        value = loader()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (generation, now + self.ttl, value)
+            if self.max_entries and len(self._entries) > self.max_entries:
+                # Oldest load first (dicts keep insertion order)
+                del self._entries[next(iter(self._entries))]
+        return value
+
+    def invalidate(self, conn):
+        """Bump the generation; takes effect when the caller's transaction commits."""
+        conn.execute("""
+            INSERT INTO cache_generations (name, generation) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET generation = generation + 1
+        """, (self.name,))
+        with self._lock:
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                hit_rate=round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            )
+
+
+# Active product list and rendered grid behind market_place.home
+catalogue_cache = GenerationCache("catalogue", ttl_config_key="CATALOGUE_CACHE_TTL")
+
+# admin.filter_loans result counts, one per filter signature. Triggers on
+# loan_applications (migration 11) bump the generation on every change.
+loan_filter_cache = GenerationCache("loan_filters", ttl_config_key="LOAN_FILTER_CACHE_TTL", max_entries=1000)
+
+
+# ==================================================
+# FULL-PAGE RESPONSE CACHE
+# ==================================================
+# For views whose output only changes on deploy (the marketing pages). The
+# rendered body is kept per (path, anonymous/logged-in) and served with a
+# strong ETag, so a matching If-None-Match gets a 304 without touching Jinja.
+# Requests with pending flashed messages always render, because the template
+# has to consume them. Set PAGE_CACHE_TTL = 0 while editing these templates.
+
+
+class PageCache:
+    def __init__(self, ttl_config_key="PAGE_CACHE_TTL", max_age_config_key="PAGE_CACHE_MAX_AGE",
+                 default_ttl=600, default_max_age=60):
+        self.ttl_config_key = ttl_config_key
+        self.max_age_config_key = max_age_config_key
+        self.default_ttl = default_ttl
+        self.default_max_age = default_max_age
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "bypassed": 0}
+
+    def _bypass(self):
+        return (
+            request.method not in ("GET", "HEAD")
+            or not current_app.config.get(self.ttl_config_key, self.default_ttl)
+            or "_flashes" in session
+        )
+
+    def _respond(self, entry, logged_in):
+        _, etag, body, mimetype = entry
+        if request.if_none_match.contains(etag):
+            with self._lock:
+                self._stats["not_modified"] += 1
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=mimetype)
+        response.set_etag(etag)
+        response.vary.add("Cookie")
+        response.cache_control.max_age = current_app.config.get(
+            self.max_age_config_key, self.default_max_age
+        )
+        if logged_in:
+            response.cache_control.private = True
+        else:
+            response.cache_control.public = True
+        return response
+
+    def cached(self, view):
+        """Decorator for GET views that render the same bytes for every visitor."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if self._bypass():
+                with self._lock:
+                    self._stats["bypassed"] += 1
+                return view(*args, **kwargs)
+
+            logged_in = "user_id" in session
+            key = (request.path, logged_in)
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(key)
+                fresh = entry is not None and entry[0] > now
+                self._stats["hits" if fresh else "misses"] += 1
+            if fresh:
+                return self._respond(entry, logged_in)
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+
+            body = response.get_data()
+            etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+            ttl = current_app.config.get(self.ttl_config_key, self.default_ttl)
+            entry = (now + ttl, etag, body, response.mimetype)
+            with self._lock:
+                self._entries[key] = entry
+            return self._respond(entry, logged_in)
+
+        return wrapper
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                hit_rate=round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            )
+
+
+# Marketing pages (core home, service landing pages, brand studio)
+page_cache = PageCache()
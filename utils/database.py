@@ -2,15 +2,18 @@ import sqlite3
 import os
 import uuid
 import time
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from flask import current_app, g, has_app_context
 from werkzeug.security import generate_password_hash, check_password_hash
-import base64
+from utils.migrations import migrate
 
 # ==================================================
 # PATHS & UPLOAD FOLDERS
 # ==================================================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, '..', 'portfolio.db')
+DB_PATH = os.environ.get("DATABASE_PATH") or os.path.join(BASE_DIR, '..', 'portfolio.db')
 
 UPLOAD_BASE = os.path.join(BASE_DIR, '..', 'static', 'uploads')
 UPLOAD_FOLDERS = [
@@ -34,223 +37,264 @@ def allowed_file(filename):
 # ==================================================
 # DATABASE CONNECTION
 # ==================================================
+# PRAGMA profiles applied once when a connection is opened. "production"
+# switches to WAL so readers no longer block behind contact-form and loan
+# writes across gunicorn workers.
+PRAGMA_PROFILES = {
+    "default": {
+        "foreign_keys": "ON",
+    },
+    "production": {
+        "busy_timeout": 10000,          # ms, matches the old connect timeout
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",        # durable with WAL, no fsync per commit
+        "foreign_keys": "ON",
+        "cache_size": -16000,           # negative = KiB, ~16MB page cache
+        "mmap_size": 128 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+def apply_pragmas(conn, pragmas):
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor of a PooledConnection with a QueryProfile attached."""
+
+    def execute(self, sql, parameters=()):
+        return self.connection.profile.timed(lambda: super(ProfiledCursor, self).execute(sql, parameters), sql)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.connection.profile.timed(lambda: super(ProfiledCursor, self).executemany(sql, seq_of_parameters), sql)
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Connection owned by a ConnectionPool. While it is checked out for a
+    request, close() is a no-op so views can keep their open/close pattern;
+    the pool gets it back at app-context teardown. With the SQL profiler on,
+    profile is the request's utils.profiler.QueryProfile.
+    """
+    pooled = False
+    profile = None
+
+    def execute(self, sql, parameters=()):
+        if self.profile is None:
+            return super().execute(sql, parameters)
+        return self.profile.timed(lambda: super(PooledConnection, self).execute(sql, parameters), sql)
+
+    def executemany(self, sql, seq_of_parameters):
+        if self.profile is None:
+            return super().executemany(sql, seq_of_parameters)
+        return self.profile.timed(lambda: super(PooledConnection, self).executemany(sql, seq_of_parameters), sql)
+
+    def cursor(self, factory=sqlite3.Cursor):
+        if self.profile is not None and factory is sqlite3.Cursor:
+            factory = ProfiledCursor
+        return super().cursor(factory)
+
+    def close(self):
+        if self.pooled:
+            return
+        super().close()
+
+    def discard(self):
+        self.pooled = False
+        super().close()
+
+
+class ConnectionPool:
+    """Bounded per-worker pool of configured SQLite connections."""
+
+    def __init__(self, db_path, size=8, timeout=10, cached_statements=128, pragmas=None):
+        self.db_path = db_path
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.pragmas = pragmas if pragmas is not None else PRAGMA_PROFILES["default"]
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = []
+        self._open = 0
+        self._in_use = 0
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "peak_in_use": 0,
+            "created": 0,
+            "discarded": 0,
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=PooledConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        apply_pragmas(conn, self.pragmas)
+        conn.pooled = True
+        return conn
+
+    def acquire(self):
+        with self._cond:
+            # Connections inherited across a fork belong to the parent
+            if self._pid != os.getpid():
+                self._reset()
+
+            self._stats["checkouts"] += 1
+            if not self._idle and self._open >= self.size:
+                self._stats["waits"] += 1
+                started = time.perf_counter()
+                deadline = started + self.timeout
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if self._idle or self._open < self.size:
+                            break
+                        self._stats["wait_time"] += time.perf_counter() - started
+                        raise sqlite3.OperationalError("database connection pool exhausted")
+                self._stats["wait_time"] += time.perf_counter() - started
+
+            self._in_use += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._in_use)
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        return conn
+
+    def release(self, conn):
+        healthy = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            healthy = False
+
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._in_use -= 1
+            if healthy:
+                self._idle.append(conn)
+            else:
+                self._open -= 1
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        if not healthy:
+            conn.discard()
+
+    def stats(self):
+        with self._cond:
+            return dict(
+                self._stats,
+                size=self.size,
+                open=self._open,
+                in_use=self._in_use,
+                idle=len(self._idle),
+            )
+
+
+def init_app(app):
+    """Attach a connection pool to the app and return connections at teardown."""
+    profile = app.config.get("DB_PRAGMA_PROFILE", "default")
+    if profile not in PRAGMA_PROFILES:
+        raise ValueError(f"Unknown DB_PRAGMA_PROFILE: {profile}")
+    pragmas = dict(PRAGMA_PROFILES[profile], **app.config.get("DB_PRAGMAS", {}))
+
+    app.extensions["db_pool"] = ConnectionPool(
+        DB_PATH,
+        size=app.config.get("DB_POOL_SIZE", 8),
+        timeout=app.config.get("DB_POOL_TIMEOUT", 10),
+        cached_statements=app.config.get("DB_STATEMENT_CACHE_SIZE", 128),
+        pragmas=pragmas,
+    )
+    app.teardown_appcontext(close_db)
+
+
+def close_db(exc=None):
+    conn = g.pop("db", None)
+    if conn is not None:
+        if conn.profile is not None:
+            conn.profile.detach(conn)
+        current_app.extensions["db_pool"].release(conn)
+
+
+def get_pool_stats():
+    pool = current_app.extensions.get("db_pool")
+    return pool.stats() if pool else {}
+
+
 def get_db_connection():
+    # Inside a request every caller shares one pooled connection
+    if has_app_context():
+        pool = current_app.extensions.get("db_pool")
+        if pool is not None:
+            if "db" not in g:
+                g.db = pool.acquire()
+                if g.get("sql_profile") is not None:
+                    g.sql_profile.attach(g.db)
+            return g.db
+
     conn = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+    apply_pragmas(conn, PRAGMA_PROFILES["default"])
     return conn
 
+@contextmanager
+def transaction(conn=None):
+    """
+    Unit of work: everything executed on the yielded connection commits once
+    on exit or rolls back on error. Passing the connection of an enclosing
+    unit of work joins it instead of starting a new transaction, which lets
+    the helpers below run standalone or as part of a larger submission.
+    """
+    if conn is not None:
+        yield conn
+        return
+
+    conn = get_db_connection()
+    try:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
 # ==================================================
 # DATABASE INITIALIZATION
 # ==================================================
 def initialize_db():
     conn = get_db_connection()
-    c = conn.cursor()
-
-    # ---------------- USERS ----------------
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            role TEXT DEFAULT 'user',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # ---------------- BLOGS ----------------
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS blogs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            content TEXT NOT NULL,
-            image TEXT,
-            status TEXT DEFAULT 'published',
-            created_by INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP,
-            FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
-        )
-    """)
-
-    # ---------------- COMMENTS ----------------
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS comments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            blog_id INTEGER NOT NULL,
-            user_id INTEGER NOT NULL,
-            content TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (blog_id) REFERENCES blogs(id) ON DELETE CASCADE,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-        )
-    """)
-
-    # ---------------- PRODUCTS ----------------
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT,
-            price REAL,
-            image TEXT,
-            status TEXT DEFAULT 'available',
-            is_active INTEGER DEFAULT 1,
-            created_by INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
-        )
-    """)
-
-    # ---------------- PRODUCT INQUIRIES ----------------
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS product_inquiries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id INTEGER NOT NULL,
-            user_id INTEGER,
-            name TEXT,
-            email TEXT,
-            phone TEXT,
-            bid_price REAL,
-            message TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-        )
-    """)
-
-    # ---------------- LOAN APPLICATIONS ----------------
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS loan_applications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            application_number TEXT UNIQUE NOT NULL,
-            loan_type TEXT CHECK(loan_type IN ('personal','business')) NOT NULL,
-            status TEXT DEFAULT 'pending',
-            user_id INTEGER,
-            interest_rate REAL DEFAULT 0.30,
-            total_repayment REAL,
-            admin_notes TEXT,
-            applied_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_date TIMESTAMP,
-            decision_date TIMESTAMP,
-            decision_by INTEGER,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-        )
-    """)
-
-    # ---------------- PERSONAL LOANS ----------------
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS personal_loan_details (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            application_id INTEGER UNIQUE NOT NULL,
-            loan_amount REAL NOT NULL,
-            purpose TEXT NOT NULL,
-            repayment_period_days INTEGER NOT NULL,
-            full_name TEXT NOT NULL,
-            date_of_birth DATE,
-            nrc_number TEXT,
-            email TEXT,
-            phone_number TEXT,
-            residential_address TEXT,
-            terms_accepted INTEGER DEFAULT 0,
-            agreement_date TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (application_id) REFERENCES loan_applications(id) ON DELETE CASCADE
-        )
-    """)
-
-    # ---------------- BUSINESS LOANS ----------------
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS business_loan_details (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            application_id INTEGER UNIQUE NOT NULL,
-            business_name TEXT NOT NULL,
-            business_registration_number TEXT NOT NULL,
-            loan_amount REAL NOT NULL,
-            purpose TEXT NOT NULL,
-            repayment_period_days INTEGER NOT NULL,
-            contact_person_name TEXT,
-            contact_email TEXT,
-            contact_phone TEXT,
-            contact_person_position TEXT,
-            business_address TEXT,
-            terms_accepted INTEGER DEFAULT 0,
-            agreement_date TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (application_id) REFERENCES loan_applications(id) ON DELETE CASCADE
-        )
-    """)
-
-    # ---------------- COLLATERAL ----------------
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS collateral_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            application_id INTEGER NOT NULL,
-            loan_type TEXT NOT NULL,
-            item_name TEXT NOT NULL,
-            item_type TEXT,
-            estimated_value REAL,
-            condition_description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (application_id) REFERENCES loan_applications(id) ON DELETE CASCADE
-        )
-    """)
-
-    # ---------------- ATTACHMENTS ----------------
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS application_attachments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            application_id INTEGER NOT NULL,
-            document_category TEXT,
-            file_name TEXT NOT NULL,
-            file_path TEXT NOT NULL,
-            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (application_id) REFERENCES loan_applications(id) ON DELETE CASCADE
-        )
-    """)
-
-    # ---------------- TUKAKULA QUERIES ----------------
-    c.execute("""  
-        CREATE TABLE IF NOT EXISTS tukakula_queries (
-            id TEXT PRIMARY KEY,
-            full_name TEXT NOT NULL,
-            company_name TEXT,
-            email TEXT NOT NULL,
-            phone TEXT,
-            whatsapp TEXT,
-            inquiry_target TEXT NOT NULL,
-            service TEXT,
-            subject TEXT,
-            reason TEXT NOT NULL,
-            message TEXT NOT NULL,
-            status TEXT DEFAULT 'new',
-            created_at TEXT NOT NULL
-        )
-    """)
-
-    conn.commit()
-    
-    # --- MIGRATION CHECK ---
-    migrations = [
-        ("products", "is_active", "INTEGER DEFAULT 1"),
-        ("products", "created_by", "INTEGER"),
-        ("products", "status", "TEXT DEFAULT 'available'"),
-        ("product_inquiries", "name", "TEXT"),
-        ("product_inquiries", "email", "TEXT"),
-        ("product_inquiries", "phone", "TEXT"),
-        ("product_inquiries", "bid_price", "REAL"),
-        ("business_loan_details", "contact_person_position", "TEXT")
-    ]
-
-    for table, column, definition in migrations:
-        try:
-            c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
-        except sqlite3.OperationalError:
-            pass 
+    try:
+        applied = migrate(conn)
+    finally:
+        conn.close()
 
-    conn.commit()
-    conn.close()
-    print("✅ Database initialized and migrated successfully.")
+    for number, name in applied:
+        print(f"✅ Applied migration {number}: {name}")
 
 # ==================================================
 # USER AUTH HELPERS
@@ -288,24 +332,20 @@ def generate_application_number(loan_type):
     prefix = "PERS" if loan_type == "personal" else "BUS"
     return f"{prefix}-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6].upper()}"
 
-def create_loan_application(user_id, loan_type):
-    conn = get_db_connection()
+def create_loan_application(user_id, loan_type, conn=None, application_number=None):
+    app_number = application_number or generate_application_number(loan_type)
     try:
-        c = conn.cursor()
-        app_number = generate_application_number(loan_type)
-        c.execute("""
-            INSERT INTO loan_applications (application_number, loan_type, user_id)
-            VALUES (?, ?, ?)
-        """, (app_number, loan_type, user_id))
-        conn.commit()
-        return c.lastrowid, app_number
+        with transaction(conn) as db:
+            c = db.execute("""
+                INSERT INTO loan_applications (application_number, loan_type, user_id)
+                VALUES (?, ?, ?)
+            """, (app_number, loan_type, user_id))
+            return c.lastrowid, app_number
     except sqlite3.Error as e:
         print(f"[DB ERROR] create_loan_application: {e}")
         return None, None
-    finally:
-        conn.close()
 
-def save_personal_loan_details(application_id, data):
+def save_personal_loan_details(application_id, data, conn=None):
     try:
         raw_amt = data.get('ind-amt') or data.get('ind_amt')
         if not raw_amt:
@@ -319,23 +359,12 @@ def save_personal_loan_details(application_id, data):
 
         dob_raw = data.get('ind-dob')
         date_of_birth = datetime.strptime(dob_raw, '%Y-%m-%d').date() if dob_raw else None
-
-        signature_data = data.get('ind-signature-data')
-        signature_filename = None
-        if signature_data and signature_data.startswith('data:image'):
-            header, encoded = signature_data.split(',', 1)
-            signature_filename = f"signature_{uuid.uuid4().hex[:8]}.png"
-            signature_path = os.path.join(UPLOAD_BASE, 'signatures', signature_filename)
-            with open(signature_path, 'wb') as f:
-                f.write(base64.b64decode(encoded))
     except Exception as e:
         print(f"Error: {e}")
         return False
 
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        c.execute("""
+    with transaction(conn) as db:
+        db.execute("""
             INSERT INTO personal_loan_details (
                 application_id, loan_amount, purpose, repayment_period_days,
                 full_name, date_of_birth, nrc_number, email, phone_number,
@@ -344,17 +373,11 @@ def save_personal_loan_details(application_id, data):
         """, (application_id, loan_amount, data.get('ind-purpose'), repayment_period,
               data.get('ind-name'), date_of_birth, data.get('ind-nrc'), data.get('ind-email'),
               data.get('ind-phone'), data.get('ind-address'), 1, datetime.now()))
-        
-        if signature_filename:
-            c.execute("INSERT INTO application_attachments (application_id, document_category, file_name, file_path) VALUES (?, ?, ?, ?)",
-                      (application_id, 'signature', signature_filename, f"static/uploads/signatures/{signature_filename}"))
-        conn.commit()
-        return True
-    finally:
-        conn.close()
+    # The drawn signature is decoded by the "loan.signature" job (utils.loan_processing)
+    return True
 # ==================================================
 # BUSINESS LOAN HELPERS
-def save_business_loan_details(application_id, data):
+def save_business_loan_details(application_id, data, conn=None):
     try:
         raw_amt = data.get('bus-amt')
         loan_amount = float(str(raw_amt).replace(',', '').strip()) if raw_amt else 0.0
@@ -362,10 +385,8 @@ def save_business_loan_details(application_id, data):
         repayment_period = int(raw_period) if raw_period and str(raw_period).isdigit() else 30
     except: return False
 
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        c.execute("""
+    with transaction(conn) as db:
+        db.execute("""
             INSERT INTO business_loan_details (
                 application_id, business_name, business_registration_number, loan_amount,
                 purpose, repayment_period_days, contact_person_name, contact_email,
@@ -376,35 +397,33 @@ def save_business_loan_details(application_id, data):
               data.get('bus-contact-email'), data.get('bus-contact-phone'),
               data.get('bus-contact-position'), data.get('bus-reason'),
               1 if data.get('bus-agreement') == 'on' else 0, datetime.now()))
-        conn.commit()
-        return True
-    finally:
-        conn.close()
+    return True
 # ==================================================
 # COLLATERAL HELPERS
-def save_collateral_items(application_id, loan_type, items_list):
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        for item in items_list:
-            c.execute("INSERT INTO collateral_items (application_id, loan_type, item_name, item_type, estimated_value, condition_description) VALUES (?, ?, ?, ?, ?, ?)",
-                      (application_id, loan_type, item.get('name'), item.get('type'), item.get('value'), item.get('condition')))
-        conn.commit()
-        return True
-    finally:
-        conn.close()
+def save_collateral_items(application_id, loan_type, items_list, conn=None):
+    with transaction(conn) as db:
+        db.executemany(
+            "INSERT INTO collateral_items (application_id, loan_type, item_name, item_type, estimated_value, condition_description) VALUES (?, ?, ?, ?, ?, ?)",
+            [(application_id, loan_type, item.get('name'), item.get('type'), item.get('value'), item.get('condition'))
+             for item in items_list]
+        )
+    return True
 # ==================================================
 # ATTACHMENT HELPERS
-def save_application_attachments(application_id, category, filename, filepath):
-    conn = get_db_connection()
-    try:
-        c = conn.cursor()
-        c.execute("INSERT INTO application_attachments (application_id, document_category, file_name, file_path) VALUES (?, ?, ?, ?)",
-                  (application_id, category, filename, filepath))
-        conn.commit()
-        return True
-    finally:
-        conn.close()
+def save_application_attachments(application_id, category, filename, filepath, conn=None):
+    return save_application_attachments_many(application_id, [(category, filename, filepath)], conn)
+
+def save_application_attachments_many(application_id, attachments, conn=None):
+    """
+    attachments: iterable of (category, filename, filepath) or
+    (category, filename, filepath, digest) rows; digest refers to utils.blobs.
+    """
+    with transaction(conn) as db:
+        db.executemany(
+            "INSERT INTO application_attachments (application_id, document_category, file_name, file_path, digest) VALUES (?, ?, ?, ?, ?)",
+            [(application_id, *row[:3], row[3] if len(row) > 3 else None) for row in attachments]
+        )
+    return True
 # ==================================================
 # ADMIN HELPERS
 def update_loan_status(loan_id, status, admin_notes, admin_id):
@@ -424,11 +443,97 @@ def calculate_total_repayment(loan_amount, rate=0.30):
         return round(float(loan_amount) * (1 + float(rate)), 2)
     except: return 0.0
 # ==================================================
+# BLOG HELPERS
+def get_recent_comments(conn, blog_ids, per_blog):
+    """
+    Return {blog_id: {'comments': [...], 'total': n}} for every id in
+    blog_ids, keeping at most `per_blog` of the newest comments per post.
+    """
+    grouped = {blog_id: {'comments': [], 'total': 0} for blog_id in blog_ids}
+    if not blog_ids:
+        return grouped
+
+    placeholders = ", ".join("?" * len(blog_ids))
+    rows = conn.execute(f"""
+        SELECT id, blog_id, content, created_at, user_email, total
+        FROM (
+            SELECT c.id, c.blog_id, c.content, c.created_at, u.email AS user_email,
+                   ROW_NUMBER() OVER (PARTITION BY c.blog_id ORDER BY c.created_at DESC, c.id DESC) AS rn,
+                   COUNT(*) OVER (PARTITION BY c.blog_id) AS total
+            FROM comments c
+            JOIN users u ON c.user_id = u.id
+            WHERE c.blog_id IN ({placeholders})
+        )
+        WHERE rn <= ?
+        ORDER BY blog_id, created_at ASC, id ASC
+    """, (*blog_ids, per_blog)).fetchall()
+
+    for row in rows:
+        entry = grouped[row['blog_id']]
+        entry['comments'].append(dict(row))
+        entry['total'] = row['total']
+    return grouped
+# ==================================================
 # PRODUCT IMAGE HELPERS
-def get_product_images(image_string):
-    if not image_string:
-        return []
-    return [img.strip() for img in image_string.split(',') if img.strip()]
+def add_product_images(conn, product_id, filenames):
+    """Append uploads to the end of a product's gallery; a product's first image becomes primary."""
+    conn.executemany("""
+        INSERT INTO product_images (product_id, filename, position, is_primary)
+        SELECT ?, ?, COALESCE(MAX(position) + 1, 0), COALESCE(MAX(is_primary), 0) = 0
+        FROM product_images WHERE product_id = ?
+    """, [(product_id, filename, product_id) for filename in filenames])
+
+def remove_product_image(conn, product_id, filename):
+    """Delete one gallery row, promoting the next image if it was the primary. Returns False if absent."""
+    deleted = conn.execute(
+        "DELETE FROM product_images WHERE product_id = ? AND filename = ?", (product_id, filename)
+    ).rowcount
+    if deleted:
+        conn.execute("""
+            UPDATE product_images SET is_primary = 1
+            WHERE id = (SELECT id FROM product_images WHERE product_id = ? ORDER BY position, id LIMIT 1)
+              AND NOT EXISTS (SELECT 1 FROM product_images WHERE product_id = ? AND is_primary = 1)
+        """, (product_id, product_id))
+    return bool(deleted)
+
+def get_product_image_filenames(conn, product_id):
+    return [row[0] for row in conn.execute(
+        "SELECT filename FROM product_images WHERE product_id = ? ORDER BY position, id", (product_id,)
+    )]
+
+def get_product_images(conn, product_id):
+    """
+    A product's gallery in order, as dicts with filename, url (original),
+    thumb/card/detail URLs from utils.derivatives, width, height and is_primary.
+    """
+    from utils.derivatives import derivative_urls
+    rows = conn.execute("""
+        SELECT filename, width, height, is_primary FROM product_images
+        WHERE product_id = ? ORDER BY position, id
+    """, (product_id,)).fetchall()
+    urls = derivative_urls(conn, "products", [row['filename'] for row in rows])
+    return [
+        dict(urls[row['filename']], width=row['width'], height=row['height'], is_primary=bool(row['is_primary']))
+        for row in rows
+    ]
+
+def attach_primary_images(conn, products):
+    """Swap each product dict's primary_image filename for its URL dict (or None)."""
+    from utils.derivatives import derivative_urls
+    urls = derivative_urls(conn, "products", [p['primary_image'] for p in products])
+    for product in products:
+        product['primary_image'] = urls.get(product['primary_image'])
+    return products
+
+# Listing columns plus the primary image through idx_product_images_primary;
+# image_count is answered from idx_product_images_product_position
+PRODUCT_LISTING_SQL = """
+    SELECT p.id, p.name, p.description, p.price, p.status, p.is_active, p.created_at,
+           pi.filename AS primary_image,
+           (SELECT COUNT(*) FROM product_images c WHERE c.product_id = p.id) AS image_count
+    FROM products p
+    LEFT JOIN product_images pi ON pi.product_id = p.id AND pi.is_primary = 1
+"""
 
 if __name__ == "__main__":
     initialize_db()
\ No newline at end of file
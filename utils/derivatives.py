@@ -0,0 +1,205 @@
+"""
+Background thumbnail/card/detail renditions for uploaded images.
+
+Upload views save the original, commit, then call schedule_derivatives().
+A per-process thread pool writes WebP copies to static/uploads/derived and
+records them in image_derivatives. Until a rendition exists, derivative_urls()
+hands templates the original, so pages never wait on Pillow. Product renders
+bump the catalogue cache so the cached grid picks up the smaller files.
+
+Uploads made while no worker was running (crash, restart) are picked up by:
+
+    python -m utils.derivatives
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context, url_for
+from utils.cache import catalogue_cache
+from utils.database import UPLOAD_BASE, get_db_connection, transaction
+
+# Variant name -> maximum width in pixels (never upscaled)
+DERIVATIVE_SIZES = {
+    "thumb": 160,
+    "card": 600,
+    "detail": 1600,
+}
+
+DERIVED_DIR = "derived"
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers):
+    # One pool per process: threads do not survive a gunicorn fork
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="image-derivatives"
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _report_failure(future):
+    error = future.exception()
+    if error is not None:
+        print(f"❌ Image derivative generation failed: {error}")
+
+
+def schedule_derivatives(folder, filenames):
+    """Queue renditions for freshly saved uploads in static/uploads/<folder>."""
+    workers = 2
+    if has_app_context():
+        workers = current_app.config.get("IMAGE_DERIVATIVE_WORKERS", workers)
+
+    for filename in filter(None, filenames):
+        if workers <= 0:
+            # Inline: the upload has already committed, so a file Pillow
+            # cannot read is logged like a pool failure, never a 500
+            try:
+                generate_derivatives(folder, filename)
+            except Exception as error:
+                print(f"❌ Image derivative generation failed: {error}")
+            continue
+        future = _get_executor(workers).submit(generate_derivatives, folder, filename)
+        future.add_done_callback(_report_failure)
+
+
+def _derived_path(folder, filename, variant):
+    # The whole filename, extension included: a.png and a.jpg are different uploads
+    return f"uploads/{DERIVED_DIR}/{folder}/{filename}.{variant}.webp"
+
+
+def _static_path(rel_path):
+    return os.path.join(UPLOAD_BASE, rel_path.split("/", 1)[1])
+
+
+def generate_derivatives(folder, filename):
+    """Write every DERIVATIVE_SIZES rendition of one upload and record it."""
+    # Pillow is only needed where renditions are produced
+    from utils.images import encode_image, open_image, resize_to_width
+
+    source_path = os.path.join(UPLOAD_BASE, folder, filename)
+    image = open_image(source_path)
+
+    rows = []
+    for variant, width in DERIVATIVE_SIZES.items():
+        resized = resize_to_width(image, width)
+        rel_path = _derived_path(folder, filename, variant)
+        path = _static_path(rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(encode_image(resized, "WEBP"))
+        os.replace(path + ".tmp", path)
+        rows.append((f"{folder}/{filename}", variant, rel_path, resized.width, resized.height))
+
+    with transaction() as conn:
+        conn.executemany("""
+            INSERT INTO image_derivatives (source, variant, path, width, height)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(source, variant) DO UPDATE SET
+                path = excluded.path,
+                width = excluded.width,
+                height = excluded.height,
+                created_at = CURRENT_TIMESTAMP
+        """, rows)
+        if folder == "products":
+            conn.execute(
+                "UPDATE product_images SET width = ?, height = ? WHERE filename = ?",
+                (image.width, image.height, filename),
+            )
+            catalogue_cache.invalidate(conn)
+
+    # The upload may have been deleted while we were encoding it
+    if not os.path.exists(source_path):
+        with transaction() as conn:
+            delete_derivatives(conn, folder, [filename])
+
+
+def derivative_urls(conn, folder, filenames):
+    """
+    Map each filename in static/uploads/<folder> to its URLs:
+    {"filename", "url", "thumb", "card", "detail"}. Renditions that are not
+    ready yet point at the original. One query for the whole batch.
+    """
+    filenames = list(dict.fromkeys(f for f in filenames if f))
+    if not filenames:
+        return {}
+
+    urls = {}
+    for filename in filenames:
+        original = url_for("static", filename=f"uploads/{folder}/{filename}")
+        urls[filename] = dict(
+            {variant: original for variant in DERIVATIVE_SIZES},
+            filename=filename,
+            url=original,
+        )
+
+    sources = [f"{folder}/{filename}" for filename in filenames]
+    placeholders = ", ".join("?" * len(sources))
+    rows = conn.execute(
+        f"SELECT source, variant, path FROM image_derivatives WHERE source IN ({placeholders})",
+        sources,
+    ).fetchall()
+    for source, variant, path in rows:
+        if variant in DERIVATIVE_SIZES:
+            urls[source.split("/", 1)[1]][variant] = url_for("static", filename=path)
+    return urls
+
+
+def delete_derivatives(conn, folder, filenames):
+    """Drop the renditions of deleted uploads (rows on conn, files right away)."""
+    sources = [f"{folder}/{filename}" for filename in filenames if filename]
+    if not sources:
+        return
+    placeholders = ", ".join("?" * len(sources))
+    paths = [row[0] for row in conn.execute(
+        f"SELECT path FROM image_derivatives WHERE source IN ({placeholders})", sources
+    )]
+    conn.execute(f"DELETE FROM image_derivatives WHERE source IN ({placeholders})", sources)
+    for path in paths:
+        try:
+            os.remove(_static_path(path))
+        except OSError:
+            pass
+
+
+# ==================================================
+# BACKFILL
+# ==================================================
+def missing_derivatives(conn):
+    """(folder, filename) for every product/blog upload lacking a rendition."""
+    done = {}
+    for source, count in conn.execute(
+        "SELECT source, COUNT(*) FROM image_derivatives GROUP BY source"
+    ):
+        done[source] = count
+
+    uploads = []
+    for (filename,) in conn.execute("SELECT filename FROM product_images"):
+        uploads.append(("products", filename))
+    for (image,) in conn.execute("SELECT image FROM blogs WHERE image IS NOT NULL AND image != ''"):
+        uploads.append(("blogs", image))
+
+    return [
+        (folder, filename) for folder, filename in uploads
+        if done.get(f"{folder}/{filename}", 0) < len(DERIVATIVE_SIZES)
+        and os.path.exists(os.path.join(UPLOAD_BASE, folder, filename))
+    ]
+
+
+if __name__ == "__main__":
+    conn = get_db_connection()
+    pending = missing_derivatives(conn)
+    conn.close()
+    for folder, filename in pending:
+        try:
+            generate_derivatives(folder, filename)
+            print(f"✅ {folder}/{filename}")
+        except Exception as e:
+            print(f"❌ {folder}/{filename}: {e}")
+    print(f"--- {len(pending)} uploads processed ---")
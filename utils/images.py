@@ -0,0 +1,47 @@
+import io
+from PIL import Image, ImageOps
+
+# ==================================================
+# IMAGE ENCODING HELPERS (Pillow)
+# ==================================================
+# Shared by build_assets.py and anything else that writes resized copies of
+# uploaded or bundled images. Only import this where Pillow is required.
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+FORMAT_EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg", "PNG": "png"}
+
+
+def open_image(path):
+    """Open an image with its EXIF orientation applied."""
+    image = Image.open(path)
+    image.load()
+    return ImageOps.exif_transpose(image)
+
+
+def resize_to_width(image, width):
+    """Scale down to width, keeping the aspect ratio. Never upscales."""
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def encode_image(image, fmt):
+    """Encode to WEBP/JPEG/PNG bytes with metadata stripped."""
+    fmt = fmt.upper()
+    if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    options = {
+        "WEBP": {"quality": WEBP_QUALITY, "method": 6},
+        "JPEG": {"quality": JPEG_QUALITY, "optimize": True, "progressive": True},
+        "PNG": {"optimize": True},
+    }[fmt]
+
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
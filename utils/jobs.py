@@ -0,0 +1,190 @@
+"""
+Durable background jobs, queued in the jobs table of the app database.
+
+A view enqueues work inside the same transaction as the rows it belongs to,
+so a job exists exactly when its data was committed:
+
+    with transaction() as conn:
+        application_id, _ = create_loan_application(..., conn=conn)
+        enqueue(conn, "loan.attachments", {"files": [...]}, application_id=application_id)
+
+Handlers are registered per kind with @handler and run by `python worker.py`.
+A failing job is retried with exponential backoff until max_attempts, then
+left as 'failed'. Jobs of a worker that died mid-job are requeued once
+their lock is older than STALE_AFTER. A handler that writes to the
+database should call complete() in its own final transaction, so a crash
+after that commit can never run the write twice.
+"""
+import json
+import os
+import socket
+import time
+import traceback
+from dataclasses import dataclass
+from utils.database import transaction
+
+RETRY_BASE_DELAY = 5  # seconds; doubles with every failed attempt
+RETRY_MAX_DELAY = 60 * 60
+STALE_AFTER = 10 * 60  # seconds a running job may hold its lock
+
+PENDING_STATUSES = ("queued", "running")
+
+_handlers = {}
+
+
+class UnknownJobError(Exception):
+    """No handler is registered for a job's kind."""
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    payload: dict
+    application_id: int
+    attempts: int
+    max_attempts: int
+
+
+def handler(kind):
+    """Register the function that runs jobs of this kind: fn(job)."""
+    def decorator(fn):
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def enqueue(conn, kind, payload=None, application_id=None, max_attempts=5, delay=0):
+    """Queue a job on conn (joins the caller's transaction) and return its id."""
+    cursor = conn.execute("""
+        INSERT INTO jobs (kind, payload, application_id, max_attempts, run_after)
+        VALUES (?, ?, ?, ?, ?)
+    """, (kind, json.dumps(payload or {}), application_id, max_attempts, time.time() + delay))
+    return cursor.lastrowid
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker, job_id=None):
+    """Lock the next due job (or the given one) for worker; None when idle."""
+    now = time.time()
+    query = """
+        UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_by = ?, locked_at = ?
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE status = 'queued' AND run_after <= ? {only}
+            ORDER BY run_after, id LIMIT 1
+        )
+        RETURNING id, kind, payload, application_id, attempts, max_attempts
+    """
+    params = [worker, now, now]
+    if job_id is not None:
+        params.append(job_id)
+    with transaction() as conn:
+        row = conn.execute(
+            query.format(only="AND id = ?" if job_id is not None else ""), params
+        ).fetchone()
+    if row is None:
+        return None
+    return Job(row[0], row[1], json.loads(row[2]), row[3], row[4], row[5])
+
+
+def complete(conn, job):
+    conn.execute("""
+        UPDATE jobs SET status = 'done', locked_by = NULL, last_error = NULL,
+                        finished_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND status = 'running'
+    """, (job.id,))
+
+
+def fail(job, error):
+    """Reschedule with backoff, or mark failed once attempts are used up."""
+    if job.attempts >= job.max_attempts:
+        status, run_after = "failed", time.time()
+    else:
+        delay = min(RETRY_BASE_DELAY * 2 ** (job.attempts - 1), RETRY_MAX_DELAY)
+        status, run_after = "queued", time.time() + delay
+    with transaction() as conn:
+        conn.execute("""
+            UPDATE jobs SET status = ?, run_after = ?, last_error = ?, locked_by = NULL,
+                            finished_at = CASE WHEN ? = 'failed' THEN CURRENT_TIMESTAMP END
+            WHERE id = ?
+        """, (status, run_after, error, status, job.id))
+    return status
+
+
+def run_job(job):
+    """Run one claimed job; returns its new status."""
+    try:
+        fn = _handlers.get(job.kind)
+        if fn is None:
+            raise UnknownJobError(job.kind)
+        fn(job)
+        with transaction() as conn:
+            complete(conn, job)
+        return "done"
+    except Exception as e:
+        status = fail(job, "".join(traceback.format_exception_only(type(e), e)).strip())
+        print(f"❌ Job {job.id} ({job.kind}) attempt {job.attempts}/{job.max_attempts}: {e}")
+        return status
+
+
+def run_now(job_ids, worker=None):
+    """Run specific queued jobs in this process (JOBS_RUN_INLINE)."""
+    worker = worker or worker_name()
+    for job_id in job_ids:
+        job = claim(worker, job_id=job_id)
+        if job is not None:
+            run_job(job)
+
+
+def requeue_stale(stale_after=STALE_AFTER):
+    """Give jobs locked by a dead worker back to the queue; returns the count."""
+    with transaction() as conn:
+        cursor = conn.execute("""
+            UPDATE jobs SET status = 'queued', locked_by = NULL, run_after = ?
+            WHERE status = 'running' AND locked_at < ?
+        """, (time.time(), time.time() - stale_after))
+    return cursor.rowcount
+
+
+def retry_failed():
+    """Queue every failed job again with a fresh set of attempts."""
+    with transaction() as conn:
+        cursor = conn.execute("""
+            UPDATE jobs SET status = 'queued', attempts = 0, run_after = ?, finished_at = NULL
+            WHERE status = 'failed'
+        """, (time.time(),))
+    return cursor.rowcount
+
+
+def prune(older_than_days=7):
+    """Delete finished jobs; failed ones are kept for inspection."""
+    with transaction() as conn:
+        cursor = conn.execute(
+            "DELETE FROM jobs WHERE status = 'done' AND finished_at < datetime('now', ?)",
+            (f"-{int(older_than_days)} days",),
+        )
+    return cursor.rowcount
+
+
+def work(worker=None, poll_interval=1.0, once=False, should_stop=lambda: False):
+    """Run due jobs until should_stop() (or the queue is empty, with once)."""
+    worker = worker or worker_name()
+    last_stale_check = 0
+    while not should_stop():
+        if time.time() - last_stale_check > 60:
+            requeue_stale()
+            last_stale_check = time.time()
+
+        job = claim(worker)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        status = run_job(job)
+        if status == "done":
+            print(f"✅ Job {job.id} ({job.kind})")
@@ -0,0 +1,119 @@
+"""
+Follow-up work of a loan submission, run by the job queue (utils.jobs).
+
+finance.loans only spools the uploaded files to disk and commits the
+application with its jobs, then redirects; uploads whose content the blob
+store already has are referenced right away instead of spooled. The worker
+then hashes the spooled files into the blob store and records the
+attachments ("loan.attachments"), and compacts the drawn signature
+("loan.signature").
+Until both are done my_loans shows the application as processing.
+"""
+import contextlib
+import os
+import shutil
+import uuid
+from utils.blobs import blob_relpath, commit_blobs, discard_staged, stage_upload
+from utils.database import BASE_DIR, save_application_attachments_many, transaction
+from utils.jobs import complete, handler
+from utils.signatures import SIGNATURE_DIR, compact_signature, decode_data_url
+
+SPOOL_ROOT = os.environ.get("UPLOAD_SPOOL_PATH") or os.path.join(BASE_DIR, '..', 'uploads', 'spool')
+
+
+# ==================================================
+# SPOOL (request side)
+# ==================================================
+def spool_dir(application_number):
+    return os.path.join(SPOOL_ROOT, application_number)
+
+
+def spool_upload(file, application_number):
+    """Save a FileStorage under the application's spool directory; returns its spool name."""
+    os.makedirs(spool_dir(application_number), exist_ok=True)
+    name = uuid.uuid4().hex
+    file.save(os.path.join(spool_dir(application_number), name))
+    return name
+
+
+def spool_signature(data_url, application_number):
+    """Decode a signature data URL into the spool; raises InvalidSignatureError."""
+    os.makedirs(spool_dir(application_number), exist_ok=True)
+    name = f"{uuid.uuid4().hex}.png"
+    with open(os.path.join(spool_dir(application_number), name), "wb") as out:
+        decode_data_url(data_url, out)
+    return name
+
+
+def discard_spool(application_number):
+    shutil.rmtree(spool_dir(application_number), ignore_errors=True)
+
+
+def _discard_spooled(application_number, names):
+    # Other jobs of the same application may still need the directory
+    for name in names:
+        try:
+            os.remove(os.path.join(spool_dir(application_number), name))
+        except FileNotFoundError:
+            pass
+    try:
+        os.rmdir(spool_dir(application_number))
+    except OSError:
+        pass
+
+
+def _application_exists(conn, application_id):
+    return conn.execute(
+        "SELECT 1 FROM loan_applications WHERE id = ?", (application_id,)
+    ).fetchone() is not None
+
+
+# ==================================================
+# JOB HANDLERS
+# ==================================================
+@handler("loan.attachments")
+def store_attachments(job):
+    """
+    payload: {"application_number", "files": [{"category", "filename", "spool"}]}
+    """
+    number = job.payload["application_number"]
+    staged, attachments = [], []
+    with contextlib.ExitStack() as stack:
+        try:
+            for item in job.payload["files"]:
+                f = stack.enter_context(open(os.path.join(spool_dir(number), item["spool"]), "rb"))
+                blob = stage_upload(f)
+                staged.append(blob)
+                attachments.append((item["category"], item["filename"], blob_relpath(blob.digest), blob.digest))
+
+            with transaction() as conn:
+                # The application may have been deleted while the job waited
+                if attachments and _application_exists(conn, job.application_id):
+                    commit_blobs(conn, staged)
+                    save_application_attachments_many(job.application_id, attachments, conn=conn)
+                complete(conn, job)
+        finally:
+            discard_staged(staged)
+    _discard_spooled(number, [item["spool"] for item in job.payload["files"]])
+
+
+@handler("loan.signature")
+def store_signature(job):
+    """payload: {"application_number", "spool"}: the decoded PNG in the spool"""
+    number = job.payload["application_number"]
+
+    # Named after the job, so a retry overwrites its own earlier attempt
+    filename = f"signature_{job.id}.png"
+    compact_signature(
+        os.path.join(spool_dir(number), job.payload["spool"]),
+        os.path.join(SIGNATURE_DIR, filename),
+    )
+
+    with transaction() as conn:
+        if _application_exists(conn, job.application_id):
+            conn.execute(
+                "INSERT INTO application_attachments (application_id, document_category, file_name, file_path) VALUES (?, ?, ?, ?)",
+                (job.application_id, "signature", filename, f"static/uploads/signatures/{filename}"),
+            )
+        complete(conn, job)
+    _discard_spooled(number, [job.payload["spool"]])
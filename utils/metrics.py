@@ -0,0 +1,254 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import g, request
+
+# ==================================================
+# REQUEST METRICS
+# ==================================================
+# Every worker counts its own requests in plain dicts behind one lock:
+# per-endpoint latency and response-size histograms, status counts and the
+# number of requests in flight. At most every METRICS_FLUSH_INTERVAL
+# seconds (and on every scrape) a worker writes that snapshot to
+# METRICS_DIR/worker-<pid>-<start>.json. render_prometheus() sums all
+# worker files, so /admin/metrics shows the whole gunicorn pool whichever
+# worker answers. Files of workers that have exited are folded into
+# dead.json, so counters survive worker restarts; their in-flight gauge
+# is dropped.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)  # bytes
+
+UNMATCHED_ENDPOINT = "<unmatched>"  # 404s would otherwise add a series per URL
+
+
+class WorkerMetrics:
+    """In-process counters of one worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}    # (endpoint, method) -> [latency counts, latency sum, size counts, size sum]
+        self.statuses = {}  # (endpoint, method, status) -> count
+        self.in_flight = 0
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe(self, endpoint, method, status, seconds, size):
+        key = (endpoint, method)
+        with self._lock:
+            route = self.routes.get(key)
+            if route is None:
+                route = self.routes[key] = [
+                    [0] * (len(LATENCY_BUCKETS) + 1), 0.0, [0] * (len(SIZE_BUCKETS) + 1), 0
+                ]
+            route[0][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            route[1] += seconds
+            if size is not None:
+                route[2][bisect_left(SIZE_BUCKETS, size)] += 1
+                route[3] += size
+            status_key = (endpoint, method, status)
+            self.statuses[status_key] = self.statuses.get(status_key, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "routes": [
+                    [endpoint, method, list(lat), lat_sum, list(sizes), size_sum]
+                    for (endpoint, method), (lat, lat_sum, sizes, size_sum) in self.routes.items()
+                ],
+                "statuses": [[*key, count] for key, count in self.statuses.items()],
+                "in_flight": self.in_flight,
+            }
+
+
+def _empty():
+    return {"routes": [], "statuses": [], "in_flight": 0}
+
+
+def _merge(into, snapshot, live=True):
+    routes = {(r[0], r[1]): r for r in into["routes"]}
+    for endpoint, method, lat, lat_sum, sizes, size_sum in snapshot["routes"]:
+        route = routes.get((endpoint, method))
+        if route is None:
+            routes[(endpoint, method)] = [endpoint, method, list(lat), lat_sum, list(sizes), size_sum]
+            continue
+        route[2] = [a + b for a, b in zip(route[2], lat)]
+        route[3] += lat_sum
+        route[4] = [a + b for a, b in zip(route[4], sizes)]
+        route[5] += size_sum
+    into["routes"] = list(routes.values())
+
+    statuses = {tuple(s[:3]): s[3] for s in into["statuses"]}
+    for endpoint, method, status, count in snapshot["statuses"]:
+        statuses[(endpoint, method, status)] = statuses.get((endpoint, method, status), 0) + count
+    into["statuses"] = [[*key, count] for key, count in statuses.items()]
+
+    if live:
+        into["in_flight"] += snapshot.get("in_flight", 0)
+    return into
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MetricsCollector:
+    """File-backed aggregation of WorkerMetrics across processes."""
+
+    def __init__(self, directory, flush_interval):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics = WorkerMetrics()
+        self._pid = None
+        self._path = None
+        self._last_flush = 0.0
+
+    def worker(self):
+        """This process's WorkerMetrics; a forked worker starts from zero."""
+        if self._pid != os.getpid():
+            self.metrics = WorkerMetrics()
+            self._pid = os.getpid()
+            self._path = os.path.join(self.directory, f"worker-{self._pid}-{int(time.time())}.json")
+        return self.metrics
+
+    def flush(self):
+        snapshot = self.worker().snapshot()
+        path = self._path
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def collect(self):
+        """Sum of every worker's last snapshot, folding exited workers into dead.json."""
+        self.flush()
+        lock_path = os.path.join(self.directory, "collect.lock")
+        dead_path = os.path.join(self.directory, "dead.json")
+
+        with open(lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead = _empty()
+            if os.path.exists(dead_path):
+                with open(dead_path) as f:
+                    dead = json.load(f)
+
+            total, exited = _empty(), []
+            for name in sorted(os.listdir(self.directory)):
+                if not (name.startswith("worker-") and name.endswith(".json")):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    with open(path) as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if _pid_alive(snapshot["pid"]):
+                    _merge(total, snapshot)
+                else:
+                    _merge(dead, snapshot, live=False)
+                    exited.append(path)
+
+            if exited:
+                with open(dead_path + ".tmp", "w") as f:
+                    json.dump(dead, f, separators=(",", ":"))
+                os.replace(dead_path + ".tmp", dead_path)
+                for path in exited:
+                    os.remove(path)
+        return _merge(total, dead, live=False)
+
+
+def _labels(**labels):
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _histogram(lines, name, help_text, bounds, series):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for endpoint, method, counts, total in series:
+        cumulative = 0
+        for bound, count in zip(list(bounds) + ["+Inf"], counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(endpoint=endpoint, method=method, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(endpoint=endpoint, method=method)} {total}")
+        lines.append(f"{name}_count{_labels(endpoint=endpoint, method=method)} {cumulative}")
+
+
+def render_prometheus(data):
+    """Prometheus text exposition (version 0.0.4) of collect() output."""
+    routes = sorted(data["routes"])
+    lines = []
+    _histogram(lines, "http_request_duration_seconds", "Request latency by endpoint.",
+               LATENCY_BUCKETS, [(r[0], r[1], r[2], r[3]) for r in routes])
+    _histogram(lines, "http_response_size_bytes", "Response body size by endpoint.",
+               SIZE_BUCKETS, [(r[0], r[1], r[4], r[5]) for r in routes])
+
+    lines.append("# HELP http_requests_total Requests by endpoint and status code.")
+    lines.append("# TYPE http_requests_total counter")
+    for endpoint, method, status, count in sorted(data["statuses"]):
+        lines.append(f"http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+    lines.append("# HELP http_requests_in_flight Requests being handled right now.")
+    lines.append("# TYPE http_requests_in_flight gauge")
+    lines.append(f"http_requests_in_flight {data['in_flight']}")
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    collector = MetricsCollector(
+        app.config.get("METRICS_DIR", "logs/metrics"),
+        app.config.get("METRICS_FLUSH_INTERVAL", 5),
+    )
+    app.extensions["metrics"] = collector
+
+    @app.before_request
+    def start_metrics():
+        g.metrics_started = time.perf_counter()
+        collector.worker().started()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.get("metrics_started")
+        if started is not None:
+            collector.worker().observe(
+                request.endpoint or UNMATCHED_ENDPOINT,
+                request.method,
+                response.status_code,
+                time.perf_counter() - started,
+                response.calculate_content_length(),
+            )
+        return response
+
+    @app.teardown_request
+    def finish_metrics(exc=None):
+        if g.pop("metrics_started", None) is not None:
+            collector.worker().finished()
+            collector.maybe_flush()
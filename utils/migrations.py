@@ -0,0 +1,797 @@
+import sqlite3
+
+# ==================================================
+# SCHEMA MIGRATIONS
+# ==================================================
+# Ordered, versioned schema changes. Progress is recorded in
+# PRAGMA user_version, so a database that is already current costs a single
+# PRAGMA read at boot. Each migration receives an open connection inside the
+# runner's transaction and must not commit.
+#
+# To change the schema, append a new (version, name, function) entry to
+# MIGRATIONS. Never edit a migration that has already shipped.
+
+# ---------------- v1: BASELINE SCHEMA ----------------
+BASELINE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT DEFAULT 'user',
+        is_active INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS blogs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        image TEXT,
+        status TEXT DEFAULT 'published',
+        created_by INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP,
+        FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS comments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        blog_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (blog_id) REFERENCES blogs(id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        price REAL,
+        image TEXT,
+        status TEXT DEFAULT 'available',
+        is_active INTEGER DEFAULT 1,
+        created_by INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS product_inquiries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        user_id INTEGER,
+        name TEXT,
+        email TEXT,
+        phone TEXT,
+        bid_price REAL,
+        message TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS loan_applications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        application_number TEXT UNIQUE NOT NULL,
+        loan_type TEXT CHECK(loan_type IN ('personal','business')) NOT NULL,
+        status TEXT DEFAULT 'pending',
+        user_id INTEGER,
+        interest_rate REAL DEFAULT 0.30,
+        total_repayment REAL,
+        admin_notes TEXT,
+        applied_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_date TIMESTAMP,
+        decision_date TIMESTAMP,
+        decision_by INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS personal_loan_details (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        application_id INTEGER UNIQUE NOT NULL,
+        loan_amount REAL NOT NULL,
+        purpose TEXT NOT NULL,
+        repayment_period_days INTEGER NOT NULL,
+        full_name TEXT NOT NULL,
+        date_of_birth DATE,
+        nrc_number TEXT,
+        email TEXT,
+        phone_number TEXT,
+        residential_address TEXT,
+        terms_accepted INTEGER DEFAULT 0,
+        agreement_date TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (application_id) REFERENCES loan_applications(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS business_loan_details (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        application_id INTEGER UNIQUE NOT NULL,
+        business_name TEXT NOT NULL,
+        business_registration_number TEXT NOT NULL,
+        loan_amount REAL NOT NULL,
+        purpose TEXT NOT NULL,
+        repayment_period_days INTEGER NOT NULL,
+        contact_person_name TEXT,
+        contact_email TEXT,
+        contact_phone TEXT,
+        contact_person_position TEXT,
+        business_address TEXT,
+        business_years INTEGER,
+        monthly_revenue REAL DEFAULT 0.0,
+        terms_accepted INTEGER DEFAULT 0,
+        agreement_date TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (application_id) REFERENCES loan_applications(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS collateral_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        application_id INTEGER NOT NULL,
+        loan_type TEXT NOT NULL,
+        item_name TEXT NOT NULL,
+        item_type TEXT,
+        estimated_value REAL,
+        condition_description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (application_id) REFERENCES loan_applications(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS application_attachments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        application_id INTEGER NOT NULL,
+        document_category TEXT,
+        file_name TEXT NOT NULL,
+        file_path TEXT NOT NULL,
+        uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (application_id) REFERENCES loan_applications(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tukakula_queries (
+        id TEXT PRIMARY KEY,
+        full_name TEXT NOT NULL,
+        company_name TEXT,
+        email TEXT NOT NULL,
+        phone TEXT,
+        whatsapp TEXT,
+        inquiry_target TEXT NOT NULL,
+        service TEXT,
+        subject TEXT,
+        reason TEXT NOT NULL,
+        message TEXT NOT NULL,
+        status TEXT DEFAULT 'new',
+        created_at TEXT NOT NULL
+    )
+    """,
+]
+
+# Columns that older databases (created by earlier initialize_db versions,
+# fix_db.py, auth/models.py or blog/models.py) may be missing.
+BASELINE_COLUMNS = [
+    ("users", "is_active", "INTEGER DEFAULT 1"),
+    ("blogs", "image", "TEXT"),
+    ("blogs", "status", "TEXT DEFAULT 'published'"),
+    ("blogs", "created_by", "INTEGER"),
+    ("blogs", "updated_at", "TIMESTAMP"),
+    ("products", "is_active", "INTEGER DEFAULT 1"),
+    ("products", "created_by", "INTEGER"),
+    ("products", "status", "TEXT DEFAULT 'available'"),
+    ("product_inquiries", "name", "TEXT"),
+    ("product_inquiries", "email", "TEXT"),
+    ("product_inquiries", "phone", "TEXT"),
+    ("product_inquiries", "bid_price", "REAL"),
+    ("business_loan_details", "contact_person_position", "TEXT"),
+    ("business_loan_details", "business_years", "INTEGER"),
+    ("business_loan_details", "monthly_revenue", "REAL DEFAULT 0.0"),
+]
+
+
+def table_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def add_missing_columns(conn, columns):
+    existing = {}
+    for table, column, definition in columns:
+        if table not in existing:
+            existing[table] = table_columns(conn, table)
+        if column not in existing[table]:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            existing[table].add(column)
+
+
+def baseline_schema(conn):
+    for ddl in BASELINE_TABLES:
+        conn.execute(ddl)
+    add_missing_columns(conn, BASELINE_COLUMNS)
+
+    # Early blog/models.py schema stored the author in author_id
+    blog_columns = table_columns(conn, "blogs")
+    if "author_id" in blog_columns:
+        conn.execute("UPDATE blogs SET created_by = author_id WHERE created_by IS NULL")
+
+
+# ---------------- v2: HOT-PATH INDEXES ----------------
+# One index per production access path; check_query_plans.py fails if any
+# listed query falls back to a full table scan.
+HOT_PATH_INDEXES = [
+    # finance.my_loans / client_dashboard: WHERE user_id ORDER BY applied_date
+    "CREATE INDEX IF NOT EXISTS idx_loan_applications_user_applied ON loan_applications(user_id, applied_date)",
+    # admin.dashboard / list_loans: ORDER BY applied_date
+    "CREATE INDEX IF NOT EXISTS idx_loan_applications_applied ON loan_applications(applied_date)",
+    # admin.view_loan attachments and collateral lookups
+    "CREATE INDEX IF NOT EXISTS idx_application_attachments_application ON application_attachments(application_id)",
+    "CREATE INDEX IF NOT EXISTS idx_collateral_items_application ON collateral_items(application_id)",
+    # blog.blog_home / blog_detail: WHERE blog_id ORDER BY created_at
+    "CREATE INDEX IF NOT EXISTS idx_comments_blog_created ON comments(blog_id, created_at)",
+    # admin.dashboard comment feed, plus the users FK cascade
+    "CREATE INDEX IF NOT EXISTS idx_comments_created ON comments(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_comments_user ON comments(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_blogs_created ON blogs(created_at)",
+    # market_place.home: WHERE is_active ORDER BY created_at; admin_products
+    "CREATE INDEX IF NOT EXISTS idx_products_active_created ON products(is_active, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_products_created ON products(created_at)",
+    # admin inboxes ordered by created_at, plus the products FK cascade
+    "CREATE INDEX IF NOT EXISTS idx_tukakula_queries_created ON tukakula_queries(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_product_inquiries_created ON product_inquiries(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_product_inquiries_product ON product_inquiries(product_id)",
+]
+
+
+def hot_path_indexes(conn):
+    for ddl in HOT_PATH_INDEXES:
+        conn.execute(ddl)
+
+
+# ---------------- v3: CACHE GENERATIONS ----------------
+def cache_generations(conn):
+    # Per-cache counters that utils.cache.GenerationCache checks on every hit
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cache_generations (
+            name TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+
+# ---------------- v4: IMAGE DERIVATIVES ----------------
+def image_derivatives(conn):
+    # Resized WebP copies of uploads, written by utils.derivatives. source is
+    # the upload path under static/uploads (e.g. "products/1700000000_0_a.jpg")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS image_derivatives (
+            source TEXT NOT NULL,
+            variant TEXT NOT NULL,
+            path TEXT NOT NULL,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, variant)
+        ) WITHOUT ROWID
+    """)
+
+
+# ---------------- v5: PRODUCT IMAGES ----------------
+def product_images(conn):
+    # One row per product image, replacing the comma-separated products.image
+    # (left in place for rollback, no longer read or written). width/height
+    # are filled in by utils.derivatives when it opens the upload.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS product_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            width INTEGER,
+            height INTEGER,
+            is_primary INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (product_id, filename),
+            FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+        )
+    """)
+    # Gallery order, image counts and the FK cascade
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_product_images_product_position "
+        "ON product_images(product_id, position)"
+    )
+    # utils.derivatives records dimensions by upload filename
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_product_images_filename ON product_images(filename)"
+    )
+    # At most one primary per product; also the listing's join index
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_product_images_primary "
+        "ON product_images(product_id) WHERE is_primary = 1"
+    )
+
+    rows = []
+    for product_id, image_string in conn.execute(
+        "SELECT id, image FROM products WHERE image IS NOT NULL AND image != ''"
+    ).fetchall():
+        filenames = list(dict.fromkeys(f.strip() for f in image_string.split(",") if f.strip()))
+        for position, filename in enumerate(filenames):
+            rows.append((product_id, filename, position, int(position == 0)))
+    conn.executemany("""
+        INSERT OR IGNORE INTO product_images (product_id, filename, position, is_primary)
+        VALUES (?, ?, ?, ?)
+    """, rows)
+
+
+# ---------------- v6: ATTACHMENT BLOBS ----------------
+def attachment_blobs(conn):
+    # Content-addressed attachment storage (utils.blobs). refcount is kept by
+    # the triggers below, so cascading loan deletes release blobs as well.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            digest TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    """)
+    add_missing_columns(conn, [("application_attachments", "digest", "TEXT")])
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_attachments_blob_ref
+        AFTER INSERT ON application_attachments WHEN NEW.digest IS NOT NULL
+        BEGIN
+            UPDATE blobs SET refcount = refcount + 1 WHERE digest = NEW.digest;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_attachments_blob_unref
+        AFTER DELETE ON application_attachments WHEN OLD.digest IS NOT NULL
+        BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE digest = OLD.digest;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_attachments_blob_move
+        AFTER UPDATE OF digest ON application_attachments WHEN OLD.digest IS NOT NEW.digest
+        BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE digest = OLD.digest;
+            UPDATE blobs SET refcount = refcount + 1 WHERE digest = NEW.digest;
+        END
+    """)
+    # utils.blobs gc
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced ON blobs(refcount) WHERE refcount <= 0")
+
+
+# ---------------- v7: JOB QUEUE ----------------
+def job_queue(conn):
+    # Durable background work (utils.jobs). run_after is a Unix timestamp so
+    # retries can be pushed back without date arithmetic in SQL.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            application_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            run_after REAL NOT NULL,
+            locked_by TEXT,
+            locked_at REAL,
+            last_error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            finished_at DATETIME,
+            FOREIGN KEY (application_id) REFERENCES loan_applications(id) ON DELETE CASCADE
+        )
+    """)
+    # Claiming the next job: only queued rows are indexed
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(run_after) WHERE status = 'queued'"
+    )
+    # Requeueing jobs of workers that died mid-job
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs(locked_at) WHERE status = 'running'"
+    )
+    # Processing state on my_loans, and the FK cascade
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_jobs_application ON jobs(application_id, status)"
+    )
+
+
+# ---------------- v8: BLOG SEARCH ----------------
+def blog_search(conn):
+    # FTS5 index over blogs (utils.search). External content: the text lives
+    # only in blogs, the index holds tokens, and these triggers keep it in step.
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS blogs_fts USING fts5(
+            title, content,
+            content='blogs', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS blogs_fts_insert AFTER INSERT ON blogs BEGIN
+            INSERT INTO blogs_fts (rowid, title, content) VALUES (NEW.id, NEW.title, NEW.content);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS blogs_fts_delete AFTER DELETE ON blogs BEGIN
+            INSERT INTO blogs_fts (blogs_fts, rowid, title, content) VALUES ('delete', OLD.id, OLD.title, OLD.content);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS blogs_fts_update AFTER UPDATE OF title, content ON blogs BEGIN
+            INSERT INTO blogs_fts (blogs_fts, rowid, title, content) VALUES ('delete', OLD.id, OLD.title, OLD.content);
+            INSERT INTO blogs_fts (rowid, title, content) VALUES (NEW.id, NEW.title, NEW.content);
+        END
+    """)
+    # rank: title matches weigh ten times body matches
+    conn.execute("INSERT INTO blogs_fts (blogs_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+    conn.execute("INSERT INTO blogs_fts (blogs_fts) VALUES ('rebuild')")
+
+
+# ---------------- v9: INQUIRY SEARCH ----------------
+def inquiry_search(conn):
+    # Full-text index of tukakula_queries for the admin inbox. The id is a
+    # TEXT key, so the index stores it (query_id) and results join on it;
+    # the index rowid mirrors the inquiry's rowid only so the triggers can
+    # find an entry without a scan (v13 replaces that with stable keys).
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS tukakula_queries_fts USING fts5(
+            query_id UNINDEXED, full_name, company_name, email, subject, message,
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS tukakula_queries_fts_insert AFTER INSERT ON tukakula_queries BEGIN
+            INSERT OR REPLACE INTO tukakula_queries_fts (rowid, query_id, full_name, company_name, email, subject, message)
+            VALUES (NEW.rowid, NEW.id, NEW.full_name, NEW.company_name, NEW.email, NEW.subject, NEW.message);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS tukakula_queries_fts_delete AFTER DELETE ON tukakula_queries BEGIN
+            DELETE FROM tukakula_queries_fts WHERE rowid = OLD.rowid;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS tukakula_queries_fts_update
+        AFTER UPDATE OF id, full_name, company_name, email, subject, message ON tukakula_queries BEGIN
+            INSERT OR REPLACE INTO tukakula_queries_fts (rowid, query_id, full_name, company_name, email, subject, message)
+            VALUES (NEW.rowid, NEW.id, NEW.full_name, NEW.company_name, NEW.email, NEW.subject, NEW.message);
+        END
+    """)
+    conn.execute("DELETE FROM tukakula_queries_fts")
+    conn.execute("""
+        INSERT INTO tukakula_queries_fts (rowid, query_id, full_name, company_name, email, subject, message)
+        SELECT rowid, id, full_name, company_name, email, subject, message FROM tukakula_queries
+    """)
+
+    # Inbox facet counts: one row per (target, service, reason, status)
+    # combination, kept by triggers, so counting never scans the inbox
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tukakula_query_facets (
+            inquiry_target TEXT NOT NULL,
+            service TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            status TEXT NOT NULL,
+            n INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (inquiry_target, service, reason, status)
+        ) WITHOUT ROWID
+    """)
+    add = """
+        INSERT INTO tukakula_query_facets (inquiry_target, service, reason, status, n)
+        VALUES (COALESCE(NEW.inquiry_target, ''), COALESCE(NEW.service, ''),
+                COALESCE(NEW.reason, ''), COALESCE(NEW.status, ''), 1)
+        ON CONFLICT (inquiry_target, service, reason, status) DO UPDATE SET n = n + 1;
+    """
+    remove = """
+        UPDATE tukakula_query_facets SET n = n - 1
+        WHERE inquiry_target = COALESCE(OLD.inquiry_target, '') AND service = COALESCE(OLD.service, '')
+          AND reason = COALESCE(OLD.reason, '') AND status = COALESCE(OLD.status, '');
+    """
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS tukakula_query_facets_insert AFTER INSERT ON tukakula_queries BEGIN {add} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS tukakula_query_facets_delete AFTER DELETE ON tukakula_queries BEGIN {remove} END")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS tukakula_query_facets_update
+        AFTER UPDATE OF inquiry_target, service, reason, status ON tukakula_queries BEGIN {remove} {add} END
+    """)
+    conn.execute("DELETE FROM tukakula_query_facets")
+    conn.execute("""
+        INSERT INTO tukakula_query_facets (inquiry_target, service, reason, status, n)
+        SELECT COALESCE(inquiry_target, ''), COALESCE(service, ''), COALESCE(reason, ''), COALESCE(status, ''), COUNT(*)
+        FROM tukakula_queries GROUP BY 1, 2, 3, 4
+    """)
+
+    # Inbox filters, each keeping the (created_at, rowid) page order
+    for column in ("inquiry_target", "service", "reason", "status"):
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_tukakula_queries_{column}_created "
+            f"ON tukakula_queries({column}, created_at)"
+        )
+
+
+# ---------------- v10: PRODUCT SEARCH ----------------
+def product_search(conn):
+    # FTS5 index over the marketplace catalogue, kept like blogs_fts (v8)
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, description,
+            content='products', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts (rowid, name, description) VALUES (NEW.id, NEW.name, NEW.description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description) VALUES ('delete', OLD.id, OLD.name, OLD.description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description) VALUES ('delete', OLD.id, OLD.name, OLD.description);
+            INSERT INTO products_fts (rowid, name, description) VALUES (NEW.id, NEW.name, NEW.description);
+        END
+    """)
+    # rank: name matches weigh five times description matches
+    conn.execute("INSERT INTO products_fts (products_fts, rank) VALUES ('rank', 'bm25(5.0, 1.0)')")
+    conn.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+
+    # Catalogue filters: status and price ranges over the public listing,
+    # and price orders once the status is fixed
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_products_active_status_price ON products(is_active, status, price)"
+    )
+
+
+# ---------------- v11: LOAN FILTERS ----------------
+# Applicant name, amount and attachment count copied onto loan_applications
+# by triggers, so every admin.filter_loans filter is a loan_applications
+# column with an index (see LOAN_FILTER_INDEXES).
+LOAN_FILTER_COLUMNS = [
+    ("loan_applications", "applicant_name", "TEXT"),
+    ("loan_applications", "loan_amount", "REAL"),
+    ("loan_applications", "attachment_count", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+# Pages run in (applied_date, id) order, so the equality filters lead and
+# applied_date follows; range filters get an index of their own.
+LOAN_FILTER_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_loan_applications_status_applied ON loan_applications(status, applied_date)",
+    "CREATE INDEX IF NOT EXISTS idx_loan_applications_type_applied ON loan_applications(loan_type, applied_date)",
+    "CREATE INDEX IF NOT EXISTS idx_loan_applications_status_type_applied ON loan_applications(status, loan_type, applied_date)",
+    "CREATE INDEX IF NOT EXISTS idx_loan_applications_decision ON loan_applications(decision_date)",
+    "CREATE INDEX IF NOT EXISTS idx_loan_applications_amount ON loan_applications(loan_amount)",
+    "CREATE INDEX IF NOT EXISTS idx_loan_applications_name ON loan_applications(applicant_name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_loan_applications_attached_applied "
+    "ON loan_applications(applied_date) WHERE attachment_count > 0",
+]
+
+
+def loan_filters(conn):
+    add_missing_columns(conn, LOAN_FILTER_COLUMNS)
+
+    # Same precedence as the loan lists' display name: the personal
+    # applicant, then the business
+    def refresh(ref):
+        return f"""
+            UPDATE loan_applications SET
+                applicant_name = COALESCE(
+                    (SELECT full_name FROM personal_loan_details WHERE application_id = {ref}.application_id),
+                    (SELECT business_name FROM business_loan_details WHERE application_id = {ref}.application_id)),
+                loan_amount = COALESCE(
+                    (SELECT loan_amount FROM personal_loan_details WHERE application_id = {ref}.application_id),
+                    (SELECT loan_amount FROM business_loan_details WHERE application_id = {ref}.application_id))
+            WHERE id = {ref}.application_id;
+        """
+    for table, name_column in (("personal_loan_details", "full_name"), ("business_loan_details", "business_name")):
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_filters_insert AFTER INSERT ON {table} BEGIN {refresh('NEW')} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_filters_delete AFTER DELETE ON {table} BEGIN {refresh('OLD')} END")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_filters_update
+            AFTER UPDATE OF application_id, {name_column}, loan_amount ON {table} BEGIN {refresh('OLD')} {refresh('NEW')} END
+        """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS application_attachments_filters_insert AFTER INSERT ON application_attachments BEGIN
+            UPDATE loan_applications SET attachment_count = attachment_count + 1 WHERE id = NEW.application_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS application_attachments_filters_delete AFTER DELETE ON application_attachments BEGIN
+            UPDATE loan_applications SET attachment_count = attachment_count - 1 WHERE id = OLD.application_id;
+        END
+    """)
+    conn.execute("""
+        UPDATE loan_applications SET
+            applicant_name = COALESCE(
+                (SELECT full_name FROM personal_loan_details WHERE application_id = loan_applications.id),
+                (SELECT business_name FROM business_loan_details WHERE application_id = loan_applications.id)),
+            loan_amount = COALESCE(
+                (SELECT loan_amount FROM personal_loan_details WHERE application_id = loan_applications.id),
+                (SELECT loan_amount FROM business_loan_details WHERE application_id = loan_applications.id)),
+            attachment_count = (SELECT COUNT(*) FROM application_attachments WHERE application_id = loan_applications.id)
+    """)
+
+    # Result counts are cached per filter signature (utils.cache.loan_filter_cache);
+    # any change to a loan, including the copies above, starts a new generation
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS loan_applications_generation_{event.lower()}
+            AFTER {event} ON loan_applications BEGIN
+                INSERT INTO cache_generations (name, generation) VALUES ('loan_filters', 1)
+                ON CONFLICT (name) DO UPDATE SET generation = generation + 1;
+            END
+        """)
+
+    for ddl in LOAN_FILTER_INDEXES:
+        conn.execute(ddl)
+
+
+# ---------------- v12: USER LOAN STATS ----------------
+def user_loan_stats(conn):
+    # Per-client loan counters for finance.client_dashboard, one row per
+    # user with loans, kept by triggers on loan_applications. `total`
+    # counts every status; check_loan_stats.py verifies and rebuilds them.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_loan_stats (
+            user_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            pending INTEGER NOT NULL DEFAULT 0,
+            approved INTEGER NOT NULL DEFAULT 0,
+            rejected INTEGER NOT NULL DEFAULT 0,
+            missing_info INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # IS (not =) so a NULL status counts as 0, never NULL
+    add = """
+        INSERT INTO user_loan_stats (user_id, total, pending, approved, rejected, missing_info)
+        SELECT NEW.user_id, 1, NEW.status IS 'pending', NEW.status IS 'approved',
+               NEW.status IS 'rejected', NEW.status IS 'missing_info'
+        WHERE NEW.user_id IS NOT NULL
+        ON CONFLICT (user_id) DO UPDATE SET
+            total = total + 1,
+            pending = pending + excluded.pending,
+            approved = approved + excluded.approved,
+            rejected = rejected + excluded.rejected,
+            missing_info = missing_info + excluded.missing_info;
+    """
+    remove = """
+        UPDATE user_loan_stats SET
+            total = total - 1,
+            pending = pending - (OLD.status IS 'pending'),
+            approved = approved - (OLD.status IS 'approved'),
+            rejected = rejected - (OLD.status IS 'rejected'),
+            missing_info = missing_info - (OLD.status IS 'missing_info')
+        WHERE user_id = OLD.user_id;
+        DELETE FROM user_loan_stats WHERE user_id = OLD.user_id AND total <= 0;
+    """
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS user_loan_stats_insert AFTER INSERT ON loan_applications BEGIN {add} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS user_loan_stats_delete AFTER DELETE ON loan_applications BEGIN {remove} END")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS user_loan_stats_update
+        AFTER UPDATE OF status, user_id ON loan_applications
+        WHEN OLD.status IS NOT NEW.status OR OLD.user_id IS NOT NEW.user_id BEGIN {remove} {add} END
+    """)
+    conn.execute("DELETE FROM user_loan_stats")
+    conn.execute("""
+        INSERT INTO user_loan_stats (user_id, total, pending, approved, rejected, missing_info)
+        SELECT user_id, COUNT(*), SUM(status IS 'pending'), SUM(status IS 'approved'),
+               SUM(status IS 'rejected'), SUM(status IS 'missing_info')
+        FROM loan_applications WHERE user_id IS NOT NULL GROUP BY user_id
+    """)
+
+
+# ---------------- v13: INQUIRY SEARCH KEYS ----------------
+def inquiry_search_keys(conn):
+    # v9 keyed tukakula_queries_fts on tukakula_queries.rowid, which VACUUM
+    # may renumber (the table has a TEXT primary key). Each inquiry id now
+    # gets an INTEGER PRIMARY KEY in tukakula_query_keys, which VACUUM
+    # keeps, and the index rowid is that key. Keys are handed out in
+    # insertion order, so the index rowids still run oldest to newest.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tukakula_query_keys (
+            id INTEGER PRIMARY KEY,
+            query_id TEXT NOT NULL UNIQUE
+        )
+    """)
+    for event in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS tukakula_queries_fts_{event}")
+    index = """
+        INSERT OR REPLACE INTO tukakula_queries_fts (rowid, query_id, full_name, company_name, email, subject, message)
+        SELECT k.id, NEW.id, NEW.full_name, NEW.company_name, NEW.email, NEW.subject, NEW.message
+        FROM tukakula_query_keys k WHERE k.query_id = NEW.id;
+    """
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS tukakula_queries_fts_insert AFTER INSERT ON tukakula_queries BEGIN
+            INSERT INTO tukakula_query_keys (query_id) VALUES (NEW.id);
+            {index}
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS tukakula_queries_fts_delete AFTER DELETE ON tukakula_queries BEGIN
+            DELETE FROM tukakula_queries_fts
+            WHERE rowid = (SELECT id FROM tukakula_query_keys WHERE query_id = OLD.id);
+            DELETE FROM tukakula_query_keys WHERE query_id = OLD.id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS tukakula_queries_fts_update
+        AFTER UPDATE OF id, full_name, company_name, email, subject, message ON tukakula_queries BEGIN
+            UPDATE tukakula_query_keys SET query_id = NEW.id WHERE query_id = OLD.id;
+            {index}
+        END
+    """)
+    conn.execute("DELETE FROM tukakula_queries_fts")
+    conn.execute("DELETE FROM tukakula_query_keys")
+    conn.execute("INSERT INTO tukakula_query_keys (query_id) SELECT id FROM tukakula_queries ORDER BY rowid")
+    conn.execute("""
+        INSERT INTO tukakula_queries_fts (rowid, query_id, full_name, company_name, email, subject, message)
+        SELECT k.id, t.id, t.full_name, t.company_name, t.email, t.subject, t.message
+        FROM tukakula_query_keys k JOIN tukakula_queries t ON t.id = k.query_id
+    """)
+
+
+MIGRATIONS = [
+    (1, "baseline schema", baseline_schema),
+    (2, "hot-path indexes", hot_path_indexes),
+    (3, "cache generations", cache_generations),
+    (4, "image derivatives", image_derivatives),
+    (5, "product images", product_images),
+    (6, "attachment blobs", attachment_blobs),
+    (7, "job queue", job_queue),
+    (8, "blog search", blog_search),
+    (9, "inquiry search", inquiry_search),
+    (10, "product search", product_search),
+    (11, "loan filters", loan_filters),
+    (12, "user loan stats", user_loan_stats),
+    (13, "inquiry search keys", inquiry_search_keys),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ==================================================
+# RUNNER
+# ==================================================
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Bring the database up to LATEST_VERSION and return the versions applied.
+
+    BEGIN IMMEDIATE takes SQLite's write lock, so when several gunicorn
+    workers boot at once one of them migrates and the others wait, then
+    find the schema current when they re-read user_version.
+    """
+    if schema_version(conn) >= LATEST_VERSION:
+        return []
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    applied = []
+    try:
+        version = schema_version(conn)
+        for number, name, migration in MIGRATIONS:
+            if number <= version:
+                continue
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            applied.append((number, name))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return applied
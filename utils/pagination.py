@@ -0,0 +1,100 @@
+import base64
+import json
+
+# ==================================================
+# KEYSET (CURSOR) PAGINATION
+# ==================================================
+# Pages are addressed by the sort-key values of the last row shown, so each
+# page is one indexed range scan no matter how deep the reader goes. The
+# cursor is an opaque, URL-safe token of those values.
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    """Return the cursor's key values, or None for a missing or tampered token."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    # Only values SQLite can bind; anything else (nested lists, objects,
+    # booleans) came from a hand-edited token
+    if not all(value is None or type(value) in (str, int, float) for value in values):
+        return None
+    return values
+
+
+def clamp_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(value, maximum))
+
+
+class Page:
+    def __init__(self, items, next_cursor, limit):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.limit = limit
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_paginate(conn, sql, params=(), order_by=(), cursor=None, limit=DEFAULT_PAGE_SIZE, descending=True):
+    """
+    Run one page of `sql` ordered by `order_by` and return a Page.
+
+    `sql` is a SELECT whose WHERE clause contains a `{keyset}` placeholder
+    and no ORDER BY/LIMIT. `order_by` lists (sql_expression, result_column)
+    pairs; the last one must be unique (usually the primary key) so the
+    order is stable. All keys share one direction, which lets the boundary
+    be a single row-value comparison that SQLite can answer from an index.
+
+    One extra row is fetched to decide whether a next page exists, which is
+    far cheaper than COUNT(*) over the whole table.
+    """
+    expressions = [expr for expr, _ in order_by]
+    columns = [column for _, column in order_by]
+    direction = "DESC" if descending else "ASC"
+
+    params = list(params)
+    boundary = decode_cursor(cursor, len(order_by))
+    if boundary is None:
+        keyset = "1 = 1"
+    else:
+        keyset = f"({', '.join(expressions)}) {'<' if descending else '>'} ({', '.join('?' * len(boundary))})"
+        params.extend(boundary)
+
+    query = (
+        sql.format(keyset=keyset)
+        + " ORDER BY " + ", ".join(f"{expr} {direction}" for expr in expressions)
+        + " LIMIT ?"
+    )
+    rows = conn.execute(query, params + [limit + 1]).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[column] for column in columns)
+    return Page(rows, next_cursor, limit)
@@ -0,0 +1,164 @@
+import re
+import time
+from datetime import datetime, timezone
+from flask import current_app, g, request
+from request_logger import RequestLogWriter
+
+# ==================================================
+# SQL PROFILER (staging / debugging)
+# ==================================================
+# With SQL_PROFILER_ENABLED every request gets a QueryProfile on g, and the
+# pooled connection handed out by get_db_connection() times each execute()/
+# executemany() into it (time to the first row; fetching is not included).
+# Statements are grouped by shape: literals become ?, IN lists (...), so
+# the same query in a loop shows up as one shape with a high count.
+#
+# After the view returns:
+#   - Server-Timing / X-SQL-Queries headers report the query count and time
+#   - requests over SQL_QUERY_BUDGET or SQL_TIME_BUDGET_MS, or running one
+#     shape SQL_REPEAT_THRESHOLD+ times (N+1), are logged with those shapes
+#   - statements slower than SQL_SLOW_QUERY_MS are logged individually
+# Log records are JSON lines in SQL_PROFILER_LOG_PATH, written off-thread.
+# SQL_PROFILER_EXPAND_SQL also logs slow statements with their bound
+# values (via set_trace_callback); leave it off where data is sensitive.
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Shape of a statement: literals replaced, whitespace collapsed."""
+    shape = _STRING.sub("?", sql)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryProfile:
+    """Statements executed on one request's connection."""
+
+    def __init__(self, slow_seconds=None, expand_sql=False):
+        self.slow_seconds = slow_seconds
+        self.expand_sql = expand_sql
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}  # shape -> [count, seconds]
+        self.slow = []    # (shape, seconds, expanded sql or None)
+        self._expanded = None
+
+    # ---- connection hooks (see utils.database.PooledConnection) ----
+    def attach(self, conn):
+        conn.profile = self
+        if self.expand_sql:
+            conn.set_trace_callback(self._trace)
+
+    def detach(self, conn):
+        conn.profile = None
+        if self.expand_sql:
+            conn.set_trace_callback(None)
+
+    def _trace(self, statement):
+        # First traced line of an execute() is the statement itself;
+        # trigger programs trace again with the same text
+        if self._expanded is None:
+            self._expanded = statement
+
+    def timed(self, run, sql):
+        self._expanded = None
+        started = time.perf_counter()
+        try:
+            return run()
+        finally:
+            self.record(sql, time.perf_counter() - started)
+
+    def record(self, sql, seconds):
+        shape = normalize_sql(sql)
+        self.count += 1
+        self.seconds += seconds
+        entry = self.shapes.get(shape)
+        if entry is None:
+            entry = self.shapes[shape] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+        if self.slow_seconds is not None and seconds >= self.slow_seconds:
+            self.slow.append((shape, seconds, self._expanded))
+
+    def repeated(self, threshold):
+        """[(shape, count, seconds)] of shapes run at least threshold times, worst first."""
+        return sorted(
+            ((shape, count, seconds) for shape, (count, seconds) in self.shapes.items() if count >= threshold),
+            key=lambda item: (-item[1], -item[2]),
+        )
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def init_app(app):
+    if not app.config.get("SQL_PROFILER_ENABLED"):
+        return
+
+    writer = RequestLogWriter(
+        app.config.get("SQL_PROFILER_LOG_PATH", "logs/sql_profile.jsonl"),
+        app.config.get("REQUEST_LOG_MAX_BYTES", 10 * 1024 * 1024),
+        app.config.get("REQUEST_LOG_BACKUPS", 5),
+    )
+    app.extensions["sql_profiler"] = writer
+
+    @app.before_request
+    def start_sql_profile():
+        g.sql_profile = QueryProfile(
+            slow_seconds=app.config.get("SQL_SLOW_QUERY_MS", 50) / 1000,
+            expand_sql=app.config.get("SQL_PROFILER_EXPAND_SQL", False),
+        )
+
+    @app.after_request
+    def report_sql_profile(response):
+        profile = g.get("sql_profile")
+        if profile is None:
+            return response
+
+        if app.config.get("SQL_PROFILER_HEADER", True):
+            response.headers["X-SQL-Queries"] = str(profile.count)
+            response.headers.add(
+                "Server-Timing", f'sql;dur={_ms(profile.seconds)};desc="{profile.count} queries"'
+            )
+
+        context = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+        }
+        for shape, seconds, expanded in profile.slow:
+            record = dict(context, kind="slow_query", shape=shape, ms=_ms(seconds))
+            if expanded:
+                record["sql"] = expanded
+            writer.put(record)
+
+        repeated = profile.repeated(app.config.get("SQL_REPEAT_THRESHOLD", 5))
+        over_budget = (
+            profile.count > app.config.get("SQL_QUERY_BUDGET", 25)
+            or profile.seconds * 1000 > app.config.get("SQL_TIME_BUDGET_MS", 100)
+        )
+        if over_budget or repeated:
+            writer.put(dict(
+                context,
+                kind="over_budget" if over_budget else "repeated_queries",
+                queries=profile.count,
+                sql_ms=_ms(profile.seconds),
+                repeated=[
+                    {"shape": shape, "count": count, "ms": _ms(seconds)}
+                    for shape, count, seconds in repeated
+                ],
+            ))
+            current_app.logger.warning(
+                "SQL %s on %s %s: %d queries, %.1f ms%s",
+                "budget exceeded" if over_budget else "repeated queries",
+                request.method, request.path, profile.count, profile.seconds * 1000,
+                "".join(f"\n    {count}x {shape[:160]}" for shape, count, _ in repeated[:5]),
+            )
+        return response
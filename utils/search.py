@@ -0,0 +1,65 @@
+import html
+import re
+from markupsafe import Markup, escape
+
+# ==================================================
+# FULL-TEXT SEARCH (FTS5)
+# ==================================================
+# Search boxes take plain words, never FTS5 query syntax: match_query()
+# quotes every word so quotes, operators and column filters typed by a
+# visitor are just text. Every word must match (implicit AND); the
+# porter tokenizer lets "loans" find "loan".
+#
+# highlight()/snippet() are asked to wrap matches in MARK_START/MARK_END
+# control characters rather than HTML; marked() escapes the fragment and
+# turns the markers into <mark> elements. Fragments of an HTML column
+# (html_source=True) first lose their tags, including a tag the snippet
+# cut in half at either edge. Only things shaped like tags go: a bare "<"
+# or ">" in prose ("Loans > Savings", "a < b and c > d") is kept.
+#
+# bm25() is computed for every row a query ranks, a few microseconds
+# each; a common word can match most of a table. candidate_floor() limits
+# ranking to the newest N matches (rowids follow insertion order): the
+# rowid walk that finds the floor costs a fraction of ranking.
+
+MARK_START, MARK_END = "\x02", "\x03"
+MAX_TERMS = 8
+
+_WORD = re.compile(r"\w+")
+# Whole tags and comments; the head/tail of a tag cut by snippet(), which
+# may follow/precede its ellipsis: 'strong>', 'class="lead">', '<a href="…'
+_TAG = re.compile(r"<!--.*?-->|</?[a-zA-Z][^<>]*>", re.S)
+_CUT_HEAD = re.compile(r"""^(…?)(?:/?[a-zA-Z][\w-]*/?|[^<>]*=\s*(?:"[^"<>]*"|'[^'<>]*')\s*/?)>""")
+_CUT_TAIL = re.compile(r"</?[a-zA-Z][^<>]*$")
+
+
+def match_query(text):
+    """FTS5 MATCH expression for what a visitor typed; None if it has no words."""
+    terms = _WORD.findall(text or "")[:MAX_TERMS]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def marked(fragment, html_source=False):
+    """
+    Safe HTML of a highlight()/snippet() fragment with matches in <mark>.
+    html_source: the indexed column holds HTML (tags dropped, entities decoded).
+    """
+    if not fragment:
+        return Markup("")
+    text = fragment
+    if html_source:
+        text = _CUT_HEAD.sub(r"\1", text)
+        text = _CUT_TAIL.sub("…" if text.endswith("…") else "", text)
+        text = html.unescape(_TAG.sub(" ", text))
+    return Markup(str(escape(text)).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>"))
+
+
+def candidate_floor(conn, fts_table, match, limit):
+    """Lowest rowid among the newest `limit` matches; 0 when there are fewer."""
+    row = conn.execute(
+        f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+        (match, limit - 1),
+    ).fetchone()
+    return row[0] if row else 0
@@ -0,0 +1,116 @@
+"""
+Drawn signatures: data-URL decoding and PNG compaction.
+
+The signature pad posts its canvas as a base64 PNG data URL. The request
+only decodes it, in chunks, to a spool file after checking the PNG header
+(decode_data_url); the "loan.signature" job then re-encodes it with
+compact_signature(): flattened onto white, metadata dropped, and stored as
+a 1-bit PNG for pure black-and-white strokes or a 16-grey palette PNG when
+the pad anti-aliased them. A 300x150 canvas goes from ~10KB to ~2.5KB.
+
+Signatures stored before this existed are compacted in place by:
+
+    python -m utils.signatures
+"""
+import base64
+import binascii
+import glob
+import os
+from utils.database import UPLOAD_BASE
+
+SIGNATURE_DIR = os.path.join(UPLOAD_BASE, "signatures")
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+DATA_URL_PREFIX = "data:image/png;base64,"
+DECODE_CHUNK = 64 * 1024  # base64 characters per step, a multiple of 4
+MAX_SIGNATURE_BYTES = 2 * 1024 * 1024
+MAX_SIGNATURE_PIXELS = 4000 * 2000
+PALETTE_COLORS = 16
+
+
+class InvalidSignatureError(ValueError):
+    """The posted signature is not a usable PNG."""
+
+
+def decode_data_url(data_url, out):
+    """
+    Decode a PNG data URL into the binary file object out, DECODE_CHUNK
+    characters at a time so the decoded image is never held in memory as a
+    whole. Returns the number of bytes written.
+    """
+    if not data_url.startswith(DATA_URL_PREFIX):
+        raise InvalidSignatureError("Signature is not a base64 PNG data URL")
+
+    start = len(DATA_URL_PREFIX)
+    written = 0
+    for offset in range(start, len(data_url), DECODE_CHUNK):
+        try:
+            chunk = base64.b64decode(data_url[offset:offset + DECODE_CHUNK], validate=True)
+        except (binascii.Error, ValueError):
+            raise InvalidSignatureError("Signature data is not valid base64")
+        if offset == start and not chunk.startswith(PNG_HEADER):
+            raise InvalidSignatureError("Signature is not a PNG image")
+        written += len(chunk)
+        if written > MAX_SIGNATURE_BYTES:
+            raise InvalidSignatureError("Signature image is too large")
+        out.write(chunk)
+
+    if written < len(PNG_HEADER):
+        raise InvalidSignatureError("Signature is empty")
+    return written
+
+
+def compact_signature(source_path, dest_path):
+    """Re-encode a signature PNG as 1-bit or palette PNG; returns the new size."""
+    # Pillow is only needed by the job worker
+    from PIL import Image
+
+    with Image.open(source_path) as image:
+        if image.format != "PNG":
+            raise InvalidSignatureError("Signature is not a PNG image")
+        if image.width * image.height > MAX_SIGNATURE_PIXELS:
+            raise InvalidSignatureError("Signature image is too large")
+        image.load()
+
+        # Transparent canvas pixels become paper white
+        canvas = Image.new("RGBA", image.size, "white")
+        canvas.alpha_composite(image.convert("RGBA"))
+        gray = canvas.convert("L")
+
+    if len(gray.getcolors(256)) <= 2:
+        compacted, options = gray.point(lambda v: 255 if v >= 128 else 0).convert("1"), {}
+    else:
+        compacted = gray.quantize(colors=PALETTE_COLORS)
+        options = {"bits": 4}
+
+    # No pnginfo/exif/icc_profile is passed, so no metadata is written
+    tmp_path = dest_path + ".tmp"
+    compacted.save(tmp_path, "PNG", optimize=True, **options)
+    os.replace(tmp_path, dest_path)
+    return os.path.getsize(dest_path)
+
+
+def save_signature(data_url, filename):
+    """Decode and compact a signature straight into SIGNATURE_DIR (no job)."""
+    tmp_path = os.path.join(SIGNATURE_DIR, f".{filename}.upload")
+    try:
+        with open(tmp_path, "wb") as out:
+            decode_data_url(data_url, out)
+        return compact_signature(tmp_path, os.path.join(SIGNATURE_DIR, filename))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+if __name__ == "__main__":
+    before = after = 0
+    for path in sorted(glob.glob(os.path.join(SIGNATURE_DIR, "*.png"))):
+        size = os.path.getsize(path)
+        try:
+            new_size = compact_signature(path, path)
+        except Exception as e:
+            print(f"❌ {os.path.basename(path)}: {e}")
+            continue
+        before, after = before + size, after + new_size
+        print(f"✅ {os.path.basename(path)} {size // 1024}KB -> {new_size / 1024:.1f}KB")
+    print(f"--- {before // 1024}KB -> {after // 1024}KB ---")
@@ -0,0 +1,60 @@
+"""
+Background job worker (utils.jobs).
+
+Runs queued jobs until stopped; SIGTERM/SIGINT finish the current job first.
+Run one or more next to the web workers:
+
+    python worker.py                 # work forever
+    python worker.py --once          # drain due jobs, then exit (cron)
+    python worker.py retry-failed    # queue failed jobs again
+    python worker.py prune --days 7  # delete finished jobs
+    python worker.py status          # job counts by kind and status
+"""
+import argparse
+import signal
+
+from utils import jobs
+from utils.database import get_db_connection, initialize_db
+
+# Modules that register job handlers
+import utils.loan_processing  # noqa: F401
+
+
+def status():
+    conn = get_db_connection()
+    rows = conn.execute(
+        "SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status ORDER BY kind, status"
+    ).fetchall()
+    conn.close()
+    for kind, job_status, count in rows:
+        print(f"{kind:<20}{job_status:<10}{count:>6}")
+    if not rows:
+        print("--- no jobs ---")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", nargs="?", default="work",
+                        choices=["work", "retry-failed", "prune", "status"])
+    parser.add_argument("--once", action="store_true", help="exit when no job is due")
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between polls when idle")
+    parser.add_argument("--days", type=int, default=7, help="prune: keep finished jobs this long")
+    args = parser.parse_args()
+
+    initialize_db()
+    if args.command == "retry-failed":
+        print(f"✅ Requeued {jobs.retry_failed()} failed jobs")
+    elif args.command == "prune":
+        print(f"✅ Deleted {jobs.prune(args.days)} finished jobs")
+    elif args.command == "status":
+        status()
+    else:
+        stopping = []
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: stopping.append(True))
+        print(f"--- worker {jobs.worker_name()} started ---")
+        jobs.work(poll_interval=args.poll, once=args.once, should_stop=lambda: bool(stopping))
+
+
+if __name__ == "__main__":
+    main()